@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import ORJSONResponse
+
+from app.controllers.auth_controller import get_current_user
+from app.core.config import settings
+from app.dtos.prediction_dto import Comparable, PredictionInput
+from app.services.auth_service import Principal
+from app.services.comparables import find_comparables
+
+router = APIRouter(prefix="/comparables", tags=["comparables"])
+
+
+@router.post("", response_model=list[Comparable])
+async def get_comparables(
+        data: PredictionInput,
+        k: int = Query(settings.COMPARABLES_DEFAULT_K, ge=1, le=settings.COMPARABLES_MAX_K),
+        current_user: Principal = Depends(get_current_user),
+):
+    # a KD-tree query is tens of microseconds, cheaper than a hop to a thread
+    return ORJSONResponse(find_comparables([data], k)[0])
+
+
+@router.post("/batch", response_model=list[list[Comparable]])
+async def get_batch_comparables(
+        data: list[PredictionInput],
+        k: int = Query(settings.COMPARABLES_DEFAULT_K, ge=1, le=settings.COMPARABLES_MAX_K),
+        current_user: Principal = Depends(get_current_user),
+):
+    if len(data) > settings.PREDICT_BATCH_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch exceeds {settings.PREDICT_BATCH_MAX_ROWS} rows",
+        )
+    if not data:
+        return ORJSONResponse([])
+    return ORJSONResponse(find_comparables(data, k))
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.controllers.auth_controller import get_current_user
+from app.core.db import get_db
+from app.services.auth_service import Principal
+from app.repositories.shadow_repository import summarize_shadow_rows
+from app.services.model_reloader import reload_in_background, reload_status
+from app.services.prediction_service import model_status, registry_status
+from app.services.shadow_scoring import get_shadow_scorer
+
+router = APIRouter(prefix="/model", tags=["model"])
+
+
+@router.get("")
+def get_model_info(current_user: Principal = Depends(get_current_user)):
+    return {"model": model_status(), "reload": reload_status(), "registry": registry_status()}
+
+
+@router.post("/reload", status_code=status.HTTP_202_ACCEPTED)
+def trigger_model_reload(current_user: Principal = Depends(get_current_user)):
+    started = reload_in_background()
+    return {"message": "Reload started" if started else "Reload already in progress", "reload": reload_status()}
+
+
+@router.get("/shadow")
+async def get_shadow_report(db: AsyncSession = Depends(get_db), current_user: Principal = Depends(get_current_user)):
+    scorer = get_shadow_scorer()
+    return {
+        "scorer": scorer.status() if scorer is not None else None,
+        "comparisons": await summarize_shadow_rows(db),
+    }
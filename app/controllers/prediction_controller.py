@@ -1,36 +1,122 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.core.db import SessionLocal
-from app.dtos.prediction_dto import PredictionInput, PredictionOutput, PredictionRead
-from app.services.prediction_service import predict_and_store
-from app.repositories.prediction_repository import list_predictions
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.core.db import get_db, get_session_factory
+from app.core.config import settings
+from app.core.metrics import stage
+from app.core.rate_limit import limiter, user_or_remote_address
+from app.dtos.prediction_dto import ActualValue, PredictionInput, PredictionOutput, PredictionRead
+from app.services.model_registry import UnknownModel
+from app.services.prediction_service import (
+    get_prediction_cache,
+    predict_and_store,
+    predict_batch_and_store,
+    select_model,
+)
+from app.services.comparables import find_comparables, get_comparables_index
+from app.services.prediction_export import EXPORT_MEDIA_TYPES, export_predictions
+from app.repositories.prediction_repository import list_prediction_rows, set_actual_value
 from app.controllers.auth_controller import get_current_user
-from app.entities.user import User
+from app.services.auth_service import Principal
 
 router = APIRouter(prefix="/predict", tags=["predict"])
 
+MODEL_QUERY = Query(None, description="Registered model name; omitted, MODEL_ROUTING splits traffic by weight")
+
 
-def get_db():
-    db = SessionLocal()
+def _select_model(requested: Optional[str], user: Principal) -> str:
     try:
-        yield db
-    finally:
-        db.close()
+        return select_model(requested, user.id)
+    except UnknownModel:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown model {requested!r}")
 
 
 @router.post("", response_model=PredictionOutput)
-def make_prediction(
+@limiter.limit(settings.PREDICT_RATE_LIMIT, key_func=user_or_remote_address)
+async def make_prediction(
+        request: Request,
         data: PredictionInput,
-        db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user),
+        comparables: int = Query(0, ge=0, le=settings.COMPARABLES_MAX_K,
+                                 description="Also return this many nearest training districts"),
+        model: Optional[str] = MODEL_QUERY,
+        db: AsyncSession = Depends(get_db),
+        current_user: Principal = Depends(get_current_user),
 ):
-    y, pred_id = predict_and_store(db, current_user.id, data)
-    return {"prediction": y, "prediction_id": pred_id}
+    name = _select_model(model, current_user)
+    # resolved before scoring: a 503 must not leave a stored prediction behind for the retry to duplicate
+    index = get_comparables_index() if comparables else None
+    y, pred_id, version = await predict_and_store(db, current_user.id, data, name)
+    # plain float/int: nothing for response_model validation to catch, so skip it
+    body = {"prediction": y, "prediction_id": pred_id}
+    if comparables:
+        with stage("comparables"):
+            body["comparables"] = find_comparables([data], comparables, index)[0]
+    return ORJSONResponse(body, headers={"X-Model-Version": version})
+
+
+@router.post("/batch", response_model=list[PredictionOutput])
+@limiter.limit(settings.PREDICT_RATE_LIMIT, key_func=user_or_remote_address)
+async def make_batch_prediction(
+        request: Request,
+        data: list[PredictionInput],
+        model: Optional[str] = MODEL_QUERY,
+        db: AsyncSession = Depends(get_db),
+        current_user: Principal = Depends(get_current_user),
+):
+    if len(data) > settings.PREDICT_BATCH_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch exceeds {settings.PREDICT_BATCH_MAX_ROWS} rows",
+        )
+    name = _select_model(model, current_user)
+    results, version = await predict_batch_and_store(db, current_user.id, data, name)
+    headers = {"X-Model-Version": version} if version else None
+    return ORJSONResponse([{"prediction": y, "prediction_id": pred_id} for y, pred_id in results], headers=headers)
+
+
+@router.get("/cache/stats")
+def prediction_cache_stats(current_user: Principal = Depends(get_current_user)):
+    return get_prediction_cache().stats()
+
+
+@router.get("/export")
+async def export_my_predictions(
+        format: Literal["ndjson", "csv"] = "ndjson",
+        session_factory: async_sessionmaker = Depends(get_session_factory),
+        current_user: Principal = Depends(get_current_user),
+):
+    return StreamingResponse(
+        export_predictions(session_factory, current_user.id, format, settings.PREDICTION_EXPORT_CHUNK_ROWS),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="predictions.{format}"'},
+    )
 
 
 @router.get("", response_model=list[PredictionRead])
-def my_predictions(
-        db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user),
+async def my_predictions(
+        limit: int = Query(settings.PREDICTION_PAGE_SIZE, ge=1, le=settings.PREDICTION_PAGE_MAX),
+        after: Optional[int] = Query(None, description="Last id of the previous page"),
+        db: AsyncSession = Depends(get_db),
+        current_user: Principal = Depends(get_current_user),
+):
+    # rows go from DB tuples to orjson directly; response_model only documents the shape
+    rows = await list_prediction_rows(db, user_id=current_user.id, limit=limit + 1, after=after)
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-After"] = str(rows[-1]["id"])
+    return ORJSONResponse(rows, headers=headers)
+
+
+@router.put("/{prediction_id}/actual")
+async def record_actual_value(
+        prediction_id: int,
+        data: ActualValue,
+        db: AsyncSession = Depends(get_db),
+        current_user: Principal = Depends(get_current_user),
 ):
-    return list_predictions(db, user_id=current_user.id)
+    if not await set_actual_value(db, current_user.id, prediction_id, data.actual_value):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Prediction not found")
+    return {"message": "Actual value recorded", "prediction_id": prediction_id}
@@ -0,0 +1,114 @@
+import asyncio
+import functools
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+
+class ExecutorSaturated(Exception):
+    def __init__(self, name: str):
+        super().__init__(f"{name} executor is saturated")
+        self.name = name
+
+
+def _start_worker(initializer, ready):
+    if initializer is not None:
+        initializer()
+    ready.release()
+
+
+class BoundedExecutor:
+    def __init__(self, name: str, kind: str, max_workers: int, max_pending: int, initializer=None):
+        self.name = name
+        self.kind = kind
+        self.max_workers = max(int(max_workers), 1)
+        self.max_pending = int(max_pending)
+        self._initializer = initializer
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._pending
+
+    def _create(self, timeout: Optional[float] = None):
+        """A new pool; with ``timeout``, returns once every worker process has run the initializer."""
+        if self.kind != "process":
+            return ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix=self.name,
+                initializer=self._initializer,
+            )
+        context = multiprocessing.get_context("spawn")
+        ready = context.Semaphore(0)
+        executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=context,
+            initializer=_start_worker,
+            initargs=(self._initializer, ready),
+        )
+        if timeout is not None:
+            # workers are spawned on demand, one per submit while none is idle
+            for _ in range(self.max_workers):
+                executor.submit(int)
+            deadline = time.monotonic() + timeout
+            for _ in range(self.max_workers):
+                if not ready.acquire(timeout=max(deadline - time.monotonic(), 0.0)):
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    raise TimeoutError(f"{self.name} workers did not start within {timeout:.0f}s")
+        return executor
+
+    def start(self, timeout: float = 120.0):
+        """Create the pool now rather than on the first submit, so no request waits for workers to spawn."""
+        with self._lock:
+            if self._executor is not None:
+                return
+        executor = self._create(timeout)
+        with self._lock:
+            if self._executor is None:
+                self._executor, executor = executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def replace(self, timeout: float = 120.0):
+        """Start a fresh pool, swap it in, then retire the old one once its queued work is done."""
+        executor = self._create(timeout)
+        with self._lock:
+            old, self._executor = self._executor, executor
+        if old is not None:
+            old.shutdown(wait=False)
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._pending -= 1
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        # under the lock, so replace() cannot shut the pool down between lookup and submit
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise ExecutorSaturated(self.name)
+            self._pending += 1
+            try:
+                if self._executor is None:
+                    self._executor = self._create()
+                future = self._executor.submit(fn, *args, **kwargs)
+            except BaseException:
+                self._pending -= 1
+                raise
+        future.add_done_callback(self._release)
+        return future
+
+    def call(self, fn, *args, **kwargs):
+        return self.submit(fn, *args, **kwargs).result()
+
+    async def run(self, fn, *args, **kwargs):
+        return await asyncio.wrap_future(self.submit(functools.partial(fn, *args, **kwargs)))
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
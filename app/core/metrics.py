@@ -0,0 +1,233 @@
+"""Dependency-free counters/histograms rendered in the Prometheus text format.
+
+An update is a dict lookup and two additions under a lock (~1us); with
+METRICS_ENABLED off nothing is recorded: counter and histogram updates
+return at once and stage() returns a shared no-op.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from app.core.config import settings
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=()) -> str:
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    type_name = "counter"
+    # set by MetricsRegistry; updates are dropped while it is disabled
+    registry = None
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount: float = 1.0) -> None:
+        if self.registry is not None and not self.registry.enabled:
+            return
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def value(self, *labelvalues) -> float:
+        return self._values.get(labelvalues, 0.0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for labelvalues, value in items:
+            yield self.name, _format_labels(self.labelnames, labelvalues), value
+
+
+class Histogram:
+    type_name = "histogram"
+    registry = None
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labelvalues -> [per-bucket counts..., +Inf count, sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues) -> None:
+        if self.registry is not None and not self.registry.enabled:
+            return
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labelvalues)
+            if state is None:
+                state = self._values[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    def count(self, *labelvalues) -> int:
+        state = self._values.get(labelvalues)
+        return 0 if state is None else sum(state[:-1])
+
+    def samples(self):
+        with self._lock:
+            items = [(labelvalues, list(state)) for labelvalues, state in self._values.items()]
+        for labelvalues, state in items:
+            cumulative = 0
+            for bound, hits in zip((*self.buckets, "+Inf"), state[:-1]):
+                cumulative += hits
+                le = bound if isinstance(bound, str) else repr(float(bound))
+                yield f"{self.name}_bucket", _format_labels(self.labelnames, labelvalues, [("le", le)]), cumulative
+            yield f"{self.name}_count", _format_labels(self.labelnames, labelvalues), cumulative
+            yield f"{self.name}_sum", _format_labels(self.labelnames, labelvalues), state[-1]
+
+
+class CallbackGauge:
+    """Gauge read at scrape time; ``fn`` returns ``[(labelvalues, value), ...]``."""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames, fn):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._fn = fn
+
+    def samples(self):
+        for labelvalues, value in self._fn():
+            yield self.name, _format_labels(self.labelnames, labelvalues), value
+
+
+class MetricsRegistry:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics = {}
+
+    def _register(self, metric):
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        metric.registry = self
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge_callback(self, name, documentation, labelnames, fn) -> CallbackGauge:
+        return self._register(CallbackGauge(name, documentation, labelnames, fn))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for sample_name, labels, value in metric.samples():
+                lines.append(f"{sample_name}{labels} {float(value)!r}")
+        return "\n".join(lines) + "\n"
+
+
+class _StageTimer:
+    __slots__ = ("_histogram", "_stage", "_started")
+
+    def __init__(self, histogram: Histogram, stage: str):
+        self._histogram = histogram
+        self._stage = stage
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._histogram.observe(time.perf_counter() - self._started, self._stage)
+        return False
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_TIMER = _NoopTimer()
+
+registry = MetricsRegistry(enabled=settings.METRICS_ENABLED)
+
+http_requests_total = registry.counter(
+    "http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status"),
+)
+http_request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route"),
+)
+model_predictions_total = registry.counter(
+    "model_predictions_total", "Rows scored per registered model and version.", ("model", "version"),
+)
+shadow_predictions_total = registry.counter(
+    "shadow_predictions_total", "Live predictions handed to the shadow model, by outcome.", ("outcome",),
+)
+prediction_writer_rows_total = registry.counter(
+    "prediction_writer_rows_total", "Write-behind prediction rows by outcome (dropped rows are lost).", ("outcome",),
+)
+predict_stage_duration_seconds = registry.histogram(
+    "predict_stage_duration_seconds", "Time spent in each stage of a prediction request.", ("stage",),
+)
+
+
+def stage(name: str):
+    """``with stage("predict"): ...`` records into predict_stage_duration_seconds."""
+    if not registry.enabled:
+        return _NOOP_TIMER
+    return _StageTimer(predict_stage_duration_seconds, name)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording a counter and a latency histogram per route template.
+
+    The label is the matched route's path template (``/api-deutsche/predict``),
+    never the raw URL, so path parameters cannot blow up label cardinality.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry = registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.registry.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        status_holder = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            http_requests_total.inc(method, template, str(status_holder[0]))
+            http_request_duration_seconds.observe(elapsed, method, template)
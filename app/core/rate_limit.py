@@ -1,8 +1,35 @@
 from slowapi import Limiter
 from slowapi.util import get_remote_address
+from starlette.requests import Request
+
+from app.core.config import settings
+
+
+def storage_uri(backend: str, redis_url: str) -> str:
+    if backend == "memory":
+        return "memory://"
+    if backend == "redis":
+        return redis_url
+    if "://" in backend:
+        # any limits storage URI, e.g. memcached:// or redis+sentinel://
+        return backend
+    raise ValueError(f"Unknown RATE_LIMITER_BACKEND {backend!r}")
+
+
+def user_or_remote_address(request: Request) -> str:
+    # get_current_user runs before the limit check and records who the caller is,
+    # so authenticated routes are keyed per user without decoding the token twice
+    user_id = getattr(request.state, "user_id", None)
+    if user_id is not None:
+        return f"user:{user_id}"
+    return get_remote_address(request)
+
 
 limiter = Limiter(
     key_func=get_remote_address,
     default_limits=[],
-    storage_uri="memory://",
+    storage_uri=storage_uri(settings.RATE_LIMITER_BACKEND, settings.REDIS_URL),
+    strategy=settings.RATE_LIMIT_STRATEGY,
+    # keep limiting (per process) if the shared store goes away
+    in_memory_fallback_enabled=settings.RATE_LIMITER_BACKEND != "memory",
 )
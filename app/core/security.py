@@ -1,11 +1,32 @@
 from datetime import datetime, timedelta
+from typing import Optional
 from jose import jwt
 from passlib.context import CryptContext
 from app.core.config import settings
+from app.core.executors import BoundedExecutor
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def build_password_context(rounds: int) -> CryptContext:
+    # min_rounds == rounds makes needs_update() flag hashes made at a lower cost
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__rounds=rounds,
+        bcrypt__min_rounds=rounds,
+    )
+
+
+pwd_context = build_password_context(settings.BCRYPT_ROUNDS)
 ALGORITHM = "HS256"
 
+password_executor = BoundedExecutor(
+    "password",
+    kind="thread",
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_QUEUE_LIMIT,
+)
+
 
 def hash_password(plain: str) -> str:
     return pwd_context.hash(plain[:72])
@@ -15,6 +36,23 @@ def verify_password(plain: str, hashed: str) -> bool:
     return pwd_context.verify(plain[:72], hashed)
 
 
+def verify_and_update_password(plain: str, hashed: str) -> tuple[bool, Optional[str]]:
+    """Verify, and return a replacement hash when ``hashed`` is below the configured cost."""
+    return pwd_context.verify_and_update(plain[:72], hashed)
+
+
+async def ahash_password(plain: str) -> str:
+    return await password_executor.run(hash_password, plain)
+
+
+async def averify_password(plain: str, hashed: str) -> bool:
+    return await password_executor.run(verify_password, plain, hashed)
+
+
+async def averify_and_update_password(plain: str, hashed: str) -> tuple[bool, Optional[str]]:
+    return await password_executor.run(verify_and_update_password, plain, hashed)
+
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     if expires_delta is None:
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Literal
+from typing import Literal, Optional
 
 
 class PredictionInput(BaseModel):
@@ -18,11 +18,25 @@ class PredictionRead(BaseModel):
     id: int
     user_id: int
     prediction: float
+    model_version: Optional[str] = None
 
     class Config:
         from_attributes = True
+        protected_namespaces = ()
+
+
+class ActualValue(BaseModel):
+    actual_value: float = Field(..., ge=0)
+
+
+class Comparable(BaseModel):
+    longitude: float
+    latitude: float
+    median_house_value: float
+    distance_km: float
 
 
 class PredictionOutput(BaseModel):
     prediction: float
     prediction_id: int
+    comparables: Optional[list[Comparable]] = None
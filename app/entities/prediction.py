@@ -1,13 +1,19 @@
-from sqlalchemy import Column, Integer, Float, String, ForeignKey, DateTime, func
+from sqlalchemy import Column, Integer, Float, String, ForeignKey, DateTime, Index, func
 from sqlalchemy.orm import relationship
 from app.core.db import Base
 
 
 class Prediction(Base):
     __tablename__ = "predictions"
+    # history is read newest-first per user; (user_id, id) keeps that a single index range scan
+    __table_args__ = (
+        Index("ix_predictions_user_id_id", "user_id", "id"),
+        # retraining pages through labels in the order they arrived
+        Index("ix_predictions_labelled_at_id", "labelled_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     longitude = Column(Float, nullable=False)
     latitude = Column(Float, nullable=False)
     housing_median_age = Column(Float, nullable=False)
@@ -19,5 +25,9 @@ class Prediction(Base):
     ocean_proximity = Column(String, nullable=False)
 
     prediction = Column(Float, nullable=False)
+    model_version = Column(String, nullable=True)
+    # observed sale price, reported after the fact; labelled rows feed retraining
+    actual_value = Column(Float, nullable=True)
+    labelled_at = Column(DateTime(timezone=True), nullable=True)
 
     user = relationship("User", backref="predictions")
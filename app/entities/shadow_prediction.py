@@ -0,0 +1,20 @@
+from sqlalchemy import Column, DateTime, Float, Integer, String, func
+from app.core.db import Base
+
+
+class ShadowPrediction(Base):
+    """A candidate model's score for a served prediction; written off the request path."""
+
+    __tablename__ = "shadow_predictions"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    # no foreign key: with write-behind the shadow row can land before its prediction
+    prediction_id = Column(Integer, nullable=True, index=True)
+    live_model_version = Column(String, nullable=False)
+    live_prediction = Column(Float, nullable=False)
+    shadow_model = Column(String, nullable=False)
+    shadow_model_version = Column(String, nullable=False)
+    shadow_prediction = Column(Float, nullable=False)
+    # shadow_prediction - live_prediction
+    divergence = Column(Float, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -1,44 +1,158 @@
+import logging
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, APIRouter
+from fastapi import FastAPI, APIRouter, Request, status
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 
-from app.core.db import Base, engine, init_db
+from app.core.config import settings
+from app.core.db import async_engine, init_db
+from app.core.executors import ExecutorSaturated
+from app.core.metrics import MetricsMiddleware, registry as metrics_registry
+from app.core.security import password_executor
 from app.controllers.auth_controller import router as auth_router
 from app.controllers.user_controller import router as user_router
 from app.core.rate_limit import limiter
+from app.services.comparables import ComparablesUnavailable, build_comparables_index
+from app.services.model_reloader import ModelWatcher
+from app.services.prediction_writer import start_prediction_writer, stop_prediction_writer
+from app.services.prediction_service import (
+    inference_executor,
+    model_status,
+    score_with_model,
+    shutdown_inference,
+    warm_up_model,
+)
+from app.services.shadow_scoring import get_shadow_scorer, start_shadow_scorer, stop_shadow_scorer
 
-app = FastAPI(title="House Price API")
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await init_db()
+    if settings.MODEL_WARMUP_ON_STARTUP:
+        warm_up_model()
+    if settings.COMPARABLES_ENABLED:
+        try:
+            build_comparables_index()
+        except (OSError, ValueError):
+            # the endpoints retry the build in the background and answer 503 until it succeeds
+            logger.exception("Could not build the comparables index from %s", settings.TRAIN_DATA)
+    watcher = None
+    if settings.MODEL_WATCH_INTERVAL_SECONDS > 0:
+        watcher = ModelWatcher(settings.MODEL_WATCH_INTERVAL_SECONDS)
+        watcher.start()
+    if settings.PREDICTION_WRITE_BEHIND:
+        start_prediction_writer(settings)
+    if settings.SHADOW_MODEL:
+        start_shadow_scorer(settings, score_with_model)
+    yield
+    if watcher is not None:
+        watcher.stop()
+    await stop_shadow_scorer()
+    await stop_prediction_writer()
+    shutdown_inference()
+    password_executor.shutdown()
+    await async_engine.dispose()
+
+
+app = FastAPI(title="House Price API", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.state.limiter = limiter
 app.add_middleware(SlowAPIMiddleware)
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, registry=metrics_registry)
+
+
+def _pool_samples():
+    pool = async_engine.pool
+    if not hasattr(pool, "checkedout"):
+        return []
+    return [
+        (("size",), pool.size()),
+        (("checked_out",), pool.checkedout()),
+        (("checked_in",), pool.checkedin()),
+        (("overflow",), pool.overflow()),
+    ]
+
+
+metrics_registry.gauge_callback(
+    "db_pool_connections", "SQLAlchemy connection pool state.", ("state",), _pool_samples,
+)
+metrics_registry.gauge_callback(
+    "executor_queue_depth", "Calls submitted to a bounded executor and not yet finished.", ("executor",),
+    lambda: [((executor.name,), executor.queue_depth) for executor in (inference_executor, password_executor)],
+)
+
+
+def _shadow_samples():
+    scorer = get_shadow_scorer()
+    return [] if scorer is None else [((), scorer.queue_depth)]
+
+
+metrics_registry.gauge_callback(
+    "shadow_queue_depth", "Live predictions waiting for the shadow model.", (), _shadow_samples,
+)
+
+
+@app.exception_handler(ExecutorSaturated)
+async def executor_saturated_handler(request: Request, exc: ExecutorSaturated):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": f"Server busy ({exc.name}), retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(ComparablesUnavailable)
+async def comparables_unavailable_handler(request: Request, exc: ComparablesUnavailable):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": f"Comparables unavailable: {exc}"},
+        headers={"Retry-After": "5"},
+    )
 
 from app.controllers.prediction_controller import router as prediction_router
+from app.controllers.comparables_controller import router as comparables_router
+from app.controllers.model_controller import router as model_router
 
 api = APIRouter(prefix="/api-deutsche")
 api.include_router(auth_router, tags=["auth"])
 api.include_router(user_router, prefix="/users", tags=["users"])
 api.include_router(prediction_router, tags=["predict"])
+api.include_router(model_router, tags=["model"])
+api.include_router(comparables_router, tags=["comparables"])
 app.include_router(api)
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    init_db()
-    yield
+@app.get("/health")
+def health():
+    return {"status": "ok"}
 
 
-@app.on_event("startup")
-def on_startup():
-    init_db()
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    if not metrics_registry.enabled:
+        return PlainTextResponse("metrics disabled\n", status_code=status.HTTP_404_NOT_FOUND)
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
 
 
-@app.get("/health")
-def health():
-    return {"status": "ok"}
+@app.get("/health/ready")
+def health_ready():
+    model = model_status()
+    if model["status"] == "not_loaded":
+        # MODEL_WARMUP_ON_STARTUP is off: the first probe loads the model, since no traffic arrives until ready
+        model = warm_up_model()
+    if model["status"] not in ("ready", "loaded"):
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "not_ready", "model": model},
+        )
+    return {"status": "ready", "model": model}
 
 
 if __name__ == "__main__":
@@ -1,18 +1,21 @@
 from __future__ import annotations
 
-from typing import List, Type
+from datetime import datetime, timezone
+from typing import AsyncIterator, List
 
-from sqlalchemy.orm import Session
+from sqlalchemy import func, insert, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.entities.prediction import Prediction
 from app.dtos.prediction_dto import PredictionInput
 
 
-def create_prediction(
-    db: Session,
+async def create_prediction(
+    db: AsyncSession,
     user_id: int,
     inp: PredictionInput,
     value: float,
+    model_version: str | None = None,
 ) -> Prediction:
     prediction_record = Prediction(
         user_id=user_id,
@@ -25,16 +28,135 @@ def create_prediction(
         households=inp.households,
         median_income=inp.median_income,
         ocean_proximity=inp.ocean_proximity,
-        prediction=value
+        prediction=value,
+        model_version=model_version,
     )
     db.add(prediction_record)
-    db.commit()
-    db.refresh(prediction_record)
+    await db.commit()
+    await db.refresh(prediction_record)
     return prediction_record
 
 
-def list_predictions(db: Session, user_id: int | None = None) -> list[Type[Prediction]]:
-    query = db.query(Prediction)
+def prediction_row(
+    user_id: int,
+    inp: PredictionInput,
+    value: float,
+    model_version: str | None = None,
+    prediction_id: int | None = None,
+) -> dict:
+    row = {
+        "user_id": user_id,
+        "longitude": inp.longitude,
+        "latitude": inp.latitude,
+        "housing_median_age": inp.housing_median_age,
+        "total_rooms": inp.total_rooms,
+        "total_bedrooms": inp.total_bedrooms,
+        "population": inp.population,
+        "households": inp.households,
+        "median_income": inp.median_income,
+        "ocean_proximity": inp.ocean_proximity,
+        "prediction": value,
+        "model_version": model_version,
+    }
+    if prediction_id is not None:
+        row["id"] = prediction_id
+    return row
+
+
+async def create_predictions(
+    db: AsyncSession,
+    user_id: int,
+    inputs: List[PredictionInput],
+    values: List[float],
+    model_version: str | None = None,
+) -> List[int]:
+    rows = [prediction_row(user_id, inp, value, model_version) for inp, value in zip(inputs, values)]
+    stmt = insert(Prediction).returning(Prediction.id, sort_by_parameter_order=True)
+    ids = list(await db.scalars(stmt, rows))
+    await db.commit()
+    return ids
+
+
+async def insert_prediction_rows(db: AsyncSession, rows: List[dict]) -> None:
+    await db.execute(insert(Prediction), rows)
+    await db.commit()
+
+
+async def existing_prediction_ids(db: AsyncSession, ids: List[int]) -> set[int]:
+    return set(await db.scalars(select(Prediction.id).where(Prediction.id.in_(ids))))
+
+
+async def reserve_prediction_ids(db: AsyncSession, count: int) -> List[int] | None:
+    conn = await db.connection()
+    if conn.dialect.name != "postgresql":
+        return None
+    result = await db.scalars(
+        text("SELECT nextval(pg_get_serial_sequence('predictions', 'id')) FROM generate_series(1, :n)"),
+        {"n": count},
+    )
+    return list(result)
+
+
+async def set_actual_value(db: AsyncSession, user_id: int, prediction_id: int, value: float) -> bool:
+    result = await db.execute(
+        update(Prediction)
+        .where(Prediction.id == prediction_id, Prediction.user_id == user_id)
+        .values(actual_value=value, labelled_at=datetime.now(timezone.utc))
+    )
+    await db.commit()
+    return result.rowcount > 0
+
+
+async def max_prediction_id(db: AsyncSession) -> int:
+    return (await db.scalar(select(func.max(Prediction.id)))) or 0
+
+
+async def list_predictions(
+    db: AsyncSession,
+    user_id: int | None = None,
+    limit: int | None = None,
+    after: int | None = None,
+) -> list[Prediction]:
+    """Newest first; ``after`` is the last id of the previous page (keyset, not offset)."""
+    query = select(Prediction)
     if user_id is not None:
-        query = query.filter(Prediction.user_id == user_id)
-    return query.order_by(Prediction.id.desc()).all()
+        query = query.where(Prediction.user_id == user_id)
+    if after is not None:
+        query = query.where(Prediction.id < after)
+    query = query.order_by(Prediction.id.desc())
+    if limit is not None:
+        query = query.limit(limit)
+    return list(await db.scalars(query))
+
+
+async def list_prediction_rows(
+    db: AsyncSession,
+    user_id: int,
+    limit: int,
+    after: int | None = None,
+) -> list[dict]:
+    """Same page as list_predictions, as plain dicts of the PredictionRead columns (no ORM objects)."""
+    query = select(Prediction.id, Prediction.user_id, Prediction.prediction, Prediction.model_version).where(
+        Prediction.user_id == user_id
+    )
+    if after is not None:
+        query = query.where(Prediction.id < after)
+    result = await db.execute(query.order_by(Prediction.id.desc()).limit(limit))
+    return [row._asdict() for row in result]
+
+
+async def stream_predictions(
+    db: AsyncSession,
+    user_id: int,
+    chunk_rows: int = 1000,
+) -> AsyncIterator[list[dict]]:
+    """Yield chunks of plain row mappings from a server-side cursor, newest first."""
+    query = (
+        select(*Prediction.__table__.columns)
+        .where(Prediction.user_id == user_id)
+        .order_by(Prediction.id.desc())
+        .execution_options(yield_per=chunk_rows)
+    )
+    result = await db.stream(query)
+    async for partition in result.mappings().partitions():
+        yield partition
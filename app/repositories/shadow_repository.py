@@ -0,0 +1,34 @@
+from typing import List
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.entities.shadow_prediction import ShadowPrediction
+
+
+async def insert_shadow_rows(db: AsyncSession, rows: List[dict]) -> None:
+    await db.execute(insert(ShadowPrediction), rows)
+    await db.commit()
+
+
+async def summarize_shadow_rows(db: AsyncSession) -> List[dict]:
+    """Row count and divergence statistics per (live version, shadow version) pair."""
+    abs_divergence = func.abs(ShadowPrediction.divergence)
+    query = (
+        select(
+            ShadowPrediction.live_model_version,
+            ShadowPrediction.shadow_model,
+            ShadowPrediction.shadow_model_version,
+            func.count().label("rows"),
+            func.avg(ShadowPrediction.divergence).label("mean_divergence"),
+            func.avg(abs_divergence).label("mean_abs_divergence"),
+            func.max(abs_divergence).label("max_abs_divergence"),
+        )
+        .group_by(
+            ShadowPrediction.live_model_version,
+            ShadowPrediction.shadow_model,
+            ShadowPrediction.shadow_model_version,
+        )
+        .order_by(ShadowPrediction.shadow_model, ShadowPrediction.shadow_model_version)
+    )
+    return [row._asdict() for row in await db.execute(query)]
@@ -1,13 +1,15 @@
+from sqlalchemy import select
+
 from app.entities.user import User
 
 
-def get_user_by_username(db, username: str):
-    return db.query(User).filter(User.username == username).first()
+async def get_user_by_username(db, username: str):
+    return await db.scalar(select(User).where(User.username == username).limit(1))
 
 
-def create_user(db, username: str, password_hash: str):
+async def create_user(db, username: str, password_hash: str):
     user = User(username=username, password_hash=password_hash)
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
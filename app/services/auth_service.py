@@ -1,58 +1,103 @@
-from passlib.context import CryptContext
+from dataclasses import dataclass
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.security import ahash_password, averify_and_update_password, averify_password
 from app.repositories.user_repository import get_user_by_username, create_user
 from app.entities.user import User
 
-password_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated caller: an immutable snapshot, never an ORM instance bound to one request's session."""
+
+    id: int
+    username: str
+
+
+# user id -> Principal resolved for a previous request; per process, so other workers see
+# a rename or delete at the latest after the TTL
+_principals = TTLCache(settings.AUTH_PRINCIPAL_CACHE_MAXSIZE, settings.AUTH_PRINCIPAL_CACHE_TTL_SECONDS)
+
+
+async def _load_then_release(db, pending):
+    # don't hold a pooled connection (or an SQLite read lock) while queued for bcrypt
+    row = await pending
+    await db.close()
+    return row
+
+
+async def resolve_principal(db, username, user_id=None):
+    """Map verified token claims to a Principal, skipping the users query when possible."""
+    if user_id is not None and settings.AUTH_TRUST_TOKEN_ID_CLAIM:
+        return Principal(id=user_id, username=username)
+    if user_id is not None and settings.AUTH_PRINCIPAL_CACHE_ENABLED:
+        principal = _principals.get(user_id)
+        if principal is not None and principal.username == username:
+            return principal
+    user = await get_user_by_username(db, username)
+    if user is None:
+        return None
+    principal = Principal(id=user.id, username=user.username)
+    if settings.AUTH_PRINCIPAL_CACHE_ENABLED:
+        _principals.set(principal.id, principal)
+    return principal
 
 
-def hash_password(password):
-    return password_context.hash(password)
+def invalidate_principal(user_id):
+    _principals.pop(user_id)
 
 
-def verify_password(password, hashed):
-    return password_context.verify(password, hashed)
+def clear_principals():
+    _principals.clear()
 
 
-def register(db, username, password):
-    if get_user_by_username(db, username) is not None:
+async def register(db, username, password):
+    if await _load_then_release(db, get_user_by_username(db, username)) is not None:
         return None
-    return create_user(db, username, hash_password(password))
+    password_hash = await ahash_password(password)
+    return await create_user(db, username, password_hash)
 
 
-def login(db, username, password):
-    user = get_user_by_username(db, username)
+async def login(db, username, password):
+    user = await _load_then_release(db, get_user_by_username(db, username))
     if not user:
         return None
-    if not verify_password(password, user.password_hash):
+    valid, new_hash = await averify_and_update_password(password, user.password_hash)
+    if not valid:
         return None
+    if new_hash is not None:
+        # cost was raised (or the scheme retired) since this hash was made
+        user = await set_password_hash(db, user.id, new_hash)
     return user
 
 
-def set_password_hash(db, user_id, password_hash):
-    user = db.get(User, user_id)
+async def set_password_hash(db, user_id, password_hash):
+    user = await db.get(User, user_id)
     if not user:
         return None
     user.password_hash = password_hash
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    invalidate_principal(user_id)
+    await db.refresh(user)
     return user
 
 
-def change_password(db, user_id, old_password, new_password):
-    user = db.get(User, user_id)
+async def change_password(db, user_id, old_password, new_password):
+    user = await _load_then_release(db, db.get(User, user_id))
     if not user:
         return None, "not_found"
-    if not verify_password(old_password, user.password_hash):
+    if not await averify_password(old_password, user.password_hash):
         return None, "bad_old"
-    new_hash = hash_password(new_password)
-    updated = set_password_hash(db, user_id, new_hash)
+    new_hash = await ahash_password(new_password)
+    updated = await set_password_hash(db, user_id, new_hash)
     return updated, None
 
 
-def admin_reset_password(db, user_id, new_password):
-    user = db.get(User, user_id)
+async def admin_reset_password(db, user_id, new_password):
+    user = await _load_then_release(db, db.get(User, user_id))
     if not user:
         return None
-    new_hash = hash_password(new_password)
-    return set_password_hash(db, user_id, new_hash)
+    new_hash = await ahash_password(new_password)
+    return await set_password_hash(db, user_id, new_hash)
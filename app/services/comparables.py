@@ -0,0 +1,143 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+KM_PER_DEGREE = 111.195
+# a failed build (missing or bad TRAIN_DATA) is retried at most this often
+BUILD_RETRY_SECONDS = 30.0
+
+_index = None
+_index_lock = threading.Lock()
+_build_thread: Optional[threading.Thread] = None
+_last_attempt: Optional[float] = None
+_last_error: Optional[str] = None
+
+
+class ComparablesUnavailable(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class ComparablesIndex:
+    """Training districts in a KD-tree over equirectangular-projected coordinates.
+
+    Longitude is scaled by cos(mean latitude) so Euclidean distance in the
+    tree approximates ground distance; over California the error is a few percent.
+    """
+
+    longitude: np.ndarray
+    latitude: np.ndarray
+    median_house_value: np.ndarray
+    lon_scale: float
+    tree: cKDTree
+
+    @classmethod
+    def from_arrays(cls, longitude, latitude, median_house_value) -> "ComparablesIndex":
+        longitude = np.ascontiguousarray(longitude, dtype=np.float64)
+        latitude = np.ascontiguousarray(latitude, dtype=np.float64)
+        values = np.ascontiguousarray(median_house_value, dtype=np.float64)
+        lon_scale = float(np.cos(np.radians(latitude.mean()))) if len(latitude) else 1.0
+        points = np.column_stack([longitude * lon_scale, latitude])
+        return cls(longitude, latitude, values, lon_scale, cKDTree(points, balanced_tree=False))
+
+    def __len__(self) -> int:
+        return len(self.longitude)
+
+    def query(self, longitude, latitude, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Indices and distances (km) of the ``k`` nearest districts, shape ``(n, k)``, nearest first."""
+        k = min(k, len(self))
+        points = np.column_stack([np.asarray(longitude, dtype=np.float64) * self.lon_scale,
+                                  np.asarray(latitude, dtype=np.float64)])
+        distances, indices = self.tree.query(points, k=k)
+        return indices.reshape(len(points), k), distances.reshape(len(points), k) * KM_PER_DEGREE
+
+    def comparables(self, longitude, latitude, k: int) -> list[list[dict]]:
+        indices, distances = self.query(longitude, latitude, k)
+        lon = self.longitude[indices].tolist()
+        lat = self.latitude[indices].tolist()
+        values = self.median_house_value[indices].tolist()
+        distances = np.round(distances, 3).tolist()
+        return [
+            [
+                {"longitude": x, "latitude": y, "median_house_value": v, "distance_km": d}
+                for x, y, v, d in zip(*row)
+            ]
+            for row in zip(lon, lat, values, distances)
+        ]
+
+
+def load_comparables_index(path=None) -> ComparablesIndex:
+    from app.services.training_data import load_training_data
+
+    data = load_training_data(path)
+    if "median_house_value" not in data.columns:
+        raise ValueError(f"{data.path} has no median_house_value column")
+    longitude, latitude, values = (
+        data.column(name) for name in ("longitude", "latitude", "median_house_value")
+    )
+    known = ~(np.isnan(longitude) | np.isnan(latitude) | np.isnan(values))
+    if not known.all():
+        longitude, latitude, values = longitude[known], latitude[known], values[known]
+    return ComparablesIndex.from_arrays(longitude, latitude, values)
+
+
+def build_comparables_index() -> ComparablesIndex:
+    global _index
+    index = load_comparables_index()
+    if not len(index):
+        raise ValueError(f"no districts with coordinates in {settings.TRAIN_DATA}")
+    _index = index
+    logger.info("Comparables index built over %d districts", len(index))
+    return index
+
+
+def _build_quietly():
+    global _last_error
+    try:
+        build_comparables_index()
+        _last_error = None
+    except (OSError, ValueError) as exc:
+        logger.exception("Could not build the comparables index from %s", settings.TRAIN_DATA)
+        _last_error = str(exc)
+
+
+def _start_background_build():
+    global _build_thread, _last_attempt
+    with _index_lock:
+        if _index is not None or (_build_thread is not None and _build_thread.is_alive()):
+            return
+        now = time.monotonic()
+        if _last_attempt is not None and now - _last_attempt < BUILD_RETRY_SECONDS:
+            return
+        _last_attempt = now
+        _build_thread = threading.Thread(target=_build_quietly, name="comparables-build", daemon=True)
+        _build_thread.start()
+
+
+def get_comparables_index() -> ComparablesIndex:
+    """The built index; otherwise start a build off the event loop and raise ComparablesUnavailable.
+
+    A build converts TRAIN_DATA and fills a KD-tree (seconds for a large file),
+    so request handlers never wait for one; callers answer 503 until it lands.
+    """
+    index = _index
+    if index is None:
+        _start_background_build()
+        raise ComparablesUnavailable(_last_error or "the index is being built, retry shortly")
+    return index
+
+
+def find_comparables(rows, k: int, index: Optional[ComparablesIndex] = None) -> list[list[dict]]:
+    index = index or get_comparables_index()
+    longitude = np.fromiter((data.longitude for data in rows), dtype=np.float64, count=len(rows))
+    latitude = np.fromiter((data.latitude for data in rows), dtype=np.float64, count=len(rows))
+    return index.comparables(longitude, latitude, k)
@@ -0,0 +1,109 @@
+import numpy as np
+
+_TREE_LEAF = -1
+
+
+def _as_matrix(features) -> np.ndarray:
+    X = np.asarray(features, dtype=np.float64)
+    if X.ndim == 1:
+        X = X.reshape(1, -1)
+    return X
+
+
+class CompiledLinearModel:
+    def __init__(self, coef, intercept):
+        self.coef = np.ascontiguousarray(coef, dtype=np.float64)
+        self.intercept = float(intercept)
+
+    def predict(self, features) -> np.ndarray:
+        return _as_matrix(features) @ self.coef + self.intercept
+
+
+class CompiledTreeEnsemble:
+    """All trees flattened into shared node arrays; leaves point at themselves so every
+    row can be walked for max_depth steps without masking."""
+
+    def __init__(self, trees, base=0.0, scale=1.0, average=False):
+        roots, feature, threshold, left, right, value = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for tree in trees:
+            n = tree.node_count
+            own = np.arange(offset, offset + n)
+            is_leaf = tree.children_left == _TREE_LEAF
+            roots.append(offset)
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+            left.append(np.where(is_leaf, own, tree.children_left + offset))
+            right.append(np.where(is_leaf, own, tree.children_right + offset))
+            value.append(tree.value[:, 0, 0])
+            max_depth = max(max_depth, tree.max_depth)
+            offset += n
+
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.feature = np.concatenate(feature).astype(np.intp)
+        self.threshold = np.concatenate(threshold).astype(np.float64)
+        self.left = np.concatenate(left).astype(np.intp)
+        self.right = np.concatenate(right).astype(np.intp)
+        self.value = np.concatenate(value).astype(np.float64)
+        self.max_depth = max_depth
+        self.base = float(base)
+        self.scale = float(scale)
+        self.average = average
+
+    def _leaf_values(self, X: np.ndarray) -> np.ndarray:
+        # scikit-learn compares float32 inputs against float64 thresholds
+        X32 = X.astype(np.float32)
+        rows = np.arange(X32.shape[0])[:, None]
+        nodes = np.broadcast_to(self.roots, (X32.shape[0], self.roots.size))
+        for _ in range(self.max_depth):
+            go_left = X32[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return self.value[nodes]
+
+    def _predict_chunk(self, X: np.ndarray) -> np.ndarray:
+        leaves = self._leaf_values(X)
+        if self.scale != 1.0:
+            leaves = self.scale * leaves
+        # scikit-learn adds tree outputs one at a time; cumsum keeps that order exactly
+        terms = np.concatenate([np.full((X.shape[0], 1), self.base), leaves], axis=1)
+        out = np.cumsum(terms, axis=1)[:, -1]
+        if self.average:
+            out = out / self.roots.size
+        return out
+
+    def predict(self, features, chunk_rows: int = 4096) -> np.ndarray:
+        X = _as_matrix(features)
+        if X.shape[0] <= chunk_rows:
+            return self._predict_chunk(X)
+        return np.concatenate([
+            self._predict_chunk(X[start:start + chunk_rows])
+            for start in range(0, X.shape[0], chunk_rows)
+        ])
+
+
+def compile_model(model):
+    from sklearn.dummy import DummyRegressor
+    from sklearn.ensemble import ExtraTreesRegressor, GradientBoostingRegressor, RandomForestRegressor
+    from sklearn.linear_model._base import LinearModel
+    from sklearn.tree import DecisionTreeRegressor
+
+    if isinstance(model, LinearModel) and np.ndim(model.coef_) == 1:
+        return CompiledLinearModel(model.coef_, model.intercept_)
+    if isinstance(model, DecisionTreeRegressor) and model.n_outputs_ == 1:
+        return CompiledTreeEnsemble([model.tree_])
+    if isinstance(model, (RandomForestRegressor, ExtraTreesRegressor)) and model.n_outputs_ == 1:
+        return CompiledTreeEnsemble([est.tree_ for est in model.estimators_], average=True)
+    if isinstance(model, GradientBoostingRegressor):
+        if model.init_ == "zero":
+            base = 0.0
+        elif isinstance(model.init_, DummyRegressor):
+            base = float(np.ravel(model.init_.constant_)[0])
+        else:
+            return None
+        return CompiledTreeEnsemble(
+            [est.tree_ for est in model.estimators_[:, 0]],
+            base=base,
+            scale=model.learning_rate,
+        )
+    return None
@@ -0,0 +1,93 @@
+"""Model input encoding shared by the API (single and batch) and the offline scorer.
+
+Column order is the training order: the eight numeric fields, then a one-hot
+block over OCEAN_CATEGORIES. An unknown category encodes as all zeros.
+"""
+from itertools import chain
+from operator import attrgetter
+
+import numpy as np
+
+OCEAN_CATEGORIES = [
+    '<1H OCEAN',
+    'INLAND',
+    'ISLAND',
+    'NEAR BAY',
+    'NEAR OCEAN'
+]
+NUMERIC_FEATURES = [
+    'longitude',
+    'latitude',
+    'housing_median_age',
+    'total_rooms',
+    'total_bedrooms',
+    'population',
+    'households',
+    'median_income',
+]
+N_NUMERIC = len(NUMERIC_FEATURES)
+N_FEATURES = N_NUMERIC + len(OCEAN_CATEGORIES)
+
+# category -> output column, and category -> row of a one-hot table whose last row is all zeros
+CATEGORY_COLUMN = {category: N_NUMERIC + i for i, category in enumerate(OCEAN_CATEGORIES)}
+_CATEGORY_ROW = {category: i for i, category in enumerate(OCEAN_CATEGORIES)}
+_ONE_HOT = np.vstack([np.eye(len(OCEAN_CATEGORIES)), np.zeros(len(OCEAN_CATEGORIES))])
+_ONE_HOT.setflags(write=False)
+_UNKNOWN_ROW = len(OCEAN_CATEGORIES)
+
+_numeric_fields = attrgetter(*NUMERIC_FEATURES)
+
+
+def encode_ocean_proximity(category: str) -> np.ndarray:
+    return _ONE_HOT[_CATEGORY_ROW.get(category, _UNKNOWN_ROW)].copy()
+
+
+def encode_into(out: np.ndarray, rows) -> np.ndarray:
+    """Fill a zeroed ``(len(rows), N_FEATURES)`` float64 array from PredictionInput-like rows."""
+    n = len(rows)
+    # fromiter streams attribute values straight into the buffer, no per-row lists
+    out[:, :N_NUMERIC] = np.fromiter(
+        chain.from_iterable(map(_numeric_fields, rows)), dtype=np.float64, count=n * N_NUMERIC,
+    ).reshape(n, N_NUMERIC)
+    columns = np.fromiter(
+        (CATEGORY_COLUMN.get(data.ocean_proximity, -1) for data in rows), dtype=np.intp, count=n,
+    )
+    known = columns >= 0
+    out[np.flatnonzero(known), columns[known]] = 1.0
+    return out
+
+
+def encode_inputs(rows) -> np.ndarray:
+    return encode_into(np.zeros((len(rows), N_FEATURES), dtype=np.float64), rows)
+
+
+def encode_input(data) -> np.ndarray:
+    """A single row as a ``(1, N_FEATURES)`` matrix, ready for ``predict``."""
+    out = np.zeros((1, N_FEATURES), dtype=np.float64)
+    row = out[0]
+    row[:N_NUMERIC] = _numeric_fields(data)
+    column = CATEGORY_COLUMN.get(data.ocean_proximity)
+    if column is not None:
+        row[column] = 1.0
+    return out
+
+
+def encode_frame(frame) -> np.ndarray:
+    """Column-wise encoding of a housing.csv-shaped DataFrame."""
+    out = np.zeros((len(frame), N_FEATURES), dtype=np.float64)
+    out[:, :N_NUMERIC] = frame[NUMERIC_FEATURES].to_numpy(dtype=np.float64)
+    columns = frame["ocean_proximity"].map(CATEGORY_COLUMN).to_numpy(dtype=np.float64)
+    known = ~np.isnan(columns)
+    out[np.flatnonzero(known), columns[known].astype(np.intp)] = 1.0
+    return out
+
+
+def encode_columns(columns) -> np.ndarray:
+    """``{name: array}`` with ``ocean_proximity`` as OCEAN_CATEGORIES codes (-1 unknown), e.g. a training-store chunk."""
+    codes = np.asarray(columns["ocean_proximity"], dtype=np.intp)
+    out = np.zeros((len(codes), N_FEATURES), dtype=np.float64)
+    for i, name in enumerate(NUMERIC_FEATURES):
+        out[:, i] = columns[name]
+    known = codes >= 0
+    out[np.flatnonzero(known), N_NUMERIC + codes[known]] = 1.0
+    return out
@@ -0,0 +1,98 @@
+import functools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """Coalesces single rows into batches for ``submit_fn``, which returns a Future of the batch's values.
+
+    The batcher thread only collects and submits; results are handed out by a done-callback, so
+    several batches can be in flight at once on a pool with more than one worker.
+    """
+
+    def __init__(self, submit_fn, window_ms: float, max_batch_size: int):
+        self._submit_fn = submit_fn
+        self._window = max(window_ms, 0.0) / 1000.0
+        self._max_batch_size = max(max_batch_size, 1)
+        self._queue = queue.Queue()
+        self._thread = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def submit(self, feature_vector) -> Future:
+        future = Future()
+        # queued under the lock so nothing can land behind shutdown()'s _STOP
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("cannot submit to a MicroBatcher after shutdown")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                self._thread.start()
+            self._queue.put((feature_vector, future))
+        return future
+
+    def predict(self, feature_vector):
+        return self.submit(feature_vector).result()
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._queue.put(_STOP)
+        if thread is not None:
+            thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            stopping = False
+            deadline = time.monotonic() + self._window
+            while len(batch) < self._max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._dispatch(batch)
+            if stopping:
+                return
+
+    def _dispatch(self, batch):
+        try:
+            features = np.array([vector for vector, _ in batch], dtype=np.float64)
+            pending = self._submit_fn(features)
+        except Exception as exc:
+            _fail(batch, exc)
+            return
+        pending.add_done_callback(functools.partial(_resolve, batch))
+
+
+def _fail(batch, exc):
+    for _, future in batch:
+        future.set_exception(exc)
+
+
+def _resolve(batch, pending: Future):
+    try:
+        values = pending.result()
+    except Exception as exc:
+        _fail(batch, exc)
+        return
+    for (_, future), value in zip(batch, values):
+        future.set_result(value)
@@ -0,0 +1,136 @@
+"""Named model artifacts next to the default MODEL_PATH model, and weighted routing between them.
+
+Named models load on first use and at most ``max_loaded`` stay resident: the
+least recently used one is dropped when another is loaded. ``pinned`` models
+(the shadow model) have a slot of their own outside that limit, so background
+scoring never evicts a model that live traffic is using. Routing is sticky
+per user (a CRC of the user id picks the bucket), so a user keeps seeing the
+same version while the split is unchanged, in every worker process.
+"""
+import threading
+import zlib
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import accumulate
+
+DEFAULT_MODEL = "default"
+
+
+class UnknownModel(KeyError):
+    pass
+
+
+class ModelRegistry:
+    def __init__(self, paths: dict, max_loaded: int, loader, pinned=()):
+        if DEFAULT_MODEL in paths:
+            raise ValueError(f"'{DEFAULT_MODEL}' is reserved for MODEL_PATH")
+        self._paths = dict(paths)
+        self.max_loaded = max(1, max_loaded)
+        self.pinned = [name for name in pinned if name in self._paths]
+        self._loader = loader
+        self._resident = OrderedDict()
+        self._pinned = {}
+        self._lock = threading.Lock()
+        self._load_locks = {name: threading.Lock() for name in self._paths}
+        # bumped by clear(); a load that straddles a clear() must not re-cache the old artifact
+        self._generation = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def __contains__(self, name) -> bool:
+        return name in self._paths
+
+    def names(self) -> list[str]:
+        return list(self._paths)
+
+    def path(self, name: str):
+        if name not in self._paths:
+            raise UnknownModel(name)
+        return self._paths[name]
+
+    def peek(self, name: str):
+        """The resident model, or None; never waits for a load (``_lock`` only guards the dict)."""
+        with self._lock:
+            if name in self._pinned:
+                return self._pinned[name]
+            loaded = self._resident.get(name)
+            if loaded is not None:
+                self._resident.move_to_end(name)
+            return loaded
+
+    def get(self, name: str):
+        loaded = self.peek(name)
+        if loaded is not None:
+            return loaded
+        if name not in self._paths:
+            raise UnknownModel(name)
+        # one load per name at a time; other names and cache hits are not blocked
+        with self._load_locks[name]:
+            with self._lock:
+                loaded = self._pinned.get(name) or self._resident.get(name)
+                generation = self._generation
+            if loaded is None:
+                loaded = self._loader(self._paths[name])
+                with self._lock:
+                    self.loads += 1
+                    if generation == self._generation:
+                        self._insert(name, loaded)
+        return loaded
+
+    def _insert(self, name: str, loaded):
+        if name in self.pinned:
+            self._pinned[name] = loaded
+            return
+        self._resident[name] = loaded
+        while len(self._resident) > self.max_loaded:
+            self._resident.popitem(last=False)
+            self.evictions += 1
+
+    def preload(self):
+        """Load the pinned models and as many others as fit in ``max_loaded``."""
+        unpinned = [name for name in self._paths if name not in self.pinned]
+        for name in [*self.pinned, *unpinned[:self.max_loaded]]:
+            self.get(name)
+
+    def clear(self):
+        with self._lock:
+            self._resident.clear()
+            self._pinned.clear()
+            self._generation += 1
+
+    def status(self) -> list[dict]:
+        with self._lock:
+            resident = {**self._resident, **self._pinned}
+        return [
+            {
+                "name": name,
+                "path": str(path),
+                "loaded": name in resident,
+                "pinned": name in self.pinned,
+                "version": resident[name].version if name in resident else None,
+            }
+            for name, path in self._paths.items()
+        ]
+
+
+class ModelRouter:
+    """Weighted choice of a model name, stable for a given key."""
+
+    def __init__(self, weights: dict):
+        if any(weight < 0 for weight in weights.values()):
+            raise ValueError("MODEL_ROUTING weights must be >= 0")
+        total = sum(weights.values())
+        if weights and total <= 0:
+            raise ValueError("MODEL_ROUTING needs at least one positive weight")
+        self.weights = {name: weight / total for name, weight in weights.items() if weight > 0}
+        self._names = list(self.weights)
+        self._bounds = list(accumulate(self.weights.values()))
+
+    def __bool__(self) -> bool:
+        return bool(self._names)
+
+    def choose(self, key) -> str:
+        if not self._names:
+            return DEFAULT_MODEL
+        point = zlib.crc32(str(key).encode()) / 2 ** 32
+        return self._names[min(bisect_right(self._bounds, point), len(self._names) - 1)]
@@ -0,0 +1,85 @@
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+
+from app.services import prediction_service
+
+logger = logging.getLogger(__name__)
+
+_reload_thread = None
+_thread_lock = threading.Lock()
+_last_reload = {}
+
+
+def _reload():
+    started_at = datetime.now(timezone.utc).isoformat()
+    try:
+        loaded = prediction_service.reload_model()
+        _last_reload.update(status="ok", version=loaded.version, started_at=started_at, error=None)
+    except Exception as exc:
+        logger.exception("Model reload failed, keeping the active model")
+        _last_reload.update(status="error", started_at=started_at, error=str(exc))
+
+
+def reload_in_background() -> bool:
+    global _reload_thread
+    with _thread_lock:
+        if _reload_thread is not None and _reload_thread.is_alive():
+            return False
+        _reload_thread = threading.Thread(target=_reload, name="model-reload", daemon=True)
+        _reload_thread.start()
+        return True
+
+
+def wait_for_reload(timeout: float = None) -> None:
+    thread = _reload_thread
+    if thread is not None:
+        thread.join(timeout)
+
+
+def reload_status() -> dict:
+    thread = _reload_thread
+    return {"in_progress": thread is not None and thread.is_alive(), **_last_reload}
+
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class ModelWatcher:
+    def __init__(self, interval_seconds: float):
+        self._interval = interval_seconds
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="model-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        current = _signature(prediction_service.MODEL_PATH)
+        pending = None
+        while not self._stop.wait(self._interval):
+            seen = _signature(prediction_service.MODEL_PATH)
+            if seen is None or seen == current:
+                pending = None
+                continue
+            # only reload once the file has stopped changing between two polls
+            if seen != pending:
+                pending = seen
+                continue
+            current, pending = seen, None
+            logger.info("Model artifact changed, reloading %s", prediction_service.MODEL_PATH)
+            reload_in_background()
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+
+import numpy as np
+
+from app.core.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(model_version: str, feature_vector) -> tuple:
+    # + 0.0 folds -0.0 into 0.0 so equal inputs always share a key
+    return (model_version, tuple((np.asarray(feature_vector, dtype=np.float64) + 0.0).tolist()))
+
+
+class MemoryPredictionCache:
+    backend = "memory"
+
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl_seconds=ttl_seconds)
+
+    async def get(self, key):
+        return self._cache.get(key)
+
+    async def get_many(self, keys) -> list:
+        return [self._cache.get(key) for key in keys]
+
+    async def set(self, key, value: float) -> None:
+        self._cache.set(key, value)
+
+    async def set_many(self, items: dict) -> None:
+        for key, value in items.items():
+            self._cache.set(key, value)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return {"backend": self.backend, **self._cache.stats()}
+
+
+class RedisPredictionCache:
+    """Redis calls block, so they run on a worker thread; short socket timeouts bound how long a
+    slow or unreachable server can hold up the request that is waiting on them."""
+
+    backend = "redis"
+
+    def __init__(self, url: str, ttl_seconds: float, timeout_seconds: float = 0.05, prefix: str = "prediction:"):
+        import redis
+
+        self._client = redis.Redis.from_url(url, socket_timeout=timeout_seconds, socket_connect_timeout=timeout_seconds)
+        self._redis_error = redis.RedisError
+        self._ttl = max(int(ttl_seconds), 1)
+        self._prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _redis_key(self, key) -> str:
+        version, features = key
+        return f"{self._prefix}{version}:" + ",".join(repr(v) for v in features)
+
+    async def get(self, key):
+        [value] = await self.get_many([key])
+        return value
+
+    async def get_many(self, keys) -> list:
+        # the cache is an optimisation: a Redis outage degrades to misses, never to failed predictions
+        try:
+            raw = await asyncio.to_thread(self._client.mget, [self._redis_key(key) for key in keys])
+        except self._redis_error as exc:
+            self.errors += 1
+            logger.warning("Prediction cache read failed: %s", exc)
+            raw = [None] * len(keys)
+        values = [None if item is None else float(item) for item in raw]
+        hits = sum(value is not None for value in values)
+        self.hits += hits
+        self.misses += len(values) - hits
+        return values
+
+    async def set(self, key, value: float) -> None:
+        await self.set_many({key: value})
+
+    async def set_many(self, items: dict) -> None:
+        pipeline = self._client.pipeline(transaction=False)
+        for key, value in items.items():
+            pipeline.set(self._redis_key(key), repr(value), ex=self._ttl)
+        try:
+            await asyncio.to_thread(pipeline.execute)
+        except self._redis_error as exc:
+            self.errors += 1
+            logger.warning("Prediction cache write failed: %s", exc)
+
+    def clear(self) -> None:
+        # keys embed the model version, so entries left behind by a failed clear are never read again
+        try:
+            keys = list(self._client.scan_iter(match=f"{self._prefix}*", count=1000))
+            if keys:
+                self._client.delete(*keys)
+        except self._redis_error as exc:
+            self.errors += 1
+            logger.warning("Prediction cache clear failed: %s", exc)
+
+    def stats(self) -> dict:
+        return {"backend": self.backend, "hits": self.hits, "misses": self.misses, "errors": self.errors}
+
+
+def build_prediction_cache(settings):
+    if settings.PREDICTION_CACHE_BACKEND == "redis":
+        return RedisPredictionCache(
+            settings.REDIS_URL,
+            settings.PREDICTION_CACHE_TTL_SECONDS,
+            timeout_seconds=settings.PREDICTION_CACHE_REDIS_TIMEOUT_SECONDS,
+        )
+    return MemoryPredictionCache(settings.PREDICTION_CACHE_MAXSIZE, settings.PREDICTION_CACHE_TTL_SECONDS)
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import csv
+import io
+from typing import AsyncIterator
+
+import orjson
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.entities.prediction import Prediction
+from app.repositories.prediction_repository import stream_predictions
+
+EXPORT_COLUMNS = [column.name for column in Prediction.__table__.columns]
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _ndjson_chunk(rows: list[dict]) -> bytes:
+    return b"".join(orjson.dumps(dict(row)) + b"\n" for row in rows)
+
+
+def _csv_chunk(rows: list[dict], header: bool) -> str:
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=EXPORT_COLUMNS, lineterminator="\n")
+    if header:
+        writer.writeheader()
+    writer.writerows(rows)
+    return buf.getvalue()
+
+
+async def export_predictions(
+    session_factory: async_sessionmaker,
+    user_id: int,
+    fmt: str,
+    chunk_rows: int = 1000,
+) -> AsyncIterator[str | bytes]:
+    """Encode a user's history chunk by chunk; at most one chunk of rows is held at a time.
+
+    The session is owned by the generator rather than the request, because the
+    response body is produced after request-scoped dependencies have exited.
+    """
+    async with session_factory() as db:
+        header = fmt == "csv"
+        async for rows in stream_predictions(db, user_id, chunk_rows):
+            if fmt == "csv":
+                yield _csv_chunk(rows, header)
+                header = False
+            else:
+                yield _ndjson_chunk(rows)
+        if header:
+            yield _csv_chunk([], header=True)
@@ -1,61 +1,425 @@
+import asyncio
+import csv
+import hashlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
 from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Optional
 
 import joblib
+import numpy as np
 from pathlib import Path
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
+from app.core.executors import BoundedExecutor
+from app.core.metrics import model_predictions_total, stage
 from app.dtos.prediction_dto import PredictionInput
-from app.repositories.prediction_repository import create_prediction
+from app.repositories.prediction_repository import create_prediction, create_predictions, prediction_row
+from app.services.compiled_model import compile_model
+from app.services.feature_encoding import encode_input, encode_inputs
+from app.services.micro_batcher import MicroBatcher
+from app.services.model_registry import DEFAULT_MODEL, ModelRegistry, ModelRouter, UnknownModel
+from app.services.prediction_writer import get_prediction_writer
+from app.services.shadow_scoring import get_shadow_scorer
+from app.services.prediction_cache import build_prediction_cache, cache_key
 
-_model = None
+logger = logging.getLogger(__name__)
 
-MODEL_PATH = Path(settings.MODEL_PATH or "model.joblib")
 
+@dataclass(frozen=True)
+class LoadedModel:
+    model: Any
+    version: str
+    load_seconds: float = 0.0
+    compiled: Any = None
+
+    def predict(self, features):
+        if self.compiled is not None:
+            return self.compiled.predict(features)
+        return self.model.predict(features)
 
-OCEAN_CATEGORIES = [
-    '<1H OCEAN',
-    'INLAND',
-    'ISLAND',
-    'NEAR BAY',
-    'NEAR OCEAN'
-]
 
+_loaded: Optional[LoadedModel] = None
+_load_lock = threading.Lock()
+_batcher = None
+_cache = None
+_model_status = {"status": "not_loaded"}
+# artifact path -> ((mtime_ns, size), fingerprint)
+_versions = {}
+
+MODEL_PATH = Path(settings.MODEL_PATH or "model.joblib")
 
 _DEC_PLACES = Decimal("0.00000001")
 
+
+def _fingerprint(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def _cached_version(path) -> Optional[str]:
+    """The fingerprint from an earlier hash if the file has not changed since (one stat, no read)."""
+    cached = _versions.get(str(path))
+    if cached is None:
+        return None
+    st = os.stat(path)
+    return cached[1] if cached[0] == (st.st_mtime_ns, st.st_size) else None
+
+
+def _artifact_version(path) -> str:
+    st = os.stat(path)
+    version = _fingerprint(path)
+    _versions[str(path)] = ((st.st_mtime_ns, st.st_size), version)
+    return version
+
+
+def _read_model(path: Optional[Path] = None) -> LoadedModel:
+    path = Path(path or MODEL_PATH)
+    started = time.perf_counter()
+    version = _artifact_version(path)
+    model = joblib.load(path, mmap_mode=settings.MODEL_MMAP_MODE or None)
+    compiled = None
+    if settings.MODEL_INFERENCE_MODE == "compiled":
+        compiled = compile_model(model)
+        if compiled is None:
+            logger.warning("No compiled evaluator for %s, using scikit-learn predict", type(model).__name__)
+    return LoadedModel(
+        model=model,
+        version=version,
+        load_seconds=round(time.perf_counter() - started, 6),
+        compiled=compiled,
+    )
+
+
+def _activate(loaded: LoadedModel):
+    global _loaded
+    _loaded = loaded
+    _model_status.update(
+        status="loaded",
+        version=loaded.version,
+        load_seconds=loaded.load_seconds,
+        compiled=loaded.compiled is not None,
+        error=None,
+    )
+    if _cache is not None:
+        _cache.clear()
+
+
+def get_loaded_model() -> LoadedModel:
+    loaded = _loaded
+    if loaded is None:
+        with _load_lock:
+            if _loaded is None:
+                _activate(_read_model())
+            loaded = _loaded
+    return loaded
+
+
+_registry = ModelRegistry(
+    settings.MODEL_REGISTRY,
+    settings.MODEL_REGISTRY_MAX_LOADED,
+    loader=_read_model,
+    pinned=[settings.SHADOW_MODEL] if settings.SHADOW_MODEL else (),
+)
+_router = ModelRouter(settings.MODEL_ROUTING)
+_unrouted = [name for name in _router.weights if name != DEFAULT_MODEL and name not in _registry]
+if _unrouted:
+    raise ValueError(f"MODEL_ROUTING names models missing from MODEL_REGISTRY: {_unrouted}")
+if settings.SHADOW_MODEL and settings.SHADOW_MODEL not in _registry:
+    raise ValueError(f"SHADOW_MODEL {settings.SHADOW_MODEL!r} is not in MODEL_REGISTRY")
+
+
+def get_model(name: str = DEFAULT_MODEL) -> LoadedModel:
+    if name == DEFAULT_MODEL:
+        return get_loaded_model()
+    return _registry.get(name)
+
+
+def select_model(requested: Optional[str], user_id: int) -> str:
+    """The requested model if given, else the MODEL_ROUTING pick for this user; raises UnknownModel."""
+    if requested is None:
+        return _router.choose(user_id)
+    if requested != DEFAULT_MODEL and requested not in _registry:
+        raise UnknownModel(requested)
+    return requested
+
+
+def registry_status() -> dict:
+    return {
+        "models": _registry.status(),
+        "max_loaded": _registry.max_loaded,
+        "pinned": _registry.pinned,
+        "loads": _registry.loads,
+        "evictions": _registry.evictions,
+        "routing": _router.weights or {DEFAULT_MODEL: 1.0},
+    }
+
+
 def load_model():
+    return get_loaded_model().model
+
+
+def model_version(name: str = DEFAULT_MODEL) -> str:
+    return get_model(name).version
+
+
+async def _resolve_version(name: str = DEFAULT_MODEL) -> str:
+    """The version to look up cached values under, read from the artifact's fingerprint rather than
+    by loading it: with a process pool only the workers that score a model need it in memory."""
+    loaded = _loaded if name == DEFAULT_MODEL else _registry.peek(name)
+    if loaded is not None:
+        return loaded.version
+    path = MODEL_PATH if name == DEFAULT_MODEL else _registry.path(name)
+    # hashing a new or republished artifact reads the whole file, so it stays off the event loop
+    return _cached_version(path) or await asyncio.to_thread(_artifact_version, path)
+
+
+def _warm(loaded: LoadedModel) -> float:
+    started = time.perf_counter()
+    loaded.predict(build_feature_matrix([_warmup_row()]))
+    return round(time.perf_counter() - started, 6)
+
+
+def reload_model() -> LoadedModel:
+    with _load_lock:
+        loaded = _read_model()
+        warmup_seconds = _warm(loaded)
+        if inference_executor.kind == "process":
+            # workers hold their own copy; the new pool is loaded and warm before it takes requests
+            inference_executor.replace()
+        _activate(loaded)
+        _model_status.update(status="ready", warmup_seconds=warmup_seconds)
+    # named artifacts may have been republished too; they reload on next use
+    _registry.clear()
+    logger.info("Activated model version %s", loaded.version)
+    return loaded
+
+
+def _warmup_row() -> PredictionInput:
+    try:
+        with open(settings.TRAIN_DATA, newline="") as fh:
+            for row in csv.DictReader(fh):
+                if all(row.values()):
+                    return PredictionInput(**row)
+    except (OSError, ValueError):
+        pass
+    return PredictionInput(
+        longitude=-122.23,
+        latitude=37.88,
+        housing_median_age=41.0,
+        total_rooms=880.0,
+        total_bedrooms=129.0,
+        population=322.0,
+        households=126.0,
+        median_income=8.3252,
+        ocean_proximity="NEAR BAY",
+    )
+
+
+def warm_up_model() -> dict:
+    _model_status.update(status="loading", error=None)
+    try:
+        warmup_seconds = _warm(get_loaded_model())
+        # not ready until every inference worker has loaded and warmed its model too
+        inference_executor.start()
+        _model_status.update(status="ready", warmup_seconds=warmup_seconds)
+        if settings.MODEL_REGISTRY_PRELOAD:
+            _registry.preload()
+    except Exception as exc:
+        logger.exception("Model warm-up failed")
+        _model_status.update(status="error", error=str(exc))
+    return model_status()
+
+
+def model_status() -> dict:
+    return dict(_model_status)
+
+
+def get_prediction_cache():
+    global _cache
+    if _cache is None:
+        _cache = build_prediction_cache(settings)
+    return _cache
+
+
+def _predict_matrix(features, name: str = DEFAULT_MODEL):
+    loaded = get_model(name)
+    return [(raw, loaded.version) for raw in loaded.predict(features)]
+
+
+def score_with_model(features, name: str = DEFAULT_MODEL) -> list[tuple[float, str]]:
+    """Quantized values and version, scored in the calling thread (the shadow scorer's worker)."""
+    return [(quantize_prediction(raw), version) for raw, version in _predict_matrix(features, name)]
+
+
+def _init_inference_worker():
+    try:
+        load_model()
+    except Exception:
+        logger.exception("Inference worker could not preload the model")
+
+
+def _init_inference_process():
+    # a fresh interpreter: the first prediction also pays for lazy imports and caches
+    try:
+        _warm(get_loaded_model())
+    except Exception:
+        logger.exception("Inference worker could not preload the model")
+
+
+inference_executor = BoundedExecutor(
+    "inference",
+    kind=settings.INFERENCE_EXECUTOR,
+    max_workers=settings.INFERENCE_WORKERS,
+    max_pending=settings.INFERENCE_QUEUE_LIMIT,
+    initializer=_init_inference_process if settings.INFERENCE_EXECUTOR == "process" else _init_inference_worker,
+)
+
+
+def _submit_predict_matrix(features):
+    return inference_executor.submit(_predict_matrix, features)
+
+
+def get_batcher() -> MicroBatcher:
+    global _batcher
+    if _batcher is None:
+        _batcher = MicroBatcher(
+            _submit_predict_matrix,
+            window_ms=settings.MICRO_BATCH_WINDOW_MS,
+            max_batch_size=settings.MICRO_BATCH_MAX_SIZE,
+        )
+    return _batcher
+
+
+def shutdown_batcher():
+    global _batcher
+    if _batcher is not None:
+        _batcher.shutdown()
+        _batcher = None
+
+
+def shutdown_inference():
+    shutdown_batcher()
+    inference_executor.shutdown()
+
+
+def build_feature_vector(data: PredictionInput) -> np.ndarray:
+    return encode_input(data)[0]
+
+
+def build_feature_matrix(rows: list[PredictionInput]) -> np.ndarray:
+    return encode_inputs(rows)
+
+
+def quantize_prediction(raw_value) -> float:
+    raw = Decimal(str(raw_value))
+    return float(raw.quantize(_DEC_PLACES, rounding=ROUND_HALF_UP))
+
+
+async def _infer(features: np.ndarray, name: str = DEFAULT_MODEL):
+    # the micro-batcher coalesces rows for the default model only
+    if name == DEFAULT_MODEL and settings.MICRO_BATCH_ENABLED and len(features) == 1:
+        return [await asyncio.wrap_future(get_batcher().submit(features[0]))]
+    return await inference_executor.run(_predict_matrix, features, name)
+
+
+async def _score(features: np.ndarray, name: str = DEFAULT_MODEL) -> tuple[float, str]:
+    feature_vector = features[0]
+    with stage("model_load"):
+        version = await _resolve_version(name)
+
+    key = None
+    if settings.PREDICTION_CACHE_ENABLED:
+        with stage("cache"):
+            key = cache_key(version, feature_vector)
+            cached = await get_prediction_cache().get(key)
+        if cached is not None:
+            return cached, version
+
+    with stage("predict"):
+        [(raw, version)] = await _infer(features, name)
+    with stage("quantize"):
+        value = quantize_prediction(raw)
+
+    if key is not None:
+        await get_prediction_cache().set(cache_key(version, feature_vector), value)
+    return value, version
+
+
+async def _score_many(features: np.ndarray, name: str = DEFAULT_MODEL) -> tuple[list[float], str]:
+    if not settings.PREDICTION_CACHE_ENABLED:
+        results = await _infer(features, name)
+        return [quantize_prediction(raw) for raw, _ in results], results[0][1]
+
+    cache = get_prediction_cache()
+    version = await _resolve_version(name)
+    values = await cache.get_many([cache_key(version, vector) for vector in features])
+    missing = [i for i, value in enumerate(values) if value is None]
+    if missing:
+        results = await _infer(features[missing], name)
+        if results[0][1] != version:
+            # the artifact changed after the lookup: the cached values belong to the old version
+            missing = list(range(len(features)))
+            results = await _infer(features, name)
+        version = results[0][1]
+        for i, (raw, _) in zip(missing, results):
+            values[i] = quantize_prediction(raw)
+        await cache.set_many({cache_key(version, features[i]): values[i] for i in missing})
+    return values, version
 
-    global _model
-    if _model is None:
-        _model = joblib.load(MODEL_PATH)
-    return _model
 
+def _offer_shadow(features: np.ndarray, values, version: str, ids, model: str):
+    shadow = get_shadow_scorer()
+    # an A/B arm already serving the candidate has nothing to compare against
+    if shadow is not None and model != shadow.model_name:
+        shadow.offer(features, values, version, ids)
 
-def encode_ocean_proximity(category: str):
-    return [1 if category == c else 0 for c in OCEAN_CATEGORIES]
 
+async def predict_and_store(db: AsyncSession, user_id: int, data: PredictionInput, model: str = DEFAULT_MODEL):
+    """Returns ``(value, prediction_id, model_version)``."""
+    with stage("features"):
+        features = encode_input(data)
+    value, version = await _score(features, model)
+    model_predictions_total.inc(model, version)
 
-def build_feature_vector(data: PredictionInput):
-    return [
-        data.longitude,
-        data.latitude,
-        data.housing_median_age,
-        data.total_rooms,
-        data.total_bedrooms,
-        data.population,
-        data.households,
-        data.median_income,
-        *encode_ocean_proximity(data.ocean_proximity),
-    ]
+    writer = get_prediction_writer()
+    if writer is not None:
+        with stage("enqueue"):
+            [pred_id] = await writer.ids.allocate(1)
+            await writer.enqueue([prediction_row(user_id, data, value, version, prediction_id=pred_id)])
+    else:
+        with stage("db"):
+            record = await create_prediction(db, user_id=user_id, inp=data, value=value, model_version=version)
+        pred_id = record.id
+    _offer_shadow(features, [value], version, [pred_id], model)
+    return value, pred_id, version
 
 
-def predict_and_store(db: Session, user_id: int, data: PredictionInput):
-    model = load_model()
-    feature_vector = build_feature_vector(data)
+async def predict_batch_and_store(db: AsyncSession, user_id: int, rows: list[PredictionInput],
+                                  model: str = DEFAULT_MODEL):
+    """Returns ``([(value, prediction_id), ...], model_version)``; one model scores the whole batch."""
+    if not rows:
+        return [], None
 
-    raw = Decimal(str(model.predict([feature_vector])[0]))
-    value = float(raw.quantize(_DEC_PLACES, rounding=ROUND_HALF_UP))
+    features = build_feature_matrix(rows)
+    values, version = await _score_many(features, model)
+    model_predictions_total.inc(model, version, amount=len(rows))
 
-    record = create_prediction(db, user_id=user_id, inp=data, value=value)
-    return value, record.id
+    writer = get_prediction_writer()
+    if writer is not None:
+        ids = await writer.ids.allocate(len(rows))
+        await writer.enqueue([
+            prediction_row(user_id, data, value, version, prediction_id=pred_id)
+            for data, value, pred_id in zip(rows, values, ids)
+        ])
+    else:
+        ids = await create_predictions(db, user_id=user_id, inputs=rows, values=values, model_version=version)
+    _offer_shadow(features, values, version, ids, model)
+    return list(zip(values, ids)), version
@@ -0,0 +1,291 @@
+import asyncio
+import logging
+import os
+from collections import deque
+from pathlib import Path
+from typing import Optional
+
+import orjson
+
+from app.core import db as db_module
+from app.core.metrics import prediction_writer_rows_total
+from app.repositories.prediction_repository import (
+    existing_prediction_ids,
+    insert_prediction_rows,
+    max_prediction_id,
+    reserve_prediction_ids,
+)
+
+logger = logging.getLogger(__name__)
+
+_FLUSH_ATTEMPTS = 3
+
+
+class PredictionIdAllocator:
+    """Hands out prediction IDs before the row is written.
+
+    Postgres IDs come from the table's own sequence in blocks, so they never collide with
+    regular inserts. Other databases fall back to a counter seeded from max(id), which is
+    only safe with a single writer process.
+    """
+
+    def __init__(self, session_factory, block_size: int):
+        self._session_factory = session_factory
+        self._block_size = max(int(block_size), 1)
+        self._ids = deque()
+        self._next_local = None
+        self._lock = asyncio.Lock()
+
+    async def allocate(self, count: int = 1) -> list[int]:
+        async with self._lock:
+            while len(self._ids) < count:
+                self._ids.extend(await self._reserve(max(self._block_size, count - len(self._ids))))
+            return [self._ids.popleft() for _ in range(count)]
+
+    async def _reserve(self, count: int):
+        async with self._session_factory() as db:
+            ids = await reserve_prediction_ids(db, count)
+            if ids is not None:
+                return ids
+            if self._next_local is None:
+                self._next_local = await max_prediction_id(db) + 1
+        start = self._next_local
+        self._next_local += count
+        return range(start, start + count)
+
+
+class PredictionWriter:
+    """Batches queued prediction rows into bulk inserts.
+
+    Clients already hold the IDs of queued rows, so a batch that still fails
+    after retries is appended to ``spill_path`` (JSON lines) instead of being
+    thrown away; the next writer to start inserts the spilled rows first,
+    skipping IDs that already made it. A chunk that fails on replay is retried
+    row by row, and rows that still fail go to ``quarantine_path`` so they
+    cannot hold up the rest. Rows are only lost (and counted as ``dropped``)
+    when there is no spill file or it cannot be written.
+    """
+
+    def __init__(self, session_factory, queue_size: int, batch_size: int, flush_interval_ms: float, id_block_size: int,
+                 spill_path=None):
+        self._session_factory = session_factory
+        self._queue = asyncio.Queue(maxsize=max(int(queue_size), 1))
+        self._batch_size = max(int(batch_size), 1)
+        self._flush_interval = max(flush_interval_ms, 0.0) / 1000.0
+        self._spill_path = Path(spill_path) if spill_path else None
+        self._task = None
+        self._inflight = None
+        self._replayed = asyncio.Event()
+        self.ids = PredictionIdAllocator(session_factory, id_block_size)
+        self.counts = {"written": 0, "spilled": 0, "replayed": 0, "quarantined": 0, "dropped": 0}
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def _count(self, outcome: str, amount: int):
+        self.counts[outcome] += amount
+        prediction_writer_rows_total.inc(outcome, amount=amount)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run(), name="prediction-writer")
+
+    async def enqueue(self, rows: list[dict]) -> None:
+        # blocks the caller once the queue is full, pushing back on producers
+        for row in rows:
+            await self._queue.put(row)
+
+    async def _run(self):
+        try:
+            await self._replay_spill()
+        finally:
+            self._replayed.set()
+        while True:
+            batch = [await self._queue.get()]
+            if self._queue.qsize() < self._batch_size - 1:
+                await asyncio.sleep(self._flush_interval)
+            while len(batch) < self._batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            self._inflight = batch
+            await self._flush(batch)
+            self._inflight = None
+            for _ in batch:
+                self._queue.task_done()
+
+    async def _insert(self, rows: list[dict]):
+        async with self._session_factory() as db:
+            await insert_prediction_rows(db, rows)
+
+    async def _flush(self, batch: list[dict]):
+        for attempt in range(_FLUSH_ATTEMPTS):
+            try:
+                await self._insert(batch)
+                self._count("written", len(batch))
+                return
+            except Exception:
+                logger.exception("Flushing %d predictions failed (attempt %d)", len(batch), attempt + 1)
+                await asyncio.sleep(0.1 * 2 ** attempt)
+        await asyncio.to_thread(self._spill, batch)
+
+    def _spill(self, rows: list[dict]):
+        if self._spill_path is None:
+            logger.error("Dropped %d predictions: the flush failed and no spill file is configured", len(rows))
+            self._count("dropped", len(rows))
+            return
+        try:
+            self._append(self._spill_path, rows)
+        except OSError:
+            logger.exception("Dropped %d predictions: could not append them to %s", len(rows), self._spill_path)
+            self._count("dropped", len(rows))
+            return
+        logger.error("Spilled %d unwritten predictions to %s", len(rows), self._spill_path)
+        self._count("spilled", len(rows))
+
+    def _read_spill(self) -> list[dict]:
+        rows = []
+        with open(self._spill_path, "rb") as fh:
+            for line in fh:
+                try:
+                    rows.append(orjson.loads(line))
+                except orjson.JSONDecodeError:
+                    # a line cut short by a crash mid-append
+                    logger.warning("Skipping an unreadable line in %s", self._spill_path)
+        return rows
+
+    @property
+    def quarantine_path(self) -> Optional[Path]:
+        if self._spill_path is None:
+            return None
+        return self._spill_path.with_suffix(".quarantine.jsonl")
+
+    def _append(self, path: Path, rows: list[dict]):
+        with open(path, "ab") as fh:
+            fh.write(b"".join(orjson.dumps(row) + b"\n" for row in rows))
+
+    def _finish_replay(self, pending: list[dict], quarantined: list[dict]):
+        if quarantined:
+            try:
+                self._append(self.quarantine_path, quarantined)
+                logger.error("Moved %d spilled predictions that cannot be inserted to %s",
+                             len(quarantined), self.quarantine_path)
+                self._count("quarantined", len(quarantined))
+            except OSError:
+                logger.exception("Dropped %d predictions: could not append them to %s",
+                                 len(quarantined), self.quarantine_path)
+                self._count("dropped", len(quarantined))
+        if not pending:
+            self._spill_path.unlink()
+            return
+        # atomic, so a crash here leaves either the old file or the new one
+        partial = self._spill_path.with_name(self._spill_path.name + ".tmp")
+        with open(partial, "wb") as fh:
+            fh.write(b"".join(orjson.dumps(row) + b"\n" for row in pending))
+        os.replace(partial, self._spill_path)
+
+    async def _existing_ids(self, rows: list[dict]) -> set:
+        async with self._session_factory() as db:
+            return await existing_prediction_ids(db, [row["id"] for row in rows])
+
+    async def _replay_rows(self, rows: list[dict], quarantined: list[dict]):
+        try:
+            await self._insert(rows)
+        except Exception as exc:
+            if len(rows) > 1:
+                logger.warning("Replaying %d spilled predictions failed; retrying them one by one", len(rows))
+                for row in rows:
+                    await self._replay_rows([row], quarantined)
+                return
+            # only once the database has answered is the row itself to blame; an outage raises here
+            if not await self._existing_ids(rows):
+                logger.error("Spilled prediction %s cannot be inserted: %s", rows[0]["id"], exc)
+                quarantined.extend(rows)
+            return
+        self._count("replayed", len(rows))
+
+    async def _replay_spill(self):
+        if self._spill_path is None or not self._spill_path.exists():
+            return
+        rows = await asyncio.to_thread(self._read_spill)
+        quarantined = [row for row in rows if not isinstance(row, dict) or "id" not in row]
+        rows = [row for row in rows if isinstance(row, dict) and "id" in row]
+        pending = []
+        for start in range(0, len(rows), self._batch_size):
+            chunk = rows[start:start + self._batch_size]
+            try:
+                # a flush can commit and still raise; those rows must not be inserted twice
+                written = await self._existing_ids(chunk)
+                chunk = [row for row in chunk if row["id"] not in written]
+                if chunk:
+                    await self._replay_rows(chunk, quarantined)
+            except Exception:
+                # the database is unreachable: keep the rest (replayed IDs are skipped next time)
+                logger.exception("Replaying %s stopped; %d rows stay for the next start",
+                                 self._spill_path, len(rows) - start)
+                pending = rows[start:]
+                break
+        try:
+            await asyncio.to_thread(self._finish_replay, pending, quarantined)
+        except OSError:
+            logger.exception("Could not rewrite %s; it is replayed again on the next start", self._spill_path)
+            return
+        logger.info("Replayed spilled predictions from %s: %d quarantined, %d left",
+                    self._spill_path, len(quarantined), len(pending))
+
+    async def drain(self):
+        if self._task is not None:
+            await self._replayed.wait()
+        await self._queue.join()
+
+    async def stop(self, timeout: float = 10.0):
+        try:
+            await asyncio.wait_for(self.drain(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Writer did not drain %d queued predictions within %.0fs", self.queue_depth, timeout)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            except Exception:
+                logger.exception("Prediction writer task failed")
+            self._task = None
+        # whatever is still unwritten goes to the spill file for the next start
+        leftover = list(self._inflight or ())
+        self._inflight = None
+        while not self._queue.empty():
+            leftover.append(self._queue.get_nowait())
+            self._queue.task_done()
+        if leftover:
+            self._spill(leftover)
+
+
+_writer: Optional[PredictionWriter] = None
+
+
+def get_prediction_writer() -> Optional[PredictionWriter]:
+    return _writer
+
+
+def start_prediction_writer(settings, session_factory=None) -> PredictionWriter:
+    global _writer
+    _writer = PredictionWriter(
+        session_factory or db_module.AsyncSessionLocal,
+        queue_size=settings.WRITE_BEHIND_QUEUE_SIZE,
+        batch_size=settings.WRITE_BEHIND_BATCH_SIZE,
+        flush_interval_ms=settings.WRITE_BEHIND_FLUSH_INTERVAL_MS,
+        id_block_size=settings.PREDICTION_ID_BLOCK_SIZE,
+        spill_path=settings.WRITE_BEHIND_SPILL_PATH,
+    )
+    _writer.start()
+    return _writer
+
+
+async def stop_prediction_writer():
+    global _writer
+    if _writer is not None:
+        await _writer.stop()
+        _writer = None
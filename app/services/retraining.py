@@ -0,0 +1,237 @@
+"""Refresh the price model from the training store plus labelled production rows.
+
+Both sources are streamed in chunks and encoded by feature_encoding, exactly
+as the API encodes requests. ``partial_fit`` estimators never hold more than
+one chunk; warm-start ensembles add trees fitted on the new rows only.
+Artifacts are written uncompressed (so MODEL_MMAP_MODE works) under a
+timestamped name with a ``.json`` sidecar. ``publish`` swaps one into
+MODEL_PATH atomically, where the model watcher or ``POST /model/reload``
+picks it up.
+"""
+import json
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+import joblib
+import numpy as np
+from sklearn.base import BaseEstimator, RegressorMixin
+from sklearn.ensemble import RandomForestRegressor
+
+from app.services.feature_encoding import NUMERIC_FEATURES, encode_columns, encode_frame
+
+LABEL = "median_house_value"
+DEFAULT_CHUNK_ROWS = 50_000
+PRODUCTION_COLUMNS = [*NUMERIC_FEATURES, "ocean_proximity"]
+
+
+class StreamingLinearRegression(BaseEstimator, RegressorMixin):
+    """Least squares (optionally ridge) from running, centred sufficient statistics.
+
+    ``partial_fit`` merges a chunk's means and cross-products into the totals
+    (Chan et al.'s pairwise update), so any chunking or row order gives the same
+    coefficients as one ``LinearRegression().fit`` over all rows, in one pass.
+    """
+
+    def __init__(self, alpha: float = 0.0):
+        self.alpha = alpha
+
+    def partial_fit(self, X, y):
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        n, x_mean, y_mean = len(X), X.mean(axis=0), y.mean()
+        Xc, yc = X - x_mean, y - y_mean
+        sxx, sxy = Xc.T @ Xc, Xc.T @ yc
+        if getattr(self, "n_samples_seen_", 0):
+            total = self.n_samples_seen_ + n
+            dx, dy = x_mean - self.x_mean_, y_mean - self.y_mean_
+            weight = self.n_samples_seen_ * n / total
+            sxx = self.sxx_ + sxx + weight * np.outer(dx, dx)
+            sxy = self.sxy_ + sxy + weight * dx * dy
+            x_mean = self.x_mean_ + dx * n / total
+            y_mean = self.y_mean_ + dy * n / total
+            n = total
+        self.n_samples_seen_, self.x_mean_, self.y_mean_, self.sxx_, self.sxy_ = n, x_mean, y_mean, sxx, sxy
+
+        if self.alpha:
+            self.coef_ = np.linalg.solve(sxx + self.alpha * np.eye(len(sxx)), sxy)
+        else:
+            # lstsq returns the minimum-norm solution; the one-hot block is collinear once centred
+            self.coef_ = np.linalg.lstsq(sxx, sxy, rcond=None)[0]
+        self.intercept_ = float(y_mean - x_mean @ self.coef_)
+        self.n_features_in_ = X.shape[1]
+        return self
+
+    def fit(self, X, y):
+        self.n_samples_seen_ = 0
+        return self.partial_fit(X, y)
+
+    def predict(self, X):
+        return np.asarray(X, dtype=np.float64) @ self.coef_ + self.intercept_
+
+
+ESTIMATORS = {
+    "linear": StreamingLinearRegression,
+    "forest": lambda: RandomForestRegressor(n_estimators=50, warm_start=True, n_jobs=-1, random_state=0),
+}
+
+
+def refresh_mode(model) -> str:
+    """How ``train`` updates ``model``: ``partial_fit``, ``warm_start`` (add trees) or ``full``."""
+    if hasattr(model, "partial_fit"):
+        return "partial_fit"
+    if getattr(model, "warm_start", False) and hasattr(model, "n_estimators"):
+        return "warm_start"
+    return "full"
+
+
+def iter_store_chunks(chunk_rows: int = DEFAULT_CHUNK_ROWS, path=None) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    from app.services.training_data import load_training_data
+
+    data = load_training_data(path)
+    if LABEL not in data.columns:
+        raise ValueError(f"{data.path} has no {LABEL} column to train on")
+    for chunk in data.iter_chunks(chunk_rows, columns=[*PRODUCTION_COLUMNS, LABEL]):
+        yield encode_columns(chunk), np.asarray(chunk[LABEL], dtype=np.float64)
+
+
+def iter_production_chunks(engine, chunk_rows: int = DEFAULT_CHUNK_ROWS, after: Optional[dict] = None,
+                           progress: Optional[dict] = None) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Predictions with an ``actual_value``, in the order their labels arrived, from a server-side cursor.
+
+    ``after`` is the label cursor (``{"labelled_at": iso, "id": n}``) a previous
+    refresh stopped at; only labels recorded since are read, whatever the age of
+    the prediction itself. ``progress["cursor"]`` tracks the newest label consumed.
+    """
+    import pandas as pd
+    from sqlalchemy import and_, or_, select
+
+    from app.entities.prediction import Prediction
+
+    # Core columns: no mapper configuration, so the User entity need not be imported
+    table = Prediction.__table__
+    query = select(
+        table.c.id, table.c.labelled_at, table.c.actual_value, *(table.c[name] for name in PRODUCTION_COLUMNS)
+    ).where(table.c.actual_value.is_not(None))
+    if after is not None:
+        since = datetime.fromisoformat(after["labelled_at"])
+        query = query.where(or_(
+            table.c.labelled_at > since,
+            and_(table.c.labelled_at == since, table.c.id > after["id"]),
+        ))
+    query = query.order_by(table.c.labelled_at, table.c.id)
+    with engine.connect() as conn:
+        result = conn.execution_options(yield_per=chunk_rows).execute(query)
+        for rows in result.partitions():
+            last = rows[-1]
+            if progress is not None and last.labelled_at is not None:
+                progress["cursor"] = {"labelled_at": last.labelled_at.isoformat(), "id": int(last.id)}
+            frame = pd.DataFrame(rows, columns=list(result.keys()))
+            yield encode_frame(frame), frame["actual_value"].to_numpy(dtype=np.float64)
+
+
+def train(model, sources, epochs: int = 1, add_estimators: int = 10) -> dict:
+    """Fit ``model`` in place from ``sources`` (callables returning ``(X, y)`` chunk iterators); returns a report.
+
+    Rows with a missing feature or label are skipped. ``epochs`` only applies to
+    ``partial_fit`` models; the other modes gather the rows and fit once.
+    """
+    mode = refresh_mode(model)
+    passes = epochs if mode == "partial_fit" else 1
+    totals = {"rows": 0, "skipped": 0}
+    read_seconds = fit_seconds = 0.0
+    buffered = []
+    started = time.perf_counter()
+    for _ in range(passes):
+        for source in sources:
+            chunks = source()
+            while True:
+                t0 = time.perf_counter()
+                chunk = next(chunks, None)
+                read_seconds += time.perf_counter() - t0
+                if chunk is None:
+                    break
+                X, y = chunk
+                valid = np.isfinite(X).all(axis=1) & np.isfinite(y)
+                totals["rows"] += int(valid.sum())
+                totals["skipped"] += int((~valid).sum())
+                if not valid.any():
+                    continue
+                if mode == "partial_fit":
+                    t0 = time.perf_counter()
+                    model.partial_fit(X[valid], y[valid])
+                    fit_seconds += time.perf_counter() - t0
+                else:
+                    buffered.append((X[valid], y[valid]))
+
+    if mode != "partial_fit":
+        if not buffered:
+            raise ValueError("no labelled rows to train on")
+        X = np.concatenate([X for X, _ in buffered])
+        y = np.concatenate([y for _, y in buffered])
+        buffered.clear()
+        if mode == "warm_start" and hasattr(model, "estimators_"):
+            model.n_estimators += add_estimators
+        t0 = time.perf_counter()
+        model.fit(X, y)
+        fit_seconds += time.perf_counter() - t0
+    elif not totals["rows"]:
+        raise ValueError("no labelled rows to train on")
+
+    seconds = time.perf_counter() - started
+    # throughput counts every pass; rows/skipped describe the data itself
+    rows = totals["rows"]
+    return {
+        "estimator": type(model).__name__,
+        "mode": mode,
+        "epochs": passes,
+        "rows": rows // passes,
+        "skipped": totals["skipped"] // passes,
+        "read_seconds": round(read_seconds, 3),
+        "fit_seconds": round(fit_seconds, 3),
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(rows / seconds, 1) if seconds else None,
+        "fit_rows_per_second": round(rows / fit_seconds, 1) if fit_seconds else None,
+    }
+
+
+def metadata_path(artifact: Path) -> Path:
+    return Path(artifact).with_suffix(".json")
+
+
+def read_metadata(artifact: Path) -> dict:
+    try:
+        return json.loads(metadata_path(artifact).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def save_artifact(model, artifact_dir: Path, metadata: dict) -> Path:
+    """Write ``model-<UTC timestamp>.joblib`` and its sidecar; returns the artifact path."""
+    from app.services.prediction_service import _fingerprint
+
+    artifact_dir = Path(artifact_dir)
+    artifact_dir.mkdir(parents=True, exist_ok=True)
+    created = datetime.now(timezone.utc)
+    path = artifact_dir / f"model-{created.strftime('%Y%m%dT%H%M%S%fZ')}.joblib"
+    tmp = path.with_name(path.name + ".tmp")
+    joblib.dump(model, tmp, compress=0)
+    os.replace(tmp, path)
+    metadata = {**metadata, "version": _fingerprint(path), "created_at": created.isoformat()}
+    metadata_path(path).write_text(json.dumps(metadata, indent=2))
+    return path
+
+
+def publish(artifact: Path, model_path: Path) -> Path:
+    """Atomically replace ``model_path`` (and its sidecar) with ``artifact``."""
+    model_path = Path(model_path)
+    for src, dst in ((Path(artifact), model_path), (metadata_path(artifact), metadata_path(model_path))):
+        if not src.exists():
+            continue
+        tmp = dst.with_name(dst.name + ".tmp")
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)
+    return model_path
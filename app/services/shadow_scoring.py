@@ -0,0 +1,157 @@
+"""Score sampled live predictions with a candidate model, off the request path.
+
+A request only pays for a sampling draw and a ``put_nowait``. When the queue
+is full the shadow item is dropped and counted; the request never waits. A
+single background task takes batches from the queue and scores each batch
+with one predict call. That call runs on a dedicated thread rather than the
+inference pool, so live requests never queue behind shadow work. The live and
+shadow values are then bulk-inserted into ``shadow_predictions``.
+"""
+import asyncio
+import logging
+import random
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import numpy as np
+
+from app.core import db as db_module
+from app.core.metrics import shadow_predictions_total
+from app.repositories.shadow_repository import insert_shadow_rows
+
+logger = logging.getLogger(__name__)
+
+
+class ShadowScorer:
+    def __init__(self, model_name: str, score_fn, session_factory, sample_rate: float, queue_size: int,
+                 batch_size: int, random_fn=random.random):
+        self.model_name = model_name
+        self.sample_rate = min(max(float(sample_rate), 0.0), 1.0)
+        # score_fn(features, model_name) -> [(quantized value, version), ...]
+        self._score_fn = score_fn
+        self._session_factory = session_factory
+        self._queue = asyncio.Queue(maxsize=max(int(queue_size), 1))
+        self._batch_size = max(int(batch_size), 1)
+        self._random = random_fn
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+        self._task = None
+        self.counts = {"queued": 0, "dropped": 0, "scored": 0, "failed": 0}
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def _count(self, outcome: str, amount: int = 1):
+        self.counts[outcome] += amount
+        shadow_predictions_total.inc(outcome, amount=amount)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run(), name="shadow-scorer")
+
+    def offer(self, features: np.ndarray, live_values, live_version: str, prediction_ids) -> int:
+        """Queue the sampled rows of ``features``; never blocks. Returns how many were queued."""
+        queued = dropped = 0
+        for vector, value, pred_id in zip(features, live_values, prediction_ids):
+            if self.sample_rate < 1.0 and self._random() >= self.sample_rate:
+                continue
+            try:
+                self._queue.put_nowait((vector, value, live_version, pred_id))
+                queued += 1
+            except asyncio.QueueFull:
+                dropped += 1
+        if queued:
+            self._count("queued", queued)
+        if dropped:
+            self._count("dropped", dropped)
+        return queued
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self._batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            try:
+                await self._process(batch)
+            except Exception:
+                logger.exception("Shadow scoring of %d rows with %s failed", len(batch), self.model_name)
+                self._count("failed", len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _process(self, batch: list):
+        features = np.vstack([vector for vector, *_ in batch])
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(self._executor, self._score_fn, features, self.model_name)
+        rows = [
+            {
+                "prediction_id": pred_id,
+                "live_model_version": live_version,
+                "live_prediction": live_value,
+                "shadow_model": self.model_name,
+                "shadow_model_version": version,
+                "shadow_prediction": value,
+                "divergence": value - live_value,
+            }
+            for (_, live_value, live_version, pred_id), (value, version) in zip(batch, results)
+        ]
+        async with self._session_factory() as db:
+            await insert_shadow_rows(db, rows)
+        self._count("scored", len(rows))
+
+    async def drain(self):
+        await self._queue.join()
+
+    async def stop(self, timeout: float = 5.0):
+        # shadow rows are best effort: give queued work a moment, then drop it
+        try:
+            await asyncio.wait_for(self.drain(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Dropping %d queued shadow rows on shutdown", self.queue_depth)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._executor.shutdown(wait=False)
+
+    def status(self) -> dict:
+        return {
+            "model": self.model_name,
+            "sample_rate": self.sample_rate,
+            "queue_depth": self.queue_depth,
+            **self.counts,
+        }
+
+
+_scorer: Optional[ShadowScorer] = None
+
+
+def get_shadow_scorer() -> Optional[ShadowScorer]:
+    return _scorer
+
+
+def start_shadow_scorer(settings, score_fn, session_factory=None) -> ShadowScorer:
+    global _scorer
+    _scorer = ShadowScorer(
+        settings.SHADOW_MODEL,
+        score_fn,
+        session_factory or db_module.AsyncSessionLocal,
+        sample_rate=settings.SHADOW_SAMPLE_RATE,
+        queue_size=settings.SHADOW_QUEUE_SIZE,
+        batch_size=settings.SHADOW_BATCH_SIZE,
+    )
+    _scorer.start()
+    return _scorer
+
+
+async def stop_shadow_scorer():
+    global _scorer
+    if _scorer is not None:
+        await _scorer.stop()
+        _scorer = None
@@ -0,0 +1,231 @@
+"""Columnar, memory-mapped copy of the training CSV.
+
+``housing.csv`` is converted once into a directory of ``.npy`` files, one per
+column, plus ``manifest.json``. Numeric columns are float64 (missing values
+stay NaN). ``ocean_proximity`` is stored as int8 codes into OCEAN_CATEGORIES
+(-1 when missing), so a code is also the offset of its one-hot column.
+Later loads ``np.load(mmap_mode="r")`` each column: opening is O(1) and only
+the pages a caller touches are read. The store is rebuilt when the CSV's size
+or mtime changes.
+"""
+import io
+import json
+import logging
+import os
+import shutil
+import tempfile
+import typing
+from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.dtos.prediction_dto import PredictionInput
+from app.services.feature_encoding import OCEAN_CATEGORIES
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+DEFAULT_CHUNK_ROWS = 100_000
+# dictionary-encoded columns and their code order
+CATEGORICAL_COLUMNS = {"ocean_proximity": OCEAN_CATEGORIES}
+FEATURE_COLUMNS = list(PredictionInput.model_fields)
+
+# the largest header any store can need; the real one is written over it once the row count is known
+_MAX_ROWS = 10 ** 15
+
+
+def _check_categories():
+    for name, field in PredictionInput.model_fields.items():
+        if typing.get_origin(field.annotation) is typing.Literal:
+            missing = set(typing.get_args(field.annotation)) - set(CATEGORICAL_COLUMNS.get(name, ()))
+            if missing:
+                raise RuntimeError(f"PredictionInput.{name} allows {sorted(missing)}, which the store cannot encode")
+
+
+_check_categories()
+
+
+def default_store_path(src) -> Path:
+    src = Path(src)
+    return src.with_name(f"{src.stem}.columns")
+
+
+def _source_stamp(src: Path) -> dict:
+    stat = src.stat()
+    return {"path": str(src.resolve()), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _schema(header) -> dict:
+    """Column name -> dtype/categories; every PredictionInput field is required."""
+    missing = [name for name in FEATURE_COLUMNS if name not in header]
+    if missing:
+        raise ValueError(f"training data is missing PredictionInput columns: {missing}")
+    columns = {}
+    for name in header:
+        if name in CATEGORICAL_COLUMNS:
+            columns[name] = {"dtype": "int8", "categories": list(CATEGORICAL_COLUMNS[name])}
+        else:
+            columns[name] = {"dtype": "float64"}
+    return columns
+
+
+def _npy_header(dtype, rows: int) -> bytes:
+    buffer = io.BytesIO()
+    np.lib.format.write_array_header_1_0(
+        buffer, {"descr": np.lib.format.dtype_to_descr(np.dtype(dtype)), "fortran_order": False, "shape": (rows,)},
+    )
+    return buffer.getvalue()
+
+
+def _encode_categories(values, name: str, categories) -> np.ndarray:
+    codes = values.map({category: i for i, category in enumerate(categories)}).to_numpy(dtype=np.float64)
+    absent = np.isnan(codes)
+    unknown = absent & values.notna().to_numpy()
+    if unknown.any():
+        raise ValueError(f"{name} has values outside {categories}: {sorted(set(values[unknown]))[:5]}")
+    codes[absent] = -1
+    return codes.astype(np.int8)
+
+
+def convert_csv(src, dst=None, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Path:
+    """Stream ``src`` into a columnar store at ``dst``; memory use is bounded by ``chunk_rows``."""
+    import pandas as pd
+
+    src = Path(src)
+    dst = Path(dst) if dst is not None else default_store_path(src)
+    stamp = _source_stamp(src)
+    columns = _schema(list(pd.read_csv(src, nrows=0).columns))
+    dtypes = {name: "object" if "categories" in spec else "float64" for name, spec in columns.items()}
+
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(dir=dst.parent, prefix=f".{dst.name}."))
+    try:
+        handles = {name: open(tmp / f"{name}.npy", "wb") for name in columns}
+        rows = 0
+        try:
+            for name, handle in handles.items():
+                handle.write(_npy_header(columns[name]["dtype"], _MAX_ROWS))
+            try:
+                chunks = pd.read_csv(src, dtype=dtypes, chunksize=chunk_rows)
+                for chunk in chunks:
+                    for name, spec in columns.items():
+                        if "categories" in spec:
+                            values = _encode_categories(chunk[name], name, spec["categories"])
+                        else:
+                            values = chunk[name].to_numpy(dtype=np.float64)
+                        values.tofile(handles[name])
+                    rows += len(chunk)
+            except ValueError as exc:
+                raise ValueError(f"{src}: {exc}") from exc
+            for name, handle in handles.items():
+                header = _npy_header(columns[name]["dtype"], rows)
+                handle.seek(0)
+                handle.write(header)
+        finally:
+            for handle in handles.values():
+                handle.close()
+
+        manifest = {"format": FORMAT_VERSION, "rows": rows, "source": stamp, "columns": columns}
+        (tmp / MANIFEST).write_text(json.dumps(manifest, indent=2))
+        _publish(tmp, dst)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    logger.info("Converted %s to %s (%d rows)", src, dst, rows)
+    return dst
+
+
+def _publish(tmp: Path, dst: Path):
+    if dst.exists():
+        stale = Path(tempfile.mkdtemp(dir=dst.parent, prefix=f".{dst.name}.old."))
+        os.replace(dst, stale)
+        shutil.rmtree(stale, ignore_errors=True)
+    try:
+        os.replace(tmp, dst)
+    except OSError:
+        # another worker published the same conversion first; keep theirs
+        if not (dst / MANIFEST).is_file():
+            raise
+
+
+class TrainingData:
+    """Read-only view of a columnar store; columns are memory-mapped on first access."""
+
+    def __init__(self, path: Path, manifest: dict):
+        self.path = path
+        self.manifest = manifest
+        self._columns = {}
+
+    @classmethod
+    def open(cls, path) -> "TrainingData":
+        path = Path(path)
+        manifest = json.loads((path / MANIFEST).read_text())
+        if manifest.get("format") != FORMAT_VERSION:
+            raise ValueError(f"{path} has store format {manifest.get('format')}, expected {FORMAT_VERSION}")
+        _schema(list(manifest["columns"]))
+        return cls(path, manifest)
+
+    def __len__(self) -> int:
+        return self.manifest["rows"]
+
+    @property
+    def columns(self) -> list[str]:
+        return list(self.manifest["columns"])
+
+    def categories(self, name: str) -> list[str]:
+        return self.manifest["columns"][name]["categories"]
+
+    def is_current(self, src: Path) -> bool:
+        return self.manifest["source"] == _source_stamp(src)
+
+    def column(self, name: str) -> np.ndarray:
+        array = self._columns.get(name)
+        if array is None:
+            if name not in self.manifest["columns"]:
+                raise KeyError(f"{self.path} has no column {name!r}")
+            array = np.load(self.path / f"{name}.npy", mmap_mode="r")
+            if len(array) != len(self):
+                raise ValueError(f"{self.path / name}.npy has {len(array)} rows, manifest says {len(self)}")
+            self._columns[name] = array
+        return array
+
+    def iter_chunks(self, chunk_rows: int = DEFAULT_CHUNK_ROWS, columns=None) -> Iterator[dict]:
+        """Yield ``{column: array}`` slices of at most ``chunk_rows``; the arrays are views into the maps."""
+        names = list(columns or self.columns)
+        arrays = [self.column(name) for name in names]
+        for start in range(0, len(self), chunk_rows):
+            yield {name: array[start:start + chunk_rows] for name, array in zip(names, arrays)}
+
+    def to_frame(self, columns=None, start: int = 0, stop: Optional[int] = None):
+        """Rows ``start:stop`` as a DataFrame with categories decoded back to strings."""
+        import pandas as pd
+
+        data = {}
+        for name in columns or self.columns:
+            values = self.column(name)[start:stop]
+            if "categories" in self.manifest["columns"][name]:
+                values = pd.Categorical.from_codes(np.asarray(values), categories=self.categories(name))
+            data[name] = values
+        return pd.DataFrame(data)
+
+
+def load_training_data(path=None, store=None) -> TrainingData:
+    """Open the store for ``path`` (default TRAIN_DATA), converting the CSV first if the store is missing or stale.
+
+    ``path`` may also be a store directory, in which case no CSV is needed.
+    """
+    src = Path(path or settings.TRAIN_DATA)
+    if (src / MANIFEST).is_file():
+        return TrainingData.open(src)
+    if not src.is_file():
+        raise FileNotFoundError(f"training data not found: {src}")
+    store = Path(store or settings.TRAIN_DATA_STORE or default_store_path(src))
+    try:
+        data = TrainingData.open(store)
+        if data.is_current(src):
+            return data
+    except (OSError, ValueError, KeyError):
+        pass
+    return TrainingData.open(convert_csv(src, store))
@@ -1,36 +1,42 @@
+from sqlalchemy import delete, select
+
 from app.entities.user import User
+from app.services.auth_service import clear_principals, invalidate_principal
 
 
-def list_users(db):
-    return db.query(User).all()
+async def list_users(db):
+    return list(await db.scalars(select(User)))
 
 
-def get_user_by_id(db, user_id):
-    return db.get(User, user_id)
+async def get_user_by_id(db, user_id):
+    return await db.get(User, user_id)
 
 
-def update_user(db, user_id, username=None):
-    user = db.get(User, user_id)
+async def update_user(db, user_id, username=None):
+    user = await db.get(User, user_id)
     if not user:
         return None
     if username is not None:
         user.username = username
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    invalidate_principal(user_id)
+    await db.refresh(user)
     return user
 
 
-def delete_user(db, user_id):
-    user = db.get(User, user_id)
+async def delete_user(db, user_id):
+    user = await db.get(User, user_id)
     if not user:
         return False
-    db.delete(user)
-    db.commit()
+    await db.delete(user)
+    await db.commit()
+    invalidate_principal(user_id)
     return True
 
 
-def delete_all_users(db):
-    count = db.query(User).delete(synchronize_session=False)
-    db.commit()
-    return count
+async def delete_all_users(db):
+    result = await db.execute(delete(User))
+    await db.commit()
+    clear_principals()
+    return result.rowcount
@@ -0,0 +1,94 @@
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import (
+    API_PREFIX,
+    PREDICT_PAYLOAD,
+    add_report_arguments,
+    drive,
+    finish_report,
+    percentiles,
+    prepare_environment,
+    register_and_login,
+)
+
+SCENARIOS = ("predict", "login", "history")
+
+
+async def _scenario(count, concurrency, make_request):
+    started = time.perf_counter()
+    samples, statuses = await drive(count, concurrency, make_request)
+    wall = time.perf_counter() - started
+    return {
+        **percentiles(samples),
+        "throughput_rps": round(count / wall, 2),
+        "concurrency": concurrency,
+        "statuses": statuses,
+    }
+
+
+async def _run(args):
+    import httpx
+
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            credentials, headers = await register_and_login(client)
+
+            def predict(i):
+                # vary the row so a warm prediction cache cannot short-circuit the model
+                payload = {**PREDICT_PAYLOAD, "median_income": PREDICT_PAYLOAD["median_income"] + i * 1e-6}
+                return client.post(f"{API_PREFIX}/predict", json=payload, headers=headers)
+
+            def login(_):
+                return client.post(f"{API_PREFIX}/auth/login-with-token", json=credentials)
+
+            def history(_):
+                return client.get(f"{API_PREFIX}/predict", params={"limit": args.history_limit}, headers=headers)
+
+            requests = {"predict": predict, "login": login, "history": history}
+            counts = {"predict": args.requests, "login": args.logins, "history": args.requests}
+
+            results = {}
+            for name in args.scenarios:
+                await drive(args.warmup, args.concurrency, requests[name])
+                results[name] = await _scenario(counts[name], args.concurrency, requests[name])
+
+    return {
+        "database": os.environ["DATABASE_URL"].split(":", 1)[0],
+        "executor": args.executor,
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive the API hot paths in-process and report latency/throughput.")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=500, help="requests per predict/history scenario")
+    parser.add_argument("--logins", type=int, default=50, help="requests in the login scenario (bcrypt-bound)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--history-limit", type=int, default=100)
+    parser.add_argument("--executor", choices=["thread", "process"], default="process")
+    parser.add_argument("--database-url", help="run against this database instead of a throwaway SQLite file")
+    add_report_arguments(parser)
+    args = parser.parse_args(argv)
+
+    # the benchmark user would otherwise trip the production limits within a second
+    os.environ.setdefault("RATE_LIMIT", "1000000/minute")
+    os.environ.setdefault("PREDICT_RATE_LIMIT", "1000000/minute")
+    with tempfile.TemporaryDirectory() as tmp:
+        prepare_environment(Path(tmp), args.executor, args.database_url)
+        report = asyncio.run(_run(args))
+    return finish_report(report, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+API_PREFIX = "/api-deutsche"
+
+PREDICT_PAYLOAD = {
+    "longitude": -122.23,
+    "latitude": 37.88,
+    "housing_median_age": 41.0,
+    "total_rooms": 880.0,
+    "total_bedrooms": 129.0,
+    "population": 322.0,
+    "households": 126.0,
+    "median_income": 8.3252,
+    "ocean_proximity": "NEAR BAY",
+}
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        "count": len(ordered),
+        "p50_ms": round(pick(0.50), 3),
+        "p95_ms": round(pick(0.95), 3),
+        "p99_ms": round(pick(0.99), 3),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+    }
+
+
+def prepare_environment(workdir: Path, executor: str = "process", database_url: Optional[str] = None):
+    """Point the app at a throwaway SQLite file (or ``database_url``) before it is imported."""
+    import joblib
+    import numpy as np
+    import pandas as pd
+    from sklearn.linear_model import LinearRegression
+
+    model_path = Path(os.environ.get("MODEL_PATH", REPO_ROOT / "model.joblib"))
+    if not model_path.exists():
+        # stand-in model so the benchmark runs without the production artifact
+        frame = pd.read_csv(REPO_ROOT / "housing.csv").dropna()
+        categories = ['<1H OCEAN', 'INLAND', 'ISLAND', 'NEAR BAY', 'NEAR OCEAN']
+        numeric = frame.drop(columns=["median_house_value", "ocean_proximity"]).to_numpy(dtype=np.float64)
+        one_hot = np.column_stack([(frame["ocean_proximity"] == c).to_numpy(dtype=np.float64) for c in categories])
+        model_path = workdir / "model.joblib"
+        joblib.dump(LinearRegression().fit(np.hstack([numeric, one_hot]), frame["median_house_value"]), model_path)
+
+    os.environ["MODEL_PATH"] = str(model_path)
+    os.environ["DATABASE_URL"] = database_url or f"sqlite:///{workdir / 'bench.db'}"
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ["INFERENCE_EXECUTOR"] = executor
+    os.environ["PREDICTION_CACHE_ENABLED"] = "false"
+    sys.path.insert(0, str(REPO_ROOT))
+
+
+async def timed(samples, coro):
+    started = time.perf_counter()
+    response = await coro
+    samples.append(time.perf_counter() - started)
+    return response
+
+
+async def drive(count, concurrency, make_request):
+    samples, statuses = [], {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            response = await timed(samples, make_request(i))
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    await asyncio.gather(*(one(i) for i in range(count)))
+    return samples, statuses
+
+
+async def register_and_login(client, username="bench_user", password="bench-password"):
+    credentials = {"username": username, "password": password}
+    await client.post(f"{API_PREFIX}/auth/register", json=credentials)
+    token = (await client.post(f"{API_PREFIX}/auth/login", json=credentials)).json()["access_token"]
+    return credentials, {"Authorization": f"Bearer {token}"}
+
+
+# metric -> direction; anything else in a result is informational
+_LOWER_IS_BETTER = ("p95_ms", "p99_ms", "best_ms", "us_per_call")
+_HIGHER_IS_BETTER = ("throughput_rps",)
+
+
+def find_regressions(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Compare ``results`` sections of two reports; ``threshold`` is a fraction (0.1 = 10%)."""
+    regressions = []
+    for name, result in current.get("results", {}).items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            continue
+        for metric in _LOWER_IS_BETTER:
+            if metric in result and before.get(metric) and result[metric] > before[metric] * (1 + threshold):
+                regressions.append(f"{name}.{metric}: {before[metric]} -> {result[metric]}")
+        for metric in _HIGHER_IS_BETTER:
+            if metric in result and before.get(metric) and result[metric] < before[metric] * (1 - threshold):
+                regressions.append(f"{name}.{metric}: {before[metric]} -> {result[metric]}")
+    return regressions
+
+
+def add_report_arguments(parser):
+    parser.add_argument("--output", type=Path, help="write the JSON report here")
+    parser.add_argument("--baseline", type=Path, help="JSON report from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="fail when a metric is this fraction worse than the baseline")
+
+
+def finish_report(report: dict, args) -> int:
+    """Print/write ``report``; return the process exit code (1 on regression)."""
+    regressions = []
+    if args.baseline:
+        regressions = find_regressions(report, json.loads(args.baseline.read_text()), args.threshold)
+        report["regressions"] = regressions
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text)
+    print(text)
+    if regressions:
+        print(f"{len(regressions)} metric(s) regressed more than {args.threshold:.0%}", file=sys.stderr)
+        return 1
+    return 0
@@ -0,0 +1,92 @@
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import add_report_arguments, finish_report, prepare_environment
+
+
+async def _seed(session_factory, user_id: int, rows: int):
+    from sqlalchemy import insert
+
+    from app.entities.prediction import Prediction
+    from app.entities.user import User
+
+    async with session_factory() as db:
+        db.add(User(id=user_id, username="history_bench", password_hash="x"))
+        await db.commit()
+        base = {
+            "user_id": user_id, "longitude": -122.23, "latitude": 37.88, "housing_median_age": 41.0,
+            "total_rooms": 880.0, "total_bedrooms": 129.0, "population": 322.0, "households": 126.0,
+            "median_income": 8.3252, "ocean_proximity": "NEAR BAY", "model_version": "bench",
+        }
+        await db.execute(insert(Prediction), [{**base, "prediction": 400000.0 + i * 0.01} for i in range(rows)])
+        await db.commit()
+
+
+async def _orm_pydantic(db, user_id, rows):
+    # the previous path: ORM objects -> PredictionRead -> jsonable_encoder -> json
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+
+    from app.dtos.prediction_dto import PredictionRead
+    from app.repositories.prediction_repository import list_predictions
+
+    records = await list_predictions(db, user_id=user_id, limit=rows)
+    models = TypeAdapter(list[PredictionRead]).validate_python(records, from_attributes=True)
+    return json.dumps(jsonable_encoder(models)).encode()
+
+
+async def _rows_orjson(db, user_id, rows):
+    from fastapi.responses import ORJSONResponse
+
+    from app.repositories.prediction_repository import list_prediction_rows
+
+    return ORJSONResponse(await list_prediction_rows(db, user_id=user_id, limit=rows)).body
+
+
+async def _run(args):
+    from app.core.db import AsyncSessionLocal, init_db
+
+    await init_db()
+    await _seed(AsyncSessionLocal, 1, args.rows)
+
+    paths = {"orm_pydantic_json": _orm_pydantic, "rows_orjson": _rows_orjson}
+    results, bodies = {}, {}
+    for name, path in paths.items():
+        samples = []
+        for _ in range(args.repeat):
+            async with AsyncSessionLocal() as db:
+                started = time.perf_counter()
+                bodies[name] = await path(db, 1, args.rows)
+                samples.append(time.perf_counter() - started)
+        results[name] = {
+            "rows": args.rows,
+            "best_ms": round(min(samples) * 1000, 3),
+            "body_bytes": len(bodies[name]),
+        }
+    assert json.loads(bodies["orm_pydantic_json"]) == json.loads(bodies["rows_orjson"]), "paths disagree"
+    speedup = results["orm_pydantic_json"]["best_ms"] / results["rows_orjson"]["best_ms"]
+    return {"speedup": round(speedup, 2), "results": results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Compare ORM+Pydantic+json against DB rows+orjson for a large prediction history."
+    )
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    add_report_arguments(parser)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        prepare_environment(Path(tmp), "thread")
+        report = asyncio.run(_run(args))
+    return finish_report(report, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+import argparse
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.common import (
+    API_PREFIX,
+    PREDICT_PAYLOAD,
+    add_report_arguments,
+    drive,
+    finish_report,
+    percentiles,
+    prepare_environment,
+    register_and_login,
+)
+
+
+async def _run(args):
+    import httpx
+
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            credentials, headers = await register_and_login(client)
+
+            def predict(_):
+                return client.post(f"{API_PREFIX}/predict", json=PREDICT_PAYLOAD, headers=headers)
+
+            def login(_):
+                return client.post(f"{API_PREFIX}/auth/login", json=credentials)
+
+            await drive(20, args.predict_concurrency, predict)
+            baseline, baseline_statuses = await drive(args.predicts, args.predict_concurrency, predict)
+
+            (during, during_statuses), (logins, login_statuses) = await asyncio.gather(
+                drive(args.predicts, args.predict_concurrency, predict),
+                drive(args.logins, args.login_concurrency, login),
+            )
+
+    return {
+        "executor": args.executor,
+        "results": {
+            "predict_baseline": {**percentiles(baseline), "statuses": baseline_statuses},
+            "predict_during_login_burst": {**percentiles(during), "statuses": during_statuses},
+            "login_burst": {**percentiles(logins), "statuses": login_statuses},
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure predict latency while a burst of logins hits the API.")
+    parser.add_argument("--predicts", type=int, default=300)
+    parser.add_argument("--predict-concurrency", type=int, default=8)
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--login-concurrency", type=int, default=32)
+    parser.add_argument("--executor", choices=["thread", "process"], default="process")
+    add_report_arguments(parser)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        prepare_environment(Path(tmp), args.executor)
+        report = asyncio.run(_run(args))
+    return finish_report(report, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
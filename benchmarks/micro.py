@@ -0,0 +1,46 @@
+import argparse
+import os
+import sys
+import timeit
+
+from benchmarks.common import PREDICT_PAYLOAD, REPO_ROOT, add_report_arguments, finish_report
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+
+def _cases():
+    sys.path.insert(0, str(REPO_ROOT))
+    from app.dtos.prediction_dto import PredictionInput
+    from app.services.feature_encoding import encode_input, encode_inputs, encode_ocean_proximity
+    from app.services.prediction_service import build_feature_vector, quantize_prediction
+
+    data = PredictionInput(**PREDICT_PAYLOAD)
+    batch = [data] * 100
+    return {
+        "build_feature_vector": lambda: build_feature_vector(data),
+        "encode_ocean_proximity": lambda: encode_ocean_proximity("NEAR BAY"),
+        "encode_input": lambda: encode_input(data),
+        "encode_inputs_100_rows": lambda: encode_inputs(batch),
+        "quantize_prediction": lambda: quantize_prediction(452600.123456789),
+    }
+
+
+def _measure(fn, repeat: int, number: int) -> dict:
+    # best of `repeat` is the least noisy estimate of the per-call cost
+    best = min(timeit.repeat(fn, repeat=repeat, number=number)) / number
+    return {"us_per_call": round(best * 1e6, 4), "number": number}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmark the per-row feature and rounding helpers.")
+    parser.add_argument("--number", type=int, default=100000, help="calls per timing run")
+    parser.add_argument("--repeat", type=int, default=5)
+    add_report_arguments(parser)
+    args = parser.parse_args(argv)
+
+    report = {"results": {name: _measure(fn, args.repeat, args.number) for name, fn in _cases().items()}}
+    return finish_report(report, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
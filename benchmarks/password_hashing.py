@@ -0,0 +1,49 @@
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+
+def _measure(rounds: int, seconds: float) -> dict:
+    from app.core.security import build_password_context
+
+    context = build_password_context(rounds)
+    hashed = context.hash("benchmark-password")
+    context.verify("benchmark-password", hashed)
+
+    count = 0
+    started = time.perf_counter()
+    while True:
+        context.verify("benchmark-password", hashed)
+        count += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= seconds:
+            break
+    return {
+        "rounds": rounds,
+        "verify_ms": round(elapsed / count * 1000, 3),
+        # bcrypt releases the GIL, so one core per PASSWORD_HASH_WORKERS thread
+        "logins_per_sec_per_core": round(count / elapsed, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report bcrypt verify cost (logins/sec per core) per BCRYPT_ROUNDS.")
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 11, 12, 13])
+    parser.add_argument("--seconds", type=float, default=2.0, help="time budget per cost setting")
+    parser.add_argument("--output", type=Path, help="write the JSON report here")
+    args = parser.parse_args(argv)
+
+    report = {"results": [_measure(rounds, args.seconds) for rounds in args.rounds]}
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+
+def _commands_processed(uri: str):
+    """Server-side command counter, or None for in-process storage."""
+    if not uri.startswith("redis"):
+        return None
+    import redis
+
+    return redis.Redis.from_url(uri).info("stats")["total_commands_processed"]
+
+
+def _measure(uri: str, strategy: str, limit: str, checks: int, users: int) -> dict:
+    from limits import parse, storage, strategies
+
+    store = storage.storage_from_string(uri)
+    item = parse(limit)
+    limiter = strategies.STRATEGIES[strategy](store)
+    limiter.hit(item, "bench", "warmup")
+    commands_before = _commands_processed(uri)
+
+    started = time.perf_counter()
+    for i in range(checks):
+        limiter.hit(item, "bench", f"user:{i % users}")
+    elapsed = time.perf_counter() - started
+    commands_after = _commands_processed(uri)
+    store.reset()
+
+    report = {
+        "storage": uri.split("://", 1)[0],
+        "strategy": strategy,
+        "checks": checks,
+        "us_per_check": round(elapsed / checks * 1e6, 2),
+    }
+    if commands_before is not None:
+        # the INFO call that produced commands_after is counted too
+        report["round_trips_per_check"] = round((commands_after - commands_before - 1) / checks, 3)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the cost of one rate-limit check per storage backend.")
+    parser.add_argument("--checks", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--limit", default="1200/minute")
+    parser.add_argument("--strategy", default="moving-window")
+    parser.add_argument("--redis-url", help="also measure against this redis server")
+    parser.add_argument("--output", type=Path, help="write the JSON report here")
+    args = parser.parse_args(argv)
+
+    uris = ["memory://"] + ([args.redis_url] if args.redis_url else [])
+    report = {"results": [_measure(uri, args.strategy, args.limit, args.checks, args.users) for uri in uris]}
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
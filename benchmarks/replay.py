@@ -0,0 +1,215 @@
+"""Replay captured API traffic and check latency and predictions against the capture.
+
+Capture format: JSON Lines, one request per line::
+
+    {"ts": 1718035200.125, "method": "POST", "path": "/api-deutsche/predict",
+     "body": {...}, "status": 200, "response": {"prediction": 452600.0, ...}}
+
+``ts`` (seconds, any origin) drives the pacing; ``body``, ``status`` and
+``response`` are optional. Lines without ``method``/``path`` are counted as
+skipped, so pointing the tool at an unrelated JSONL file is harmless.
+Captured credentials are never replayed: every request is sent as one
+benchmark user.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Iterator
+
+from benchmarks.common import (
+    add_report_arguments,
+    finish_report,
+    percentiles,
+    prepare_environment,
+    register_and_login,
+)
+
+
+def iter_records(paths: list[Path], stats: dict) -> Iterator[dict]:
+    """Yield capture records one line at a time; never holds a whole file."""
+    for path in paths:
+        with open(path, encoding="utf-8") as handle:
+            for line in handle:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    stats["skipped"] += 1
+                    continue
+                if not isinstance(record, dict) or "method" not in record or "path" not in record:
+                    stats["skipped"] += 1
+                    continue
+                yield record
+
+
+def _prediction_matches(record: dict, body, tolerance: float):
+    """None when there is nothing to compare, otherwise whether the prediction agrees."""
+    recorded = record.get("response")
+    expected = recorded.get("prediction") if isinstance(recorded, dict) else None
+    if expected is None or not isinstance(body, dict) or "prediction" not in body:
+        return None
+    return math.isclose(body["prediction"], expected, rel_tol=0.0, abs_tol=tolerance)
+
+
+class _Collector:
+    def __init__(self, max_examples: int = 5):
+        self.samples = {}
+        self.statuses = {}
+        self.status_mismatches = 0
+        self.prediction_checks = 0
+        self.prediction_mismatches = 0
+        self.mismatch_examples = []
+        self.transport_errors = 0
+        self.error_examples = []
+        self.max_examples = max_examples
+
+    def add(self, record, status, body, elapsed, tolerance):
+        route = f"{record['method'].upper()} {record['path'].split('?', 1)[0]}"
+        self.samples.setdefault(route, []).append(elapsed)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if "status" in record and record["status"] != status:
+            self.status_mismatches += 1
+        matched = _prediction_matches(record, body, tolerance)
+        if matched is not None:
+            self.prediction_checks += 1
+            if not matched:
+                self.prediction_mismatches += 1
+                if len(self.mismatch_examples) < self.max_examples:
+                    self.mismatch_examples.append(
+                        {"path": record["path"], "expected": record["response"]["prediction"], "got": body["prediction"]}
+                    )
+
+    def add_error(self, record, exc):
+        # no response: counts against the run, but not in the latency samples
+        self.transport_errors += 1
+        if len(self.error_examples) < self.max_examples:
+            self.error_examples.append({"path": record["path"], "error": f"{type(exc).__name__}: {exc}"})
+
+
+async def _replay(client, records, headers, args, collector):
+    import httpx
+
+    semaphore = asyncio.Semaphore(args.max_in_flight)
+    tasks = set()
+    first_ts = None
+    started = time.perf_counter()
+
+    async def fire(record):
+        try:
+            t0 = time.perf_counter()
+            try:
+                response = await client.request(
+                    record["method"].upper(), record["path"], json=record.get("body"), headers=headers,
+                )
+            except httpx.TransportError as exc:
+                # connection refused, reset or timed out: record it and keep replaying
+                collector.add_error(record, exc)
+                return
+            elapsed = time.perf_counter() - t0
+            try:
+                body = response.json()
+            except ValueError:
+                body = None
+            collector.add(record, response.status_code, body, elapsed, args.tolerance)
+        finally:
+            semaphore.release()
+
+    for record in records:
+        if args.speed > 0 and "ts" in record:
+            if first_ts is None:
+                first_ts = record["ts"]
+            due = (record["ts"] - first_ts) / args.speed
+            delay = due - (time.perf_counter() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        # bounded in-flight work keeps memory flat however long the capture is
+        await semaphore.acquire()
+        task = asyncio.create_task(fire(record))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    if tasks:
+        await asyncio.gather(*tasks)
+    return time.perf_counter() - started
+
+
+async def _replay_with(client, args, stats):
+    _, headers = await register_and_login(client, args.username, args.password)
+    collector = _Collector()
+    wall = await _replay(client, iter_records(args.captures, stats), headers, args, collector)
+    return collector, wall
+
+
+async def _run(args, stats):
+    import httpx
+
+    if args.base_url:
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=None) as client:
+            return await _replay_with(client, args, stats)
+
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=None) as client:
+            return await _replay_with(client, args, stats)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a JSONL traffic capture against the API.")
+    parser.add_argument("captures", type=Path, nargs="+", help="JSONL capture files, replayed in order")
+    parser.add_argument("--speed", type=float, default=0.0,
+                        help="time scale for recorded gaps (1 = real time, 2 = twice as fast, 0 = no pacing)")
+    parser.add_argument("--max-in-flight", type=int, default=64)
+    parser.add_argument("--tolerance", type=float, default=1e-6, help="absolute tolerance for prediction checks")
+    parser.add_argument("--base-url", help="replay over HTTP against a running server instead of in-process")
+    parser.add_argument("--username", default="replay_user")
+    parser.add_argument("--password", default="replay-password")
+    parser.add_argument("--executor", choices=["thread", "process"], default="process")
+    add_report_arguments(parser)
+    args = parser.parse_args(argv)
+
+    stats = {"skipped": 0}
+    if args.base_url:
+        collector, wall = asyncio.run(_run(args, stats))
+    else:
+        os.environ.setdefault("RATE_LIMIT", "1000000/minute")
+        os.environ.setdefault("PREDICT_RATE_LIMIT", "1000000/minute")
+        with tempfile.TemporaryDirectory() as tmp:
+            prepare_environment(Path(tmp), args.executor)
+            collector, wall = asyncio.run(_run(args, stats))
+
+    replayed = sum(len(samples) for samples in collector.samples.values())
+    report = {
+        "target": args.base_url or "in-process",
+        "replayed": replayed,
+        "skipped_lines": stats["skipped"],
+        "wall_seconds": round(wall, 3),
+        "statuses": collector.statuses,
+        "status_mismatches": collector.status_mismatches,
+        "prediction_checks": collector.prediction_checks,
+        "prediction_mismatches": collector.prediction_mismatches,
+        "mismatch_examples": collector.mismatch_examples,
+        "transport_errors": collector.transport_errors,
+        "error_examples": collector.error_examples,
+        "results": {
+            route: {**percentiles(samples), "throughput_rps": round(len(samples) / wall, 2) if wall else None}
+            for route, samples in collector.samples.items()
+        },
+    }
+    code = finish_report(report, args)
+    if collector.prediction_mismatches or collector.status_mismatches or collector.transport_errors:
+        return 1
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
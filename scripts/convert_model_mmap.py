@@ -0,0 +1,31 @@
+import argparse
+import os
+from pathlib import Path
+
+import joblib
+
+
+def convert(src: Path, dst: Path) -> Path:
+    model = joblib.load(src)
+    tmp = dst.with_name(dst.name + ".tmp")
+    joblib.dump(model, tmp, compress=0)
+    joblib.load(tmp, mmap_mode="r")
+    os.replace(tmp, dst)
+    return dst
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Rewrite a (possibly compressed) model.joblib as an uncompressed artifact "
+                    "that can be loaded with MODEL_MMAP_MODE=r and shared between workers."
+    )
+    parser.add_argument("src", type=Path, help="existing model artifact")
+    parser.add_argument("dst", type=Path, nargs="?", help="output path (defaults to rewriting src in place)")
+    args = parser.parse_args(argv)
+
+    dst = convert(args.src, args.dst or args.src)
+    print(f"wrote {dst} ({dst.stat().st_size} bytes)")
+
+
+if __name__ == "__main__":
+    main()
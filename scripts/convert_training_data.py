@@ -0,0 +1,31 @@
+import argparse
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault("SECRET_KEY", "offline-conversion")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Convert a housing.csv-shaped file into the memory-mapped columnar store "
+                    "the service loads at startup (one .npy per column)."
+    )
+    parser.add_argument("src", type=Path, help="training CSV")
+    parser.add_argument("dst", type=Path, nargs="?", help="store directory (defaults to <src stem>.columns)")
+    parser.add_argument("--chunk-rows", type=int, default=100_000, help="CSV rows parsed per chunk")
+    args = parser.parse_args(argv)
+
+    from app.services.training_data import TrainingData, convert_csv
+
+    try:
+        dst = convert_csv(args.src, args.dst, args.chunk_rows)
+    except ValueError as exc:
+        raise SystemExit(f"error: {exc}") from exc
+    data = TrainingData.open(dst)
+    size = sum(path.stat().st_size for path in dst.iterdir())
+    print(f"wrote {dst} ({len(data)} rows, {len(data.columns)} columns, {size} bytes)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
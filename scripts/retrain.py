@@ -0,0 +1,94 @@
+import argparse
+import json
+import os
+import sys
+from functools import partial
+from pathlib import Path
+
+os.environ.setdefault("SECRET_KEY", "offline-training")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Train or refresh the price model from the training data and labelled production "
+                    "predictions, streaming both in chunks, and write a versioned artifact."
+    )
+    start = parser.add_mutually_exclusive_group(required=True)
+    start.add_argument("--base", type=Path, help="artifact to refresh (partial_fit or warm-start models)")
+    start.add_argument("--estimator", choices=["linear", "forest"], help="train a new model from scratch")
+    parser.add_argument("--artifact-dir", type=Path, default=Path("models"))
+    parser.add_argument("--publish", type=Path, nargs="?", const=True,
+                        help="also swap the artifact into MODEL_PATH (or the given path) for the API to reload")
+    parser.add_argument("--train-data", help="training CSV or store (defaults to TRAIN_DATA)")
+    parser.add_argument("--with-store", action="store_true",
+                        help="include the training data when refreshing (always used from scratch)")
+    parser.add_argument("--no-production", action="store_true", help="skip labelled rows from the predictions table")
+    parser.add_argument("--labelled-since",
+                        help="only production rows labelled at or after this ISO timestamp "
+                             "(defaults to where the base artifact's refresh stopped)")
+    parser.add_argument("--chunk-rows", type=int, default=50000)
+    parser.add_argument("--epochs", type=int, default=1, help="passes over the data for partial_fit models")
+    parser.add_argument("--add-estimators", type=int, default=10, help="trees added per warm-start refresh")
+    args = parser.parse_args(argv)
+
+    import joblib
+
+    from app.core.config import settings
+    from app.services.retraining import (
+        ESTIMATORS,
+        iter_production_chunks,
+        iter_store_chunks,
+        publish,
+        read_metadata,
+        refresh_mode,
+        save_artifact,
+        train,
+    )
+
+    after = None
+    if args.base is not None:
+        model = joblib.load(args.base)
+        parent = read_metadata(args.base)
+        # a model that cannot be updated incrementally is refitted, which needs all the data again
+        full_refit = refresh_mode(model) == "full"
+        use_store = args.with_store or full_refit
+        if not full_refit:
+            after = parent.get("label_cursor")
+    else:
+        model = ESTIMATORS[args.estimator]()
+        parent = {}
+        use_store = True
+    if args.labelled_since:
+        after = {"labelled_at": args.labelled_since, "id": 0}
+
+    sources = []
+    if use_store:
+        sources.append(partial(iter_store_chunks, args.chunk_rows, args.train_data))
+    progress = {"cursor": after}
+    if not args.no_production:
+        from app.core.db import engine
+
+        sources.append(partial(iter_production_chunks, engine, args.chunk_rows, after, progress))
+
+    try:
+        report = train(model, sources, epochs=args.epochs, add_estimators=args.add_estimators)
+    except ValueError as exc:
+        raise SystemExit(f"error: {exc}") from exc
+    report.update(
+        parent_version=parent.get("version"),
+        sources=["store"] * use_store + ["production"] * (not args.no_production),
+        label_cursor=progress["cursor"],
+    )
+    artifact = save_artifact(model, args.artifact_dir, report)
+    report = read_metadata(artifact)
+    if args.publish:
+        target = Path(settings.MODEL_PATH) if args.publish is True else args.publish
+        publish(artifact, target)
+        report["published_to"] = str(target)
+    report["artifact"] = str(artifact)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
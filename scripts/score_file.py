@@ -0,0 +1,223 @@
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+os.environ.setdefault("SECRET_KEY", "offline-scoring")
+
+LOAD_COLUMNS = [
+    "user_id",
+    "longitude",
+    "latitude",
+    "housing_median_age",
+    "total_rooms",
+    "total_bedrooms",
+    "population",
+    "households",
+    "median_income",
+    "ocean_proximity",
+    "prediction",
+    "model_version",
+]
+
+
+def read_chunks(path: Path, chunk_rows: int):
+    if path.suffix == ".parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise SystemExit("Parquet input needs pyarrow (pip install pyarrow)") from exc
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+        return
+    yield from pd.read_csv(path, chunksize=chunk_rows)
+
+
+def score_features(features: np.ndarray):
+    """Predict and quantize one chunk; runs in a pool worker (or in-process with --workers 0)."""
+    from app.services.prediction_service import _predict_matrix, quantize_prediction
+
+    if not len(features):
+        return [], None
+    results = _predict_matrix(features)
+    return [quantize_prediction(raw) for raw, _ in results], results[0][1]
+
+
+def _init_worker():
+    from app.services.prediction_service import load_model
+
+    load_model()
+
+
+class _InlineFuture:
+    def __init__(self, value):
+        self._value = value
+
+    def result(self):
+        return self._value
+
+
+class CsvSink:
+    def __init__(self, path: Path):
+        self._handle = sys.stdout if str(path) == "-" else open(path, "w", newline="")
+        self._header = True
+
+    def write(self, frame: pd.DataFrame):
+        frame.to_csv(self._handle, header=self._header, index=False)
+        self._header = False
+
+    def close(self):
+        if self._handle is not sys.stdout:
+            self._handle.close()
+
+
+class ParquetSink:
+    def __init__(self, path: Path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise SystemExit("Parquet output needs pyarrow (pip install pyarrow)") from exc
+        self._pa, self._pq, self._path, self._writer = pa, pq, path, None
+
+    def write(self, frame: pd.DataFrame):
+        table = self._pa.Table.from_pandas(frame, preserve_index=False)
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self._path, table.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+class DatabaseSink:
+    """Append scored rows to ``predictions``: COPY on Postgres, batched INSERT elsewhere."""
+
+    def __init__(self, user_id: int, engine=None):
+        if engine is None:
+            from app.core.db import engine
+
+        self._engine = engine
+        self._user_id = user_id
+
+    def write(self, frame: pd.DataFrame):
+        rows = frame[frame["prediction"].notna()].assign(user_id=self._user_id)[LOAD_COLUMNS]
+        if rows.empty:
+            return
+        if self._engine.dialect.name == "postgresql":
+            buffer = io.StringIO()
+            rows.to_csv(buffer, header=False, index=False, quoting=csv.QUOTE_MINIMAL)
+            buffer.seek(0)
+            connection = self._engine.raw_connection()
+            try:
+                with connection.cursor() as cursor:
+                    cursor.copy_expert(
+                        f"COPY predictions ({', '.join(LOAD_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer,
+                    )
+                connection.commit()
+            finally:
+                connection.close()
+            return
+
+        from sqlalchemy import insert
+
+        from app.entities.prediction import Prediction
+
+        with self._engine.begin() as conn:
+            # astype(object) hands the driver Python scalars instead of numpy ones
+            conn.execute(insert(Prediction), rows.astype(object).to_dict("records"))
+
+    def close(self):
+        pass
+
+
+def _emit(chunk, valid, future, sinks, totals):
+    values, version = future.result()
+    predictions = np.full(len(chunk), np.nan)
+    predictions[valid] = values
+    scored = chunk.assign(prediction=predictions, model_version=version)
+    for sink in sinks:
+        sink.write(scored)
+    totals["rows"] += len(chunk)
+    totals["skipped"] += int((~valid).sum())
+
+
+def score_file(src: Path, sinks, chunk_rows: int = 50000, workers: int = 0) -> dict:
+    """Stream ``src`` through the model; at most ``2 * workers`` chunks are in flight."""
+    from app.services.feature_encoding import encode_frame
+
+    totals = {"rows": 0, "skipped": 0}
+    started = time.perf_counter()
+    pool = None
+    if workers > 0:
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"), initializer=_init_worker)
+    try:
+        pending = deque()
+        for chunk in read_chunks(src, chunk_rows):
+            features = encode_frame(chunk)
+            # the API rejects missing fields; here those rows get an empty prediction
+            valid = ~np.isnan(features).any(axis=1) & chunk["ocean_proximity"].notna().to_numpy()
+            if pool is None:
+                future = _InlineFuture(score_features(features[valid]))
+            else:
+                future = pool.submit(score_features, features[valid])
+            pending.append((chunk, valid, future))
+            if len(pending) >= max(2 * workers, 1):
+                _emit(*pending.popleft(), sinks, totals)
+        while pending:
+            _emit(*pending.popleft(), sinks, totals)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        for sink in sinks:
+            sink.close()
+    totals["seconds"] = round(time.perf_counter() - started, 3)
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Score a housing.csv-shaped CSV/Parquet file offline, chunk by chunk, on all cores."
+    )
+    parser.add_argument("src", type=Path, help="input .csv or .parquet file")
+    parser.add_argument("-o", "--output", type=Path,
+                        help="output .csv or .parquet ('-' for stdout); input columns plus prediction")
+    parser.add_argument("--model", type=Path, help="model artifact (defaults to MODEL_PATH)")
+    parser.add_argument("--chunk-rows", type=int, default=50000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="0 scores in this process")
+    parser.add_argument("--load-db", action="store_true",
+                        help="also append the rows to the predictions table (COPY on Postgres)")
+    parser.add_argument("--user-id", type=int, help="owner recorded for rows loaded with --load-db")
+    args = parser.parse_args(argv)
+
+    if args.output is None and not args.load_db:
+        parser.error("nothing to do: pass --output and/or --load-db")
+    if args.load_db and args.user_id is None:
+        parser.error("--load-db needs --user-id")
+    if args.model is not None:
+        # read when app.services.prediction_service is first imported, here and in the workers
+        os.environ["MODEL_PATH"] = str(args.model)
+
+    sinks = []
+    if args.output is not None:
+        sinks.append(ParquetSink(args.output) if args.output.suffix == ".parquet" else CsvSink(args.output))
+    if args.load_db:
+        sinks.append(DatabaseSink(args.user_id))
+
+    totals = score_file(args.src, sinks, args.chunk_rows, args.workers)
+    print(f"scored {totals['rows']} rows ({totals['skipped']} with missing features) "
+          f"in {totals['seconds']}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
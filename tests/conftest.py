@@ -1,39 +1,56 @@
+import asyncio
 import os
 import sys
+import tempfile
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+# stand-in models are patched into this process, so inference must not leave it
+os.environ.setdefault("INFERENCE_EXECUTOR", "thread")
+# minimum bcrypt cost; the suite is not measuring hashing
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+# keep the converted training-data store out of the checkout
+os.environ.setdefault("TRAIN_DATA_STORE", os.path.join(tempfile.mkdtemp(), "housing.columns"))
+os.environ.setdefault("WRITE_BEHIND_SPILL_PATH", os.path.join(tempfile.mkdtemp(), "predictions.spill.jsonl"))
+import numpy as np
+import pandas as pd
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
-from app.core.db import Base, init_db
-from app.controllers.auth_controller import get_db as auth_get_db
-from app.controllers.user_controller import get_db as users_get_db
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+from app.core.db import Base, get_db, get_session_factory, init_db
+from app.services import auth_service, feature_encoding, prediction_service
 from app.main import app
-
-TEST_DATABASE_URL = "sqlite://"
-
-engine = create_engine(
-    TEST_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+from app.core.rate_limit import limiter
+
+TEST_DATABASE_FILE = os.path.join(tempfile.mkdtemp(), "test.db")
+TEST_DATABASE_URL = f"sqlite:///{TEST_DATABASE_FILE}"
+HOUSING_CSV = os.path.join(os.path.dirname(__file__), "..", "housing.csv")
+NUMERIC_COLUMNS = [
+    "longitude",
+    "latitude",
+    "housing_median_age",
+    "total_rooms",
+    "total_bedrooms",
+    "population",
+    "households",
+    "median_income",
+]
+
+engine = create_engine(TEST_DATABASE_URL)
+async_engine = create_async_engine(f"sqlite+aiosqlite:///{TEST_DATABASE_FILE}", poolclass=NullPool)
+TestingSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
 
 Base.metadata.create_all(bind=engine)
 
 
-def override_get_db():
-    db = TestingSessionLocal()
-    try:
+async def override_get_db():
+    async with TestingSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
-app.dependency_overrides[auth_get_db] = override_get_db
-app.dependency_overrides[users_get_db] = override_get_db
+app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_session_factory] = lambda: TestingSessionLocal
 
 
 @pytest.fixture(scope="function", autouse=True)
@@ -41,12 +58,14 @@ def _clean_db():
     with engine.begin() as conn:
         for table in reversed(Base.metadata.sorted_tables):
             conn.execute(table.delete())
+    auth_service.clear_principals()
+    limiter.reset()
     yield
 
 
 @pytest.fixture(scope="session", autouse=True)
 def _init_db_once():
-    init_db()
+    asyncio.run(init_db())
     yield
 
 
@@ -57,6 +76,61 @@ def test_client():
 
 @pytest.fixture
 def client():
-    init_db()
     with TestClient(app) as c:
         yield c
+
+
+@pytest.fixture
+def auth_header():
+    """``auth_header(client, username)`` registers (if needed) and logs in, returning the Bearer header."""
+
+    def login(client, username, password="p"):
+        client.post("/api-deutsche/auth/register", json={"username": username, "password": password})
+        r = client.post("/api-deutsche/auth/login", json={"username": username, "password": password})
+        assert r.status_code == 200
+        return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    return login
+
+
+@pytest.fixture(scope="session")
+def housing_frame():
+    return pd.read_csv(HOUSING_CSV).dropna().reset_index(drop=True)
+
+
+@pytest.fixture(scope="session")
+def housing_features(housing_frame):
+    numeric = housing_frame[NUMERIC_COLUMNS].to_numpy(dtype=np.float64)
+    one_hot = np.column_stack([
+        (housing_frame["ocean_proximity"] == c).to_numpy(dtype=np.float64)
+        for c in feature_encoding.OCEAN_CATEGORIES
+    ])
+    return np.hstack([numeric, one_hot]), housing_frame["median_house_value"].to_numpy(dtype=np.float64)
+
+
+@pytest.fixture(scope="session")
+def _fitted_linear_model(housing_features):
+    from sklearn.linear_model import LinearRegression
+
+    X, y = housing_features
+    return LinearRegression().fit(X, y)
+
+
+@pytest.fixture
+def stand_in_model(monkeypatch, _fitted_linear_model):
+    monkeypatch.setattr(
+        prediction_service,
+        "_loaded",
+        prediction_service.LoadedModel(model=_fitted_linear_model, version="stand-in-linear"),
+    )
+    return _fitted_linear_model
+
+
+@pytest.fixture
+def testing_session_factory():
+    return TestingSessionLocal
+
+
+@pytest.fixture
+def testing_engine():
+    return engine
@@ -0,0 +1,120 @@
+import os
+
+import numpy as np
+import pytest
+
+from app.services import comparables
+from app.services.comparables import KM_PER_DEGREE, ComparablesIndex, load_comparables_index
+
+API_PREFIX = "/api-deutsche"
+PREDICT_PREFIX = f"{API_PREFIX}/predict"
+COMPARABLES_PREFIX = f"{API_PREFIX}/comparables"
+HOUSING_CSV = os.path.join(os.path.dirname(__file__), "..", "housing.csv")
+ROW = {
+    "longitude": -122.23,
+    "latitude": 37.88,
+    "housing_median_age": 41.0,
+    "total_rooms": 880.0,
+    "total_bedrooms": 129.0,
+    "population": 322.0,
+    "households": 126.0,
+    "median_income": 8.3252,
+    "ocean_proximity": "NEAR BAY",
+}
+
+
+@pytest.fixture
+def housing_index(monkeypatch):
+    index = load_comparables_index(HOUSING_CSV)
+    monkeypatch.setattr(comparables, "_index", index)
+    return index
+
+
+def test_kd_tree_matches_brute_force(housing_index):
+    rng = np.random.default_rng(7)
+    lon = rng.uniform(-124.0, -114.5, 50)
+    lat = rng.uniform(32.5, 42.0, 50)
+    indices, distances = housing_index.query(lon, lat, 8)
+
+    scale = housing_index.lon_scale
+    for i in range(len(lon)):
+        dx = (housing_index.longitude - lon[i]) * scale
+        dy = housing_index.latitude - lat[i]
+        expected = np.sort(np.hypot(dx, dy))[:8] * KM_PER_DEGREE
+        np.testing.assert_allclose(distances[i], expected, rtol=1e-9)
+        assert np.all(np.diff(distances[i]) >= 0)
+
+
+def test_k_is_capped_at_index_size():
+    index = ComparablesIndex.from_arrays([-122.0, -121.0], [37.0, 38.0], [100000.0, 200000.0])
+    rows = index.comparables([-122.0], [37.0], 5)
+    assert [c["median_house_value"] for c in rows[0]] == [100000.0, 200000.0]
+    assert rows[0][0]["distance_km"] == 0.0
+
+
+def test_comparables_endpoints(client, auth_header, housing_index):
+    headers = auth_header(client, "appraiser")
+
+    assert client.post(COMPARABLES_PREFIX, json=ROW).status_code == 401
+    r = client.post(COMPARABLES_PREFIX, json=ROW, params={"k": 3}, headers=headers)
+    assert r.status_code == 200
+    body = r.json()
+    assert len(body) == 3
+    # housing.csv row 0 sits exactly on these coordinates
+    assert body[0]["distance_km"] == 0.0
+    assert body[0]["median_house_value"] == 452600.0
+    assert client.post(COMPARABLES_PREFIX, json=ROW, params={"k": 0}, headers=headers).status_code == 422
+
+    inland = {**ROW, "longitude": -119.77, "latitude": 36.74}
+    r = client.post(f"{COMPARABLES_PREFIX}/batch", json=[ROW, inland], params={"k": 2}, headers=headers)
+    assert r.status_code == 200
+    first, second = r.json()
+    assert first == body[:2]
+    assert len(second) == 2 and second[0]["latitude"] != first[0]["latitude"]
+
+
+def test_predict_can_include_comparables(client, auth_header, stand_in_model, housing_index):
+    headers = auth_header(client, "quote_user")
+    r = client.post(f"{PREDICT_PREFIX}", json=ROW, params={"comparables": 4}, headers=headers)
+    assert r.status_code == 200
+    body = r.json()
+    assert "prediction" in body and len(body["comparables"]) == 4
+
+    r = client.post(f"{PREDICT_PREFIX}", json=ROW, headers=headers)
+    assert "comparables" not in r.json()
+
+
+@pytest.fixture
+def unbuilt_index(monkeypatch):
+    monkeypatch.setattr(comparables, "_index", None)
+    monkeypatch.setattr(comparables, "_build_thread", None)
+    monkeypatch.setattr(comparables, "_last_attempt", None)
+    monkeypatch.setattr(comparables, "_last_error", None)
+
+
+def test_missing_training_data_returns_503(client, auth_header, stand_in_model, unbuilt_index, monkeypatch,
+                                           tmp_path):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "TRAIN_DATA", str(tmp_path / "missing.csv"))
+    headers = auth_header(client, "early_user")
+    r = client.post(COMPARABLES_PREFIX, json=ROW, headers=headers)
+    assert r.status_code == 503 and r.headers["Retry-After"]
+    comparables._build_thread.join(10)
+    assert "missing.csv" in client.post(COMPARABLES_PREFIX, json=ROW, headers=headers).json()["detail"]
+
+    # the quote is refused before anything is stored, so a retry cannot duplicate it
+    r = client.post(f"{PREDICT_PREFIX}", json=ROW, params={"comparables": 3}, headers=headers)
+    assert r.status_code == 503
+    assert client.get(f"{PREDICT_PREFIX}", headers=headers).json() == []
+
+
+def test_index_is_built_off_the_request_path(client, auth_header, unbuilt_index, monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "TRAIN_DATA", HOUSING_CSV)
+    headers = auth_header(client, "patient_user")
+    assert client.post(COMPARABLES_PREFIX, json=ROW, headers=headers).status_code == 503
+    comparables._build_thread.join(60)
+    r = client.post(COMPARABLES_PREFIX, json=ROW, params={"k": 1}, headers=headers)
+    assert r.status_code == 200 and r.json()[0]["median_house_value"] == 452600.0
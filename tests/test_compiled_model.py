@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import ExtraTreesRegressor, GradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import LinearRegression, Ridge
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.tree import DecisionTreeRegressor
+
+from app.services.compiled_model import compile_model
+from app.services.prediction_service import quantize_prediction
+
+MODELS = {
+    "linear": lambda: LinearRegression(),
+    "ridge": lambda: Ridge(alpha=1.0),
+    "tree": lambda: DecisionTreeRegressor(max_depth=12, random_state=0),
+    "forest": lambda: RandomForestRegressor(n_estimators=15, max_depth=10, random_state=0),
+    "extra_trees": lambda: ExtraTreesRegressor(n_estimators=10, max_depth=10, random_state=0),
+    "gradient_boosting": lambda: GradientBoostingRegressor(n_estimators=40, max_depth=4, random_state=0),
+}
+
+
+@pytest.mark.parametrize("name", sorted(MODELS))
+def test_compiled_matches_sklearn_over_housing_csv(name, housing_features):
+    X, y = housing_features
+    model = MODELS[name]().fit(X, y)
+    compiled = compile_model(model)
+    assert compiled is not None
+
+    expected = [quantize_prediction(v) for v in model.predict(X)]
+    actual = [quantize_prediction(v) for v in compiled.predict(X)]
+    assert actual == expected
+
+    for row in X[:25]:
+        assert quantize_prediction(compiled.predict([row])[0]) == quantize_prediction(model.predict([row])[0])
+
+
+def test_unsupported_model_falls_back(housing_features):
+    X, y = housing_features
+    model = make_pipeline(StandardScaler(), LinearRegression()).fit(X, y)
+    assert compile_model(model) is None
+
+
+def test_compiled_mode_is_used_when_loading(monkeypatch, tmp_path, housing_features):
+    import joblib
+
+    from app.core.config import settings
+    from app.services import prediction_service
+
+    X, y = housing_features
+    model = DecisionTreeRegressor(max_depth=6, random_state=0).fit(X, y)
+    model_path = tmp_path / "model.joblib"
+    joblib.dump(model, model_path)
+    monkeypatch.setattr(prediction_service, "MODEL_PATH", model_path)
+    monkeypatch.setattr(prediction_service, "_loaded", None)
+    monkeypatch.setattr(settings, "MODEL_INFERENCE_MODE", "compiled")
+
+    loaded = prediction_service.get_loaded_model()
+    assert loaded.compiled is not None
+    np.testing.assert_array_equal(loaded.predict(X[:100]), model.predict(X[:100]))
@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.dtos.prediction_dto import PredictionInput
+from app.services.feature_encoding import (
+    N_FEATURES,
+    encode_frame,
+    encode_input,
+    encode_inputs,
+    encode_ocean_proximity,
+)
+
+LEGACY_CATEGORIES = ['<1H OCEAN', 'INLAND', 'ISLAND', 'NEAR BAY', 'NEAR OCEAN']
+
+
+def _legacy_vector(data):
+    # the list-based encoder the service used before feature_encoding existed
+    return [
+        data.longitude,
+        data.latitude,
+        data.housing_median_age,
+        data.total_rooms,
+        data.total_bedrooms,
+        data.population,
+        data.households,
+        data.median_income,
+        *[1 if data.ocean_proximity == c else 0 for c in LEGACY_CATEGORIES],
+    ]
+
+
+@pytest.fixture(scope="module")
+def housing_inputs(housing_frame):
+    rows = housing_frame.drop(columns=["median_house_value"]).head(2000).to_dict("records")
+    inputs = [PredictionInput(**row) for row in rows]
+    # the API rejects unknown categories, but the offline scorer can meet them
+    inputs.append(PredictionInput.model_construct(**{**rows[0], "ocean_proximity": "ON THE MOON"}))
+    return inputs
+
+
+def test_matches_legacy_encoder_columns_and_order(housing_inputs):
+    expected = np.array([_legacy_vector(data) for data in housing_inputs], dtype=np.float64)
+
+    batch = encode_inputs(housing_inputs)
+    assert batch.shape == (len(housing_inputs), N_FEATURES)
+    assert batch.dtype == np.float64 and batch.flags.c_contiguous
+    np.testing.assert_array_equal(batch, expected)
+
+    for i in [*range(200), len(housing_inputs) - 1]:
+        single = encode_input(housing_inputs[i])
+        assert single.shape == (1, N_FEATURES)
+        np.testing.assert_array_equal(single[0], expected[i])
+
+
+def test_frame_and_one_hot_helpers(housing_frame):
+    frame = housing_frame.head(500).copy()
+    frame.loc[frame.index[0], "ocean_proximity"] = "UNKNOWN"
+    expected = np.array(
+        [_legacy_vector(SimpleNamespace(**row)) for row in frame.to_dict("records")],
+        dtype=np.float64,
+    )
+    np.testing.assert_array_equal(encode_frame(frame), expected)
+
+    for category in LEGACY_CATEGORIES + ["UNKNOWN"]:
+        assert encode_ocean_proximity(category).tolist() == [1 if category == c else 0 for c in LEGACY_CATEGORIES]
+    assert len(encode_inputs([])) == 0
@@ -0,0 +1,96 @@
+import os
+import subprocess
+import sys
+
+import joblib
+import numpy as np
+import pytest
+
+from scripts.convert_model_mmap import convert
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+WORKER = """
+import sys
+
+def anonymous_kb():
+    with open("/proc/self/smaps_rollup") as fh:
+        for line in fh:
+            if line.startswith("Anonymous:"):
+                return int(line.split()[1])
+
+import sklearn.neighbors
+from app.services import prediction_service
+
+before = anonymous_kb()
+model = prediction_service.load_model()
+after = anonymous_kb()
+model.predict(model._fit_X[:4])
+print(after - before)
+sys.stdout.flush()
+sys.stdin.read()
+"""
+
+pytestmark = pytest.mark.skipif(
+    not os.path.exists("/proc/self/smaps_rollup"), reason="needs Linux smaps_rollup"
+)
+
+
+def _spawn_workers(model_path, count, mmap_mode):
+    env = dict(os.environ, MODEL_PATH=str(model_path), SECRET_KEY="test", PYTHONPATH=REPO_ROOT)
+    env.pop("MODEL_MMAP_MODE", None)
+    if mmap_mode:
+        env["MODEL_MMAP_MODE"] = mmap_mode
+    procs = [
+        subprocess.Popen(
+            [sys.executable, "-c", WORKER],
+            cwd=REPO_ROOT,
+            env=env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        for _ in range(count)
+    ]
+    try:
+        return [int(p.stdout.readline()) for p in procs]
+    finally:
+        for p in procs:
+            p.communicate("")
+
+
+@pytest.fixture(scope="module")
+def large_model_path(tmp_path_factory, housing_features):
+    from sklearn.neighbors import KNeighborsRegressor
+
+    X, y = housing_features
+    X = np.tile(X, (8, 1))
+    y = np.tile(y, 8)
+    model = KNeighborsRegressor(n_neighbors=5, algorithm="brute").fit(X, y)
+
+    compressed = tmp_path_factory.mktemp("model") / "model.joblib"
+    joblib.dump(model, compressed, compress=1)
+    return compressed, X.nbytes // 1024
+
+
+def test_converted_model_is_shared_across_workers(large_model_path, tmp_path):
+    compressed, array_kb = large_model_path
+    mmap_path = convert(compressed, tmp_path / "model.mmap.joblib")
+
+    copied = _spawn_workers(compressed, 1, mmap_mode=None)
+    assert all(delta > array_kb * 0.8 for delta in copied)
+
+    for workers in (1, 3):
+        shared = _spawn_workers(mmap_path, workers, mmap_mode="r")
+        assert all(delta < array_kb * 0.1 for delta in shared), shared
+
+
+def test_convert_preserves_predictions(large_model_path, tmp_path, housing_features):
+    compressed, _ = large_model_path
+    mmap_path = convert(compressed, tmp_path / "model.mmap.joblib")
+    X, _ = housing_features
+
+    original = joblib.load(compressed)
+    mapped = joblib.load(mmap_path, mmap_mode="r")
+    assert isinstance(mapped._fit_X, np.memmap)
+    np.testing.assert_array_equal(original.predict(X[:50]), mapped.predict(X[:50]))
@@ -0,0 +1,173 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.dummy import DummyRegressor
+
+from app.core import metrics
+from app.services import prediction_service
+from app.services.model_registry import DEFAULT_MODEL, ModelRegistry, ModelRouter, UnknownModel
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+API_PREFIX = "/api-deutsche"
+PREDICT_PREFIX = f"{API_PREFIX}/predict"
+ROW = {
+    "longitude": -122.23,
+    "latitude": 37.88,
+    "housing_median_age": 41.0,
+    "total_rooms": 880.0,
+    "total_bedrooms": 129.0,
+    "population": 322.0,
+    "households": 126.0,
+    "median_income": 8.3252,
+    "ocean_proximity": "NEAR BAY",
+}
+
+
+def test_registry_keeps_at_most_max_loaded_models():
+    loaded = []
+
+    def loader(path):
+        loaded.append(path)
+        return prediction_service.LoadedModel(model=None, version=f"v-{path}")
+
+    registry = ModelRegistry({"a": "a.joblib", "b": "b.joblib", "c": "c.joblib"}, max_loaded=2, loader=loader)
+    assert registry.get("a").version == "v-a.joblib"
+    registry.get("b")
+    registry.get("a")
+    registry.get("c")
+    assert loaded == ["a.joblib", "b.joblib", "c.joblib"]
+    assert [m["name"] for m in registry.status() if m["loaded"]] == ["a", "c"]
+    assert registry.evictions == 1
+
+    registry.get("b")
+    assert loaded[-1] == "b.joblib" and registry.loads == 4
+    with pytest.raises(UnknownModel):
+        registry.get("missing")
+    with pytest.raises(ValueError):
+        ModelRegistry({DEFAULT_MODEL: "x.joblib"}, max_loaded=1, loader=loader)
+
+
+def test_load_finishing_after_clear_is_not_cached():
+    registry = None
+
+    def loader(path):
+        # a reload lands while this (now stale) artifact is being read
+        registry.clear()
+        return prediction_service.LoadedModel(model=None, version=f"v-{path}")
+
+    registry = ModelRegistry({"a": "a.joblib"}, max_loaded=1, loader=loader)
+    assert registry.get("a").version == "v-a.joblib"
+    assert registry.peek("a") is None
+    assert not registry.status()[0]["loaded"]
+
+
+def test_pinned_model_has_its_own_slot():
+    def loader(path):
+        return prediction_service.LoadedModel(model=None, version=f"v-{path}")
+
+    paths = {"shadow": "s.joblib", "a": "a.joblib", "b": "b.joblib", "c": "c.joblib"}
+    registry = ModelRegistry(paths, max_loaded=2, loader=loader, pinned=["shadow", "missing"])
+    assert registry.pinned == ["shadow"]
+    registry.preload()
+    assert registry.loads == 3
+    for name in ("c", "shadow", "b", "shadow", "a"):
+        registry.get(name)
+    assert [m["name"] for m in registry.status() if m["loaded"]] == ["shadow", "a", "b"]
+    assert [m["name"] for m in registry.status() if m["pinned"]] == ["shadow"]
+    assert registry.evictions == 2 and registry.loads == 5
+
+
+def test_named_model_version_is_read_without_loading_it(monkeypatch, tmp_path):
+    def loader(path):
+        raise AssertionError("resolving a version must not load the model")
+
+    artifact = tmp_path / "candidate.joblib"
+    artifact.write_bytes(b"first")
+    registry = ModelRegistry({"candidate": str(artifact)}, max_loaded=1, loader=loader)
+    monkeypatch.setattr(prediction_service, "_registry", registry)
+    version = asyncio.run(prediction_service._resolve_version("candidate"))
+    assert version == prediction_service._fingerprint(artifact)
+    assert prediction_service._cached_version(str(artifact)) == version
+
+    artifact.write_bytes(b"republished")
+    assert prediction_service._cached_version(str(artifact)) is None
+    assert asyncio.run(prediction_service._resolve_version("candidate")) != version
+    assert registry.loads == 0
+
+
+def test_batch_is_rescored_when_the_version_changes_under_the_cache(monkeypatch):
+    monkeypatch.setattr(prediction_service.settings, "PREDICTION_CACHE_ENABLED", True)
+    cache = prediction_service.get_prediction_cache()
+    cache.clear()
+    features = np.array([[1.0], [2.0]])
+    asyncio.run(cache.set(prediction_service.cache_key("old", features[0]), 1.0))
+
+    async def resolve(name):
+        return "old"
+
+    async def infer(rows, name):
+        return [(row[0] * 100, "new") for row in rows]
+
+    monkeypatch.setattr(prediction_service, "_resolve_version", resolve)
+    monkeypatch.setattr(prediction_service, "_infer", infer)
+    assert asyncio.run(prediction_service._score_many(features)) == ([100.0, 200.0], "new")
+    cache.clear()
+
+
+@pytest.mark.parametrize("shadow", [DEFAULT_MODEL, "missing"])
+def test_shadow_model_outside_the_registry_fails_at_import(shadow):
+    env = {**os.environ, "SHADOW_MODEL": shadow, "MODEL_REGISTRY": '{"candidate": "c.joblib"}'}
+    result = subprocess.run(
+        [sys.executable, "-c", "import app.services.prediction_service"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    assert result.returncode != 0
+    assert f"SHADOW_MODEL {shadow!r} is not in MODEL_REGISTRY" in result.stderr
+
+
+def test_router_splits_by_weight_and_is_sticky():
+    router = ModelRouter({DEFAULT_MODEL: 3, "candidate": 1, "retired": 0})
+    picks = [router.choose(user_id) for user_id in range(4000)]
+    assert set(picks) == {DEFAULT_MODEL, "candidate"}
+    assert picks.count("candidate") / len(picks) == pytest.approx(0.25, abs=0.03)
+    assert [router.choose(user_id) for user_id in range(4000)] == picks
+
+    assert ModelRouter({}).choose(7) == DEFAULT_MODEL
+    with pytest.raises(ValueError):
+        ModelRouter({"candidate": -1})
+
+
+def test_predict_selects_and_routes_named_models(client, auth_header, stand_in_model, monkeypatch, tmp_path):
+    candidate = tmp_path / "candidate.joblib"
+    joblib.dump(DummyRegressor().fit(np.zeros((2, 13)), [250000.0, 250000.0]), candidate)
+    registry = ModelRegistry({"candidate": str(candidate)}, max_loaded=1, loader=prediction_service._read_model)
+    monkeypatch.setattr(prediction_service, "_registry", registry)
+    headers = auth_header(client, "ab_user")
+
+    r = client.post(f"{PREDICT_PREFIX}", json=ROW, params={"model": "candidate"}, headers=headers)
+    assert r.status_code == 200
+    assert r.json()["prediction"] == 250000.0
+    version = r.headers["X-Model-Version"]
+    assert version == registry.get("candidate").version
+    assert metrics.model_predictions_total.value("candidate", version) >= 1
+
+    default = client.post(f"{PREDICT_PREFIX}", json=ROW, headers=headers)
+    assert default.headers["X-Model-Version"] == "stand-in-linear"
+    assert default.json()["prediction"] != 250000.0
+    assert client.post(f"{PREDICT_PREFIX}", json=ROW, params={"model": "nope"},
+                       headers=headers).status_code == 404
+
+    monkeypatch.setattr(prediction_service, "_router", ModelRouter({"candidate": 1}))
+    r = client.post(f"{PREDICT_PREFIX}/batch", json=[ROW, ROW], headers=headers)
+    assert r.headers["X-Model-Version"] == version
+    assert [item["prediction"] for item in r.json()] == [250000.0, 250000.0]
+
+    history = client.get(f"{PREDICT_PREFIX}", headers=headers).json()
+    assert [row["model_version"] for row in history] == [version, version, "stand-in-linear", version]
+    info = client.get(f"{API_PREFIX}/model", headers=headers).json()["registry"]
+    assert info["models"][0]["loaded"] and info["routing"] == {"candidate": 1.0}
@@ -1,3 +1,6 @@
+import asyncio
+
+import numpy as np
 import pytest
 
 API_PREFIX = "/api-deutsche"
@@ -124,3 +127,712 @@ class TestPredictions:
             y = r.json()["prediction"]
             assert isinstance(y, float)
             assert 10000.0 <= y <= 1000000.0
+
+    def test_batch_matches_single_predictions_in_order(self, client, stand_in_model):
+        token = _login_get_token(client, "batch_user", "p")
+        headers = _auth_header(token)
+
+        rows = [
+            {
+                "longitude": -122.64,
+                "latitude": 38.01,
+                "housing_median_age": 36.0,
+                "total_rooms": 1336.0,
+                "total_bedrooms": 258.0,
+                "population": 678.0,
+                "households": 249.0,
+                "median_income": 5.5789,
+                "ocean_proximity": "NEAR OCEAN",
+            },
+            {
+                "longitude": -115.73,
+                "latitude": 33.35,
+                "housing_median_age": 23.0,
+                "total_rooms": 1586.0,
+                "total_bedrooms": 448.0,
+                "population": 338.0,
+                "households": 182.0,
+                "median_income": 1.2132,
+                "ocean_proximity": "INLAND",
+            },
+            {
+                "longitude": -117.96,
+                "latitude": 33.89,
+                "housing_median_age": 24.0,
+                "total_rooms": 1332.0,
+                "total_bedrooms": 252.0,
+                "population": 625.0,
+                "households": 230.0,
+                "median_income": 4.4375,
+                "ocean_proximity": "<1H OCEAN",
+            },
+        ]
+
+        r = client.post(f"{PREDICT_PREFIX}/batch", json=rows, headers=headers)
+        assert r.status_code == 200
+        body = r.json()
+        assert len(body) == len(rows)
+        ids = [item["prediction_id"] for item in body]
+        assert ids == sorted(ids)
+
+        for payload, item in zip(rows, body):
+            single = client.post(f"{PREDICT_PREFIX}", json=payload, headers=headers).json()
+            assert item["prediction"] == pytest.approx(single["prediction"], abs=1e-6)
+
+    def test_batch_empty_and_too_large(self, client, stand_in_model, monkeypatch):
+        from app.core.config import settings
+
+        token = _login_get_token(client, "batch_user2", "p")
+        headers = _auth_header(token)
+
+        r = client.post(f"{PREDICT_PREFIX}/batch", json=[], headers=headers)
+        assert r.status_code == 200
+        assert r.json() == []
+
+        monkeypatch.setattr(settings, "PREDICT_BATCH_MAX_ROWS", 1)
+        row = {
+            "longitude": -122.23,
+            "latitude": 37.88,
+            "housing_median_age": 41.0,
+            "total_rooms": 880.0,
+            "total_bedrooms": 129.0,
+            "population": 322.0,
+            "households": 126.0,
+            "median_income": 8.3252,
+            "ocean_proximity": "NEAR BAY",
+        }
+        r = client.post(f"{PREDICT_PREFIX}/batch", json=[row, row], headers=headers)
+        assert r.status_code == 413
+
+
+def test_micro_batcher_coalesces_concurrent_rows():
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    from app.services.micro_batcher import MicroBatcher
+
+    calls = []
+
+    def predict_fn(features):
+        calls.append(len(features))
+        return features[:, 0] * 2
+
+    pool = ThreadPoolExecutor(max_workers=2)
+    batcher = MicroBatcher(lambda features: pool.submit(predict_fn, features), window_ms=50, max_batch_size=8)
+    results = {}
+    barrier = threading.Barrier(8)
+
+    def worker(i):
+        barrier.wait()
+        results[i] = batcher.predict([float(i), 0.0])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.shutdown()
+    pool.shutdown()
+
+    assert results == {i: 2.0 * i for i in range(8)}
+    assert sum(calls) == 8
+    assert len(calls) < 8
+
+
+def test_micro_batcher_keeps_dispatching_while_batches_run():
+    from concurrent.futures import Future
+
+    from app.services.micro_batcher import MicroBatcher
+
+    in_flight = []
+
+    def submit_fn(features):
+        in_flight.append((features, Future()))
+        return in_flight[-1][1]
+
+    batcher = MicroBatcher(submit_fn, window_ms=0, max_batch_size=1)
+    first, second = batcher.submit([1.0]), batcher.submit([2.0])
+    batcher.shutdown()
+    # both batches were handed to the pool before either finished
+    assert len(in_flight) == 2 and not first.done()
+    for features, pending in reversed(in_flight):
+        pending.set_result(features[:, 0] * 10)
+    assert (first.result(timeout=1), second.result(timeout=1)) == (10.0, 20.0)
+
+
+def test_micro_batcher_propagates_errors():
+    from concurrent.futures import Future
+
+    from app.services.micro_batcher import MicroBatcher
+
+    def submit_fn(features):
+        if features[0, 0] > 1:
+            raise RuntimeError("pool is full")
+        failed = Future()
+        failed.set_exception(ValueError("boom"))
+        return failed
+
+    batcher = MicroBatcher(submit_fn, window_ms=1, max_batch_size=4)
+    with pytest.raises(ValueError):
+        batcher.predict([1.0])
+    with pytest.raises(RuntimeError):
+        batcher.predict([2.0])
+    batcher.shutdown()
+    with pytest.raises(RuntimeError):
+        batcher.submit([1.0])
+
+
+def test_predict_through_micro_batcher(client, stand_in_model, monkeypatch):
+    from app.core.config import settings
+    from app.services import prediction_service
+
+    monkeypatch.setattr(settings, "MICRO_BATCH_ENABLED", True)
+    token = _login_get_token(client, "micro_user", "p")
+    payload = {
+        "longitude": -122.23,
+        "latitude": 37.88,
+        "housing_median_age": 41.0,
+        "total_rooms": 880.0,
+        "total_bedrooms": 129.0,
+        "population": 322.0,
+        "households": 126.0,
+        "median_income": 8.3252,
+        "ocean_proximity": "NEAR BAY",
+    }
+    r = client.post(f"{PREDICT_PREFIX}", json=payload, headers=_auth_header(token))
+    prediction_service.shutdown_batcher()
+    assert r.status_code == 200
+    expected = stand_in_model.predict([prediction_service.build_feature_vector(
+        prediction_service.PredictionInput(**payload)
+    )])[0]
+    assert r.json()["prediction"] == pytest.approx(expected, abs=1e-6)
+
+
+def test_ttl_cache_lru_and_expiry(monkeypatch):
+    from app.core import cache as cache_module
+    from app.core.cache import TTLCache
+
+    c = TTLCache(maxsize=2, ttl_seconds=10)
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.get("a") == 1
+    c.set("c", 3)
+    assert c.get("b") is None
+    assert c.get("a") == 1 and c.get("c") == 3
+    assert c.stats()["evictions"] == 1
+
+    now = cache_module.time.monotonic()
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now + 11)
+    assert c.get("a") is None
+
+
+class _CountingModel:
+    def __init__(self, model):
+        self.model = model
+        self.calls = 0
+
+    def predict(self, X):
+        self.calls += 1
+        return self.model.predict(X)
+
+
+def test_repeated_prediction_served_from_cache(client, stand_in_model, monkeypatch, tmp_path):
+    import joblib
+
+    from app.services import prediction_service
+
+    counting = _CountingModel(stand_in_model)
+    monkeypatch.setattr(prediction_service, "_loaded", prediction_service.LoadedModel(counting, "stand-in-linear"))
+    cache = prediction_service.get_prediction_cache()
+    cache.clear()
+
+    token = _login_get_token(client, "cache_user", "p")
+    headers = _auth_header(token)
+    payload = {
+        "longitude": -118.0,
+        "latitude": 34.0,
+        "housing_median_age": 30.0,
+        "total_rooms": 2000.0,
+        "total_bedrooms": 400.0,
+        "population": 1000.0,
+        "households": 380.0,
+        "median_income": 4.2,
+        "ocean_proximity": "<1H OCEAN",
+    }
+    first = client.post(f"{PREDICT_PREFIX}", json=payload, headers=headers).json()
+    second = client.post(f"{PREDICT_PREFIX}", json=payload, headers=headers).json()
+    assert first["prediction"] == second["prediction"]
+    assert first["prediction_id"] != second["prediction_id"]
+    assert counting.calls == 1
+
+    assert client.get(f"{PREDICT_PREFIX}/cache/stats").status_code == 401
+    stats = client.get(f"{PREDICT_PREFIX}/cache/stats", headers=headers).json()
+    assert stats["hits"] >= 1 and stats["size"] >= 1
+
+    model_path = tmp_path / "model.joblib"
+    joblib.dump(stand_in_model, model_path)
+    monkeypatch.setattr(prediction_service, "MODEL_PATH", model_path)
+    prediction_service.reload_model()
+    assert cache.stats()["size"] == 0
+    assert prediction_service.model_version() != "stand-in-linear"
+
+
+def test_redis_cache_outage_degrades_to_misses():
+    pytest.importorskip("redis")
+    from app.services.prediction_cache import RedisPredictionCache, cache_key
+
+    # nothing listens on port 1: every call fails with a connection error
+    cache = RedisPredictionCache("redis://127.0.0.1:1/0", ttl_seconds=60, timeout_seconds=0.2)
+    key = cache_key("v1", [1.0, 2.0])
+
+    async def scenario():
+        await cache.set(key, 1.5)
+        return await cache.get(key), await cache.get_many([key, cache_key("v1", [3.0])])
+
+    assert asyncio.run(scenario()) == (None, [None, None])
+    assert cache.stats() == {"backend": "redis", "hits": 0, "misses": 3, "errors": 3}
+
+
+def test_readiness_reflects_model_warm_up(monkeypatch, tmp_path, stand_in_model):
+    import joblib
+    from fastapi.testclient import TestClient
+
+    from app.core.config import settings
+    from app.main import app
+    from app.services import prediction_service
+
+    monkeypatch.setattr(prediction_service, "_model_status", {"status": "not_loaded"})
+    monkeypatch.setattr(prediction_service, "_loaded", None)
+    monkeypatch.setattr(prediction_service, "MODEL_PATH", tmp_path / "missing.joblib")
+    with TestClient(app) as c:
+        r = c.get("/health/ready")
+        assert r.status_code == 503
+        assert r.json()["model"]["status"] == "error"
+        assert c.get("/health").status_code == 200
+
+    model_path = tmp_path / "model.joblib"
+    joblib.dump(stand_in_model, model_path)
+    monkeypatch.setattr(prediction_service, "MODEL_PATH", model_path)
+    with TestClient(app) as c:
+        r = c.get("/health/ready")
+        assert r.status_code == 200
+        model = r.json()["model"]
+        assert model["status"] == "ready"
+        assert model["load_seconds"] >= 0 and model["warmup_seconds"] >= 0
+
+    monkeypatch.setattr(prediction_service, "_model_status", {"status": "not_loaded"})
+    monkeypatch.setattr(prediction_service, "_loaded", None)
+    monkeypatch.setattr(settings, "MODEL_WARMUP_ON_STARTUP", False)
+    with TestClient(app) as c:
+        assert prediction_service.model_status()["status"] == "not_loaded"
+        r = c.get("/health/ready")
+        assert r.status_code == 200 and r.json()["model"]["status"] == "ready"
+
+
+def test_hot_reload_swaps_model_and_records_version(client, stand_in_model, monkeypatch, tmp_path):
+    import joblib
+    from sklearn.dummy import DummyRegressor
+
+    from app.services import model_reloader, prediction_service
+
+    token = _login_get_token(client, "reload_user", "p")
+    headers = _auth_header(token)
+    payload = {
+        "longitude": -121.0,
+        "latitude": 37.0,
+        "housing_median_age": 12.0,
+        "total_rooms": 1500.0,
+        "total_bedrooms": 300.0,
+        "population": 800.0,
+        "households": 290.0,
+        "median_income": 3.1,
+        "ocean_proximity": "INLAND",
+    }
+    client.post(f"{PREDICT_PREFIX}", json=payload, headers=headers)
+
+    X, y = np.zeros((2, 13)), np.array([123456.0, 123456.0])
+    model_path = tmp_path / "model.joblib"
+    joblib.dump(DummyRegressor().fit(X, y), model_path)
+    monkeypatch.setattr(prediction_service, "MODEL_PATH", model_path)
+
+    r = client.post(f"{API_PREFIX}/model/reload", headers=headers)
+    assert r.status_code == 202
+    model_reloader.wait_for_reload(timeout=10)
+
+    info = client.get(f"{API_PREFIX}/model", headers=headers).json()
+    assert info["reload"]["status"] == "ok"
+    new_version = info["model"]["version"]
+    assert new_version != "stand-in-linear"
+
+    r = client.post(f"{PREDICT_PREFIX}", json=payload, headers=headers)
+    assert r.json()["prediction"] == 123456.0
+
+    history = client.get(f"{PREDICT_PREFIX}", headers=headers).json()
+    assert [row["model_version"] for row in history] == [new_version, "stand-in-linear"]
+
+
+def test_model_watcher_reloads_changed_artifact(stand_in_model, monkeypatch, tmp_path):
+    import time
+
+    import joblib
+    from sklearn.dummy import DummyRegressor
+
+    from app.services import model_reloader, prediction_service
+
+    model_path = tmp_path / "model.joblib"
+    joblib.dump(stand_in_model, model_path)
+    monkeypatch.setattr(prediction_service, "MODEL_PATH", model_path)
+
+    watcher = model_reloader.ModelWatcher(interval_seconds=0.05)
+    watcher.start()
+    try:
+        time.sleep(0.1)
+        joblib.dump(DummyRegressor().fit(np.zeros((2, 13)), [1.0, 1.0]), model_path)
+        deadline = time.monotonic() + 10
+        while prediction_service.model_version() == "stand-in-linear" and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        watcher.stop()
+    model_reloader.wait_for_reload(timeout=10)
+    assert prediction_service.model_version() != "stand-in-linear"
+
+
+def test_bounded_executor_rejects_when_saturated():
+    import asyncio
+    import math
+    import threading
+
+    from app.core.executors import BoundedExecutor, ExecutorSaturated
+
+    release = threading.Event()
+    pool = BoundedExecutor("test", kind="thread", max_workers=1, max_pending=1)
+    blocked = pool.submit(release.wait)
+    with pytest.raises(ExecutorSaturated):
+        pool.submit(math.sqrt, 4.0)
+    release.set()
+    blocked.result()
+    assert asyncio.run(pool.run(math.sqrt, 9.0)) == 3.0
+    assert pool.queue_depth == 0
+    pool.shutdown()
+
+    processes = BoundedExecutor("test-process", kind="process", max_workers=1, max_pending=4)
+    assert processes.call(math.sqrt, 16.0) == 4.0
+    processes.shutdown()
+
+
+def test_process_pool_predicts_with_warm_workers_and_replaces_them(monkeypatch, tmp_path, _fitted_linear_model):
+    import joblib
+    from sklearn.dummy import DummyRegressor
+
+    from app.core.executors import BoundedExecutor
+    from app.services import prediction_service
+
+    artifact = tmp_path / "model.joblib"
+    joblib.dump(_fitted_linear_model, artifact)
+    # spawned workers read their settings from the environment
+    monkeypatch.setenv("MODEL_PATH", str(artifact))
+    features = prediction_service.build_feature_matrix([prediction_service._warmup_row()])
+    pool = BoundedExecutor("test-inference", kind="process", max_workers=2, max_pending=4,
+                           initializer=prediction_service._init_inference_process)
+    try:
+        pool.start(timeout=120)
+        [(raw, version)] = pool.call(prediction_service._predict_matrix, features)
+        assert raw == pytest.approx(_fitted_linear_model.predict(features)[0])
+        assert version == prediction_service._fingerprint(artifact)
+
+        joblib.dump(DummyRegressor().fit(features, [123.0]), artifact)
+        pool.replace(timeout=120)
+        [(raw, version)] = pool.call(prediction_service._predict_matrix, features)
+        assert (raw, version) == (123.0, prediction_service._fingerprint(artifact))
+    finally:
+        pool.shutdown()
+
+
+def test_predict_returns_503_when_inference_pool_is_full(client, stand_in_model, monkeypatch):
+    from app.services import prediction_service
+
+    monkeypatch.setattr(prediction_service.inference_executor, "max_pending", 0)
+    monkeypatch.setattr(prediction_service.settings, "PREDICTION_CACHE_ENABLED", False)
+    token = _login_get_token(client, "busy_user", "p")
+    payload = {
+        "longitude": -122.23,
+        "latitude": 37.88,
+        "housing_median_age": 41.0,
+        "total_rooms": 880.0,
+        "total_bedrooms": 129.0,
+        "population": 322.0,
+        "households": 126.0,
+        "median_income": 8.3252,
+        "ocean_proximity": "NEAR BAY",
+    }
+    r = client.post(f"{PREDICT_PREFIX}", json=payload, headers=_auth_header(token))
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == "1"
+
+
+def test_write_behind_returns_ids_and_drains_on_shutdown(stand_in_model, monkeypatch, testing_session_factory):
+    from fastapi.testclient import TestClient
+
+    from app.core import db as db_module
+    from app.core.config import settings
+    from app.main import app
+
+    monkeypatch.setattr(settings, "PREDICTION_WRITE_BEHIND", True)
+    monkeypatch.setattr(settings, "PREDICTION_ID_BLOCK_SIZE", 2)
+    monkeypatch.setattr(db_module, "AsyncSessionLocal", testing_session_factory)
+    row = {
+        "longitude": -122.23,
+        "latitude": 37.88,
+        "housing_median_age": 41.0,
+        "total_rooms": 880.0,
+        "total_bedrooms": 129.0,
+        "population": 322.0,
+        "households": 126.0,
+        "median_income": 8.3252,
+        "ocean_proximity": "NEAR BAY",
+    }
+
+    with TestClient(app) as c:
+        headers = _auth_header(_login_get_token(c, "writer_user", "p"))
+        single = c.post(f"{PREDICT_PREFIX}", json=row, headers=headers).json()
+        batch = c.post(f"{PREDICT_PREFIX}/batch", json=[row, row, row], headers=headers).json()
+
+    ids = [single["prediction_id"]] + [item["prediction_id"] for item in batch]
+    assert ids == sorted(set(ids))
+
+    monkeypatch.setattr(settings, "PREDICTION_WRITE_BEHIND", False)
+    with TestClient(app) as c:
+        headers = _auth_header(_login_get_token(c, "writer_user", "p"))
+        history = c.get(f"{PREDICT_PREFIX}", headers=headers).json()
+    assert sorted(item["id"] for item in history) == ids
+
+
+def test_write_behind_spills_failed_batches_and_replays_them(monkeypatch, testing_session_factory, tmp_path):
+    from app.repositories.prediction_repository import insert_prediction_rows, list_predictions, prediction_row
+    from app.services import prediction_writer
+    from app.services.auth_service import register
+    from app.services.prediction_service import PredictionInput
+    from app.services.prediction_writer import PredictionWriter
+
+    spill = tmp_path / "spill.jsonl"
+    payload = PredictionInput(
+        longitude=-122.23, latitude=37.88, housing_median_age=41.0, total_rooms=880.0, total_bedrooms=129.0,
+        population=322.0, households=126.0, median_income=8.3252, ocean_proximity="NEAR BAY",
+    )
+    original_sleep = asyncio.sleep
+    monkeypatch.setattr(prediction_writer.asyncio, "sleep", lambda delay: original_sleep(0))
+
+    def broken_factory():
+        raise ConnectionError("database is down")
+
+    async def scenario():
+        async with testing_session_factory() as db:
+            user = await register(db, "spilled_user", "p")
+        rows = [prediction_row(user.id, payload, 1.0, "v", prediction_id=i) for i in (101, 102, 103)]
+
+        failing = PredictionWriter(broken_factory, queue_size=10, batch_size=2, flush_interval_ms=0,
+                                   id_block_size=10, spill_path=spill)
+        failing.start()
+        await failing.enqueue(rows)
+        await failing.stop(timeout=5)
+
+        # one row did reach the database before its flush reported an error
+        async with testing_session_factory() as db:
+            await insert_prediction_rows(db, rows[:1])
+        recovered = PredictionWriter(testing_session_factory, queue_size=10, batch_size=2, flush_interval_ms=0,
+                                     id_block_size=10, spill_path=spill)
+        recovered.start()
+        await recovered.stop(timeout=5)
+        async with testing_session_factory() as db:
+            stored = await list_predictions(db, user_id=user.id)
+        return failing, recovered, sorted(p.id for p in stored)
+
+    failing, recovered, stored = asyncio.run(scenario())
+    assert failing.counts == {"written": 0, "spilled": 3, "replayed": 0, "quarantined": 0, "dropped": 0}
+    assert recovered.counts["replayed"] == 2
+    assert stored == [101, 102, 103]
+    assert not spill.exists()
+
+
+def test_write_behind_replay_quarantines_rows_that_cannot_be_inserted(testing_session_factory, tmp_path):
+    import orjson
+
+    from app.repositories.prediction_repository import list_predictions, prediction_row
+    from app.services.auth_service import register
+    from app.services.prediction_service import PredictionInput
+    from app.services.prediction_writer import PredictionWriter
+
+    spill = tmp_path / "predictions.spill.jsonl"
+    payload = PredictionInput(
+        longitude=-122.23, latitude=37.88, housing_median_age=41.0, total_rooms=880.0, total_bedrooms=129.0,
+        population=322.0, households=126.0, median_income=8.3252, ocean_proximity="NEAR BAY",
+    )
+
+    def broken_factory():
+        raise ConnectionError("database is down")
+
+    def writer(session_factory):
+        return PredictionWriter(session_factory, queue_size=10, batch_size=2, flush_interval_ms=0,
+                                id_block_size=10, spill_path=spill)
+
+    async def scenario():
+        async with testing_session_factory() as db:
+            user = await register(db, "quarantine_user", "p")
+        rows = [prediction_row(user.id, payload, 1.0, "v", prediction_id=i) for i in (301, 302, 303, 304)]
+        # a row whose user is gone can never be inserted
+        rows[1]["user_id"] = None
+        spill.write_bytes(b"".join(orjson.dumps(row) + b"\n" for row in [*rows, {"unrelated": True}]))
+
+        # an outage moves only the malformed line aside; every real row waits for the next start
+        outage = writer(broken_factory)
+        outage.start()
+        await outage.stop(timeout=5)
+        assert spill.read_bytes() == b"".join(orjson.dumps(row) + b"\n" for row in rows)
+        assert outage.counts["quarantined"] == 1
+
+        recovered = writer(testing_session_factory)
+        recovered.start()
+        await recovered.stop(timeout=5)
+        async with testing_session_factory() as db:
+            stored = await list_predictions(db, user_id=user.id)
+        return recovered, sorted(p.id for p in stored)
+
+    recovered, stored = asyncio.run(scenario())
+    assert stored == [301, 303, 304]
+    assert recovered.counts["replayed"] == 3 and recovered.counts["quarantined"] == 1
+    assert not spill.exists()
+    quarantined = [orjson.loads(line) for line in recovered.quarantine_path.read_bytes().splitlines()]
+    assert recovered.quarantine_path.name == "predictions.spill.quarantine.jsonl"
+    assert [row.get("id") for row in quarantined] == [None, 302]
+
+
+def test_write_behind_stop_does_not_hang_on_a_dead_writer(testing_session_factory, tmp_path):
+    from app.services.prediction_writer import PredictionWriter
+
+    async def scenario():
+        writer = PredictionWriter(testing_session_factory, queue_size=10, batch_size=10, flush_interval_ms=0,
+                                  id_block_size=10, spill_path=tmp_path / "spill.jsonl")
+        # never started: nothing will ever drain the queue
+        await writer.enqueue([{"id": 1}])
+        await writer.stop(timeout=0.1)
+        return writer
+
+    writer = asyncio.run(scenario())
+    assert writer.counts["spilled"] == 1 and writer.queue_depth == 0
+
+
+def test_history_keyset_pagination_and_export(client, stand_in_model, monkeypatch):
+    import csv
+    import io
+    import json
+
+    from app.core.config import settings
+
+    token = _login_get_token(client, "history_user", "p")
+    headers = _auth_header(token)
+    row = {
+        "longitude": -122.23,
+        "latitude": 37.88,
+        "housing_median_age": 41.0,
+        "total_rooms": 880.0,
+        "total_bedrooms": 129.0,
+        "population": 322.0,
+        "households": 126.0,
+        "median_income": 8.3252,
+        "ocean_proximity": "NEAR BAY",
+    }
+    body = client.post(f"{PREDICT_PREFIX}/batch", json=[row] * 5, headers=headers).json()
+    ids = sorted((item["prediction_id"] for item in body), reverse=True)
+
+    pages, after = [], None
+    while True:
+        params = {"limit": 2} if after is None else {"limit": 2, "after": after}
+        r = client.get(f"{PREDICT_PREFIX}", params=params, headers=headers)
+        assert r.status_code == 200
+        pages.append([item["id"] for item in r.json()])
+        after = r.headers.get("X-Next-After")
+        if after is None:
+            break
+    assert pages == [ids[0:2], ids[2:4], ids[4:5]]
+    assert client.get(f"{PREDICT_PREFIX}", params={"limit": 0}, headers=headers).status_code == 422
+
+    monkeypatch.setattr(settings, "PREDICTION_EXPORT_CHUNK_ROWS", 2)
+    r = client.get(f"{PREDICT_PREFIX}/export", headers=headers)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert [line["id"] for line in lines] == ids
+    assert lines[0]["ocean_proximity"] == "NEAR BAY"
+
+    r = client.get(f"{PREDICT_PREFIX}/export", params={"format": "csv"}, headers=headers)
+    assert r.status_code == 200
+    records = list(csv.DictReader(io.StringIO(r.text)))
+    assert [int(rec["id"]) for rec in records] == ids
+
+
+def test_predict_is_rate_limited_per_user(client, stand_in_model):
+    from starlette.requests import Request
+
+    from app.core.rate_limit import limiter, storage_uri, user_or_remote_address
+
+    assert storage_uri("memory", "redis://cache:6379/0") == "memory://"
+    assert storage_uri("redis", "redis://cache:6379/0") == "redis://cache:6379/0"
+    with pytest.raises(ValueError):
+        storage_uri("carrier-pigeon", "")
+
+    anonymous = Request({"type": "http", "client": ("10.0.0.7", 1234), "headers": [], "state": {}})
+    assert user_or_remote_address(anonymous) == "10.0.0.7"
+
+    token = _login_get_token(client, "limited_user", "p")
+    me = client.get(f"{AUTH_PREFIX}/me", headers=_auth_header(token)).json()
+    row = {
+        "longitude": -122.23,
+        "latitude": 37.88,
+        "housing_median_age": 41.0,
+        "total_rooms": 880.0,
+        "total_bedrooms": 129.0,
+        "population": 322.0,
+        "households": 126.0,
+        "median_income": 8.3252,
+        "ocean_proximity": "NEAR BAY",
+    }
+    assert client.post(f"{PREDICT_PREFIX}", json=row, headers=_auth_header(token)).status_code == 200
+    keys = list(limiter._storage.events)
+    assert any(f"user:{me['id']}/" in key for key in keys)
+
+
+def test_metrics_endpoint_reports_routes_and_stages(client, stand_in_model, monkeypatch):
+    from app.core import metrics
+    from app.core.config import settings
+
+    token = _login_get_token(client, "metrics_user", "p")
+    row = {
+        "longitude": -122.23,
+        "latitude": 37.88,
+        "housing_median_age": 41.0,
+        "total_rooms": 880.0,
+        "total_bedrooms": 129.0,
+        "population": 322.0,
+        "households": 126.0,
+        "median_income": 8.3252,
+        "ocean_proximity": "NEAR BAY",
+    }
+    monkeypatch.setattr(settings, "PREDICTION_CACHE_ENABLED", False)
+    before = metrics.http_requests_total.value("POST", f"{PREDICT_PREFIX}", "200")
+    assert client.post(f"{PREDICT_PREFIX}", json=row, headers=_auth_header(token)).status_code == 200
+    assert metrics.http_requests_total.value("POST", f"{PREDICT_PREFIX}", "200") == before + 1
+
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    text = r.text
+    assert f'http_request_duration_seconds_count{{method="POST",route="{PREDICT_PREFIX}"}}' in text
+    for name in ("features", "model_load", "predict", "quantize", "db"):
+        assert f'predict_stage_duration_seconds_count{{stage="{name}"}}' in text
+    assert 'executor_queue_depth{executor="inference"} 0.0' in text
+
+    monkeypatch.setattr(metrics.registry, "enabled", False)
+    assert client.get("/metrics").status_code == 404
+    assert isinstance(metrics.stage("predict"), metrics._NoopTimer)
+    before = metrics.model_predictions_total.value("default", "stand-in-linear")
+    metrics.model_predictions_total.inc("default", "stand-in-linear")
+    assert metrics.model_predictions_total.value("default", "stand-in-linear") == before
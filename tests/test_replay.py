@@ -0,0 +1,76 @@
+import asyncio
+import json
+from argparse import Namespace
+
+import httpx
+import pytest
+
+from app.dtos.prediction_dto import PredictionInput
+from app.services import prediction_service
+from benchmarks.replay import _Collector, _replay, _run
+
+API_PREFIX = "/api-deutsche"
+ROW = {
+    "longitude": -122.23,
+    "latitude": 37.88,
+    "housing_median_age": 41.0,
+    "total_rooms": 880.0,
+    "total_bedrooms": 129.0,
+    "population": 322.0,
+    "households": 126.0,
+    "median_income": 8.3252,
+    "ocean_proximity": "NEAR BAY",
+}
+
+
+def _args(captures, **overrides):
+    return Namespace(**{
+        "captures": captures, "speed": 0.0, "max_in_flight": 4, "tolerance": 1e-6, "base_url": None,
+        "username": "replay_user", "password": "replay-password", **overrides,
+    })
+
+
+def test_replay_against_the_app_checks_predictions(stand_in_model, tmp_path):
+    expected = prediction_service.quantize_prediction(
+        stand_in_model.predict([prediction_service.build_feature_vector(PredictionInput(**ROW))])[0]
+    )
+    capture = tmp_path / "capture.jsonl"
+    records = [
+        {"ts": 0.0, "method": "POST", "path": f"{API_PREFIX}/predict", "body": ROW, "status": 200,
+         "response": {"prediction": expected}},
+        {"ts": 0.1, "method": "POST", "path": f"{API_PREFIX}/predict", "body": ROW, "status": 200,
+         "response": {"prediction": expected + 1.0}},
+        {"ts": 0.2, "method": "GET", "path": f"{API_PREFIX}/predict?limit=5", "status": 200},
+        {"unrelated": True},
+    ]
+    capture.write_text("\n".join(json.dumps(record) for record in records) + "\n")
+
+    stats = {"skipped": 0}
+    collector, wall = asyncio.run(_run(_args([capture]), stats))
+    assert stats["skipped"] == 1
+    assert collector.statuses == {200: 3}
+    assert collector.status_mismatches == 0 and collector.transport_errors == 0
+    assert (collector.prediction_checks, collector.prediction_mismatches) == (2, 1)
+    assert collector.mismatch_examples[0]["got"] == pytest.approx(expected)
+    assert sorted(collector.samples) == [f"GET {API_PREFIX}/predict", f"POST {API_PREFIX}/predict"]
+    assert wall > 0
+
+
+def test_transport_errors_are_recorded_and_the_replay_continues():
+    def handler(request):
+        if request.url.path == "/down":
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(200, json={"ok": True})
+
+    records = [{"method": "GET", "path": path} for path in ("/up", "/down", "/up", "/down", "/up")]
+
+    async def scenario():
+        collector = _Collector()
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://replay") as client:
+            await _replay(client, iter(records), {}, _args([]), collector)
+        return collector
+
+    collector = asyncio.run(scenario())
+    assert collector.statuses == {200: 3}
+    assert collector.transport_errors == 2
+    assert collector.error_examples[0] == {"path": "/down", "error": "ConnectError: connection refused"}
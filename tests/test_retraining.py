@@ -0,0 +1,151 @@
+import json
+import os
+from functools import partial
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from app.dtos.prediction_dto import PredictionInput
+from app.services import prediction_service
+from app.services.feature_encoding import encode_input
+from app.services.retraining import (
+    StreamingLinearRegression,
+    iter_production_chunks,
+    iter_store_chunks,
+    publish,
+    read_metadata,
+    save_artifact,
+    train,
+)
+
+API_PREFIX = "/api-deutsche"
+PREDICT_PREFIX = f"{API_PREFIX}/predict"
+HOUSING_CSV = os.path.join(os.path.dirname(__file__), "..", "housing.csv")
+
+
+def _labelled_predictions(client, headers, housing_frame, start, count):
+    rows = housing_frame.iloc[start:start + count]
+    inputs = rows.drop(columns=["median_house_value"]).to_dict("records")
+    body = client.post(f"{PREDICT_PREFIX}/batch", json=inputs, headers=headers).json()
+    for item, actual in zip(body, rows["median_house_value"]):
+        r = client.put(f"{PREDICT_PREFIX}/{item['prediction_id']}/actual",
+                       json={"actual_value": actual}, headers=headers)
+        assert r.status_code == 200
+    return inputs, rows["median_house_value"].to_numpy(), [item["prediction_id"] for item in body]
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 97, 5000])
+def test_streaming_linear_regression_matches_ols(housing_features, chunk_rows):
+    X, y = housing_features
+    X, y = X[:3000], y[:3000]
+    model = StreamingLinearRegression()
+    for start in range(0, len(X), chunk_rows):
+        model.partial_fit(X[start:start + chunk_rows], y[start:start + chunk_rows])
+    np.testing.assert_allclose(model.predict(X), LinearRegression().fit(X, y).predict(X), rtol=1e-6)
+
+
+def test_production_rows_use_the_api_encoding(client, auth_header, stand_in_model, housing_frame, testing_engine):
+    inputs, actual, ids = _labelled_predictions(client, auth_header(client, "labeller"), housing_frame, 0, 6)
+    headers = auth_header(client, "unlabelled")
+    client.post(f"{PREDICT_PREFIX}", json=inputs[0], headers=headers)
+    assert client.put(f"{PREDICT_PREFIX}/{ids[0]}/actual", json={"actual_value": 1.0},
+                      headers=headers).status_code == 404
+
+    progress = {}
+    chunks = list(iter_production_chunks(testing_engine, chunk_rows=4, progress=progress))
+    assert [len(y) for _, y in chunks] == [4, 2]
+    X = np.vstack([X for X, _ in chunks])
+    expected = np.vstack([encode_input(PredictionInput(**row)) for row in inputs])
+    np.testing.assert_array_equal(X, expected)
+    np.testing.assert_array_equal(np.concatenate([y for _, y in chunks]), actual)
+    assert progress["cursor"]["id"] == ids[-1]
+
+    chunks = iter_production_chunks(testing_engine, chunk_rows=4, progress=progress)
+    next(chunks)
+    later = list(iter_production_chunks(testing_engine, after=progress["cursor"]))
+    assert len(later[0][1]) == 2
+
+
+def test_refresh_reads_late_labels_for_old_predictions(client, auth_header, stand_in_model, housing_frame,
+                                                       testing_engine):
+    headers = auth_header(client, "labeller")
+    inputs = housing_frame.drop(columns=["median_house_value"]).iloc[:2].to_dict("records")
+    old_id = client.post(f"{PREDICT_PREFIX}", json=inputs[0], headers=headers).json()["prediction_id"]
+    _labelled_predictions(client, headers, housing_frame, 1, 1)
+    progress = {}
+    assert sum(len(y) for _, y in iter_production_chunks(testing_engine, progress=progress)) == 1
+
+    # the older prediction is only labelled after the previous refresh ran
+    client.put(f"{PREDICT_PREFIX}/{old_id}/actual", json={"actual_value": 123456.0}, headers=headers)
+    [(X, y)] = list(iter_production_chunks(testing_engine, after=progress["cursor"]))
+    assert y.tolist() == [123456.0]
+    np.testing.assert_array_equal(X, encode_input(PredictionInput(**inputs[0])))
+
+
+def test_refresh_produces_an_artifact_the_api_loads(client, auth_header, stand_in_model, housing_frame,
+                                                    testing_engine, tmp_path, monkeypatch):
+    src = tmp_path / "train.csv"
+    pd.read_csv(HOUSING_CSV).head(2000).to_csv(src, index=False)
+    model = StreamingLinearRegression()
+    report = train(model, [partial(iter_store_chunks, 500, src)])
+    assert report["mode"] == "partial_fit"
+    assert report["rows"] + report["skipped"] == 2000
+    assert report["rows_per_second"] > 0
+    base = save_artifact(model, tmp_path / "models", {**report, "label_cursor": None})
+
+    _, _, ids = _labelled_predictions(client, auth_header(client, "labeller"), housing_frame, 5000, 8)
+    progress = {"cursor": None}
+    refreshed = prediction_service.joblib.load(base)
+    report = train(refreshed, [partial(iter_production_chunks, testing_engine, 500, None, progress)])
+    assert report["rows"] == 8 and progress["cursor"]["id"] == ids[-1]
+    assert refreshed.n_samples_seen_ == model.n_samples_seen_ + 8
+
+    artifact = save_artifact(refreshed, tmp_path / "models",
+                             {**report, "parent_version": read_metadata(base)["version"]})
+    assert artifact != base
+    model_path = publish(artifact, tmp_path / "model.joblib")
+    monkeypatch.setattr(prediction_service, "MODEL_PATH", model_path)
+    loaded = prediction_service.reload_model()
+    assert loaded.version == read_metadata(model_path)["version"]
+    assert read_metadata(model_path)["parent_version"] == read_metadata(base)["version"]
+
+    headers = auth_header(client, "quoter")
+    row = housing_frame.drop(columns=["median_house_value"]).iloc[0].to_dict()
+    prediction = client.post(f"{PREDICT_PREFIX}", json=row, headers=headers).json()["prediction"]
+    assert prediction == pytest.approx(refreshed.predict(encode_input(PredictionInput(**row)))[0], abs=1e-6)
+
+
+def test_retrain_script_full_refit_and_warm_start(client, auth_header, stand_in_model, housing_frame, housing_features,
+                                                  testing_engine, tmp_path, monkeypatch, capsys):
+    from app.core import db as db_module
+    from scripts import retrain
+
+    monkeypatch.setattr(db_module, "engine", testing_engine)
+    src = tmp_path / "train.csv"
+    pd.read_csv(HOUSING_CSV).head(300).to_csv(src, index=False)
+    models = tmp_path / "models"
+    headers = auth_header(client, "labeller")
+    _, _, ids = _labelled_predictions(client, headers, housing_frame, 5000, 5)
+
+    def run(*argv):
+        retrain.main([*argv, "--train-data", str(src), "--artifact-dir", str(models)])
+        return json.loads(capsys.readouterr().out)
+
+    # LinearRegression can only be refitted: its parent's cursor must not hide earlier labels
+    X, y = housing_features
+    base = save_artifact(LinearRegression().fit(X[:100], y[:100]), models,
+                         {"label_cursor": {"labelled_at": "2999-01-01T00:00:00", "id": 0}})
+    report = run("--base", str(base))
+    assert report["mode"] == "full" and report["sources"] == ["store", "production"]
+    assert report["rows"] + report["skipped"] == 300 + 5
+
+    first = run("--estimator", "forest")
+    assert first["mode"] == "warm_start" and first["label_cursor"]["id"] == ids[-1]
+    _, _, later_ids = _labelled_predictions(client, headers, housing_frame, 6000, 3)
+    second = run("--base", first["artifact"])
+    assert second["mode"] == "warm_start" and second["sources"] == ["production"]
+    assert second["rows"] == 3 and second["label_cursor"]["id"] == later_ids[-1]
+    assert second["parent_version"] == first["version"]
+    assert len(prediction_service.joblib.load(second["artifact"]).estimators_) == 60
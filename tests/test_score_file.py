@@ -0,0 +1,68 @@
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from app.dtos.prediction_dto import PredictionInput
+from app.services import prediction_service
+from app.services.feature_encoding import encode_frame
+from scripts.score_file import CsvSink, DatabaseSink, score_file
+
+HOUSING_CSV = os.path.join(os.path.dirname(__file__), "..", "housing.csv")
+
+
+def test_frame_encoding_matches_build_feature_vector(housing_frame):
+    frame = housing_frame.head(200)
+    matrix = encode_frame(frame)
+    expected = [
+        prediction_service.build_feature_vector(PredictionInput(**row))
+        for row in frame.drop(columns=["median_house_value"]).to_dict("records")
+    ]
+    np.testing.assert_array_equal(matrix, np.asarray(expected, dtype=np.float64))
+
+
+def test_score_file_streams_csv_and_loads_db(stand_in_model, tmp_path, testing_engine):
+    src = tmp_path / "listings.csv"
+    # raw rows, including ones with a missing total_bedrooms
+    pd.read_csv(HOUSING_CSV).head(700).to_csv(src, index=False)
+    out = tmp_path / "scored.csv"
+
+    with testing_engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, username, password_hash) VALUES (1, 'bulk', 'x')"))
+    totals = score_file(src, [CsvSink(out), DatabaseSink(1, testing_engine)], chunk_rows=128, workers=0)
+
+    scored = pd.read_csv(out)
+    source = pd.read_csv(src)
+    assert totals["rows"] == len(source) == len(scored)
+    missing = source["total_bedrooms"].isna()
+    assert totals["skipped"] == missing.sum() > 0
+    assert scored.loc[missing, "prediction"].isna().all()
+
+    valid = source[~missing]
+    expected = [
+        prediction_service.quantize_prediction(v)
+        for v in stand_in_model.predict(encode_frame(valid))
+    ]
+    assert scored.loc[~missing, "prediction"].tolist() == expected
+
+    with testing_engine.connect() as conn:
+        stored = conn.execute(text("SELECT prediction FROM predictions WHERE user_id = 1 ORDER BY id")).scalars().all()
+    assert stored == expected
+
+
+def test_score_file_process_pool_matches_inline(_fitted_linear_model, tmp_path, monkeypatch):
+    model_path = tmp_path / "model.joblib"
+    joblib.dump(_fitted_linear_model, model_path)
+    # spawned workers import the app afresh and read MODEL_PATH from the environment
+    monkeypatch.setenv("MODEL_PATH", str(model_path))
+    monkeypatch.setattr(prediction_service, "_loaded", prediction_service.LoadedModel(_fitted_linear_model, "inline"))
+
+    src = tmp_path / "listings.csv"
+    pd.read_csv(HOUSING_CSV).head(2000).to_csv(src, index=False)
+    inline, pooled = tmp_path / "inline.csv", tmp_path / "pooled.csv"
+    score_file(src, [CsvSink(inline)], chunk_rows=300, workers=0)
+    score_file(src, [CsvSink(pooled)], chunk_rows=300, workers=2)
+
+    pd.testing.assert_series_equal(pd.read_csv(inline)["prediction"], pd.read_csv(pooled)["prediction"])
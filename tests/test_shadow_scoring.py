@@ -0,0 +1,105 @@
+import asyncio
+
+import joblib
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from sklearn.dummy import DummyRegressor
+from sqlalchemy import text
+
+from app.services import prediction_service
+from app.services.model_registry import ModelRegistry
+from app.services.shadow_scoring import ShadowScorer
+
+API_PREFIX = "/api-deutsche"
+PREDICT_PREFIX = f"{API_PREFIX}/predict"
+ROW = {
+    "longitude": -122.23,
+    "latitude": 37.88,
+    "housing_median_age": 41.0,
+    "total_rooms": 880.0,
+    "total_bedrooms": 129.0,
+    "population": 322.0,
+    "households": 126.0,
+    "median_income": 8.3252,
+    "ocean_proximity": "NEAR BAY",
+}
+
+
+def test_full_queue_drops_instead_of_blocking(testing_session_factory):
+    async def scenario():
+        scorer = ShadowScorer("candidate", None, testing_session_factory, sample_rate=1.0,
+                              queue_size=2, batch_size=10)
+        queued = scorer.offer(np.zeros((5, 13)), [1.0] * 5, "live", range(5))
+        sampled = ShadowScorer("candidate", None, testing_session_factory, sample_rate=0.5,
+                               queue_size=10, batch_size=10, random_fn=iter([0.1, 0.9, 0.4]).__next__)
+        sampled_in = sampled.offer(np.zeros((3, 13)), [1.0] * 3, "live", range(3))
+        return scorer, queued, sampled, sampled_in
+
+    scorer, queued, sampled, sampled_in = asyncio.run(scenario())
+    assert queued == 2 and scorer.queue_depth == 2
+    assert scorer.counts["dropped"] == 3
+    assert sampled_in == 2 and sampled.counts["dropped"] == 0
+
+
+def test_failed_shadow_batches_are_counted_and_skipped(testing_session_factory):
+    def broken(features, name):
+        raise RuntimeError("candidate exploded")
+
+    async def scenario():
+        scorer = ShadowScorer("candidate", broken, testing_session_factory, sample_rate=1.0,
+                              queue_size=10, batch_size=10)
+        scorer.start()
+        scorer.offer(np.zeros((3, 13)), [1.0] * 3, "live", range(3))
+        await asyncio.wait_for(scorer.drain(), 5)
+        await scorer.stop()
+        return scorer
+
+    scorer = asyncio.run(scenario())
+    assert scorer.counts == {"queued": 3, "dropped": 0, "scored": 0, "failed": 3}
+
+
+def test_candidate_scores_land_in_side_table(stand_in_model, auth_header, monkeypatch, tmp_path,
+                                             testing_session_factory, testing_engine):
+    from app.core import db as db_module
+    from app.core.config import settings
+    from app.main import app
+
+    candidate = tmp_path / "candidate.joblib"
+    joblib.dump(DummyRegressor().fit(np.zeros((2, 13)), [250000.0, 250000.0]), candidate)
+    registry = ModelRegistry({"candidate": str(candidate)}, max_loaded=1, loader=prediction_service._read_model)
+    monkeypatch.setattr(prediction_service, "_registry", registry)
+    monkeypatch.setattr(db_module, "AsyncSessionLocal", testing_session_factory)
+    monkeypatch.setattr(settings, "SHADOW_MODEL", "candidate")
+    monkeypatch.setattr(settings, "SHADOW_BATCH_SIZE", 2)
+
+    with TestClient(app) as c:
+        headers = auth_header(c, "shadowed")
+        single = c.post(f"{PREDICT_PREFIX}", json=ROW, headers=headers).json()
+        batch = c.post(f"{PREDICT_PREFIX}/batch", json=[ROW, ROW, ROW], headers=headers).json()
+        # the candidate arm itself is not shadowed
+        c.post(f"{PREDICT_PREFIX}", json=ROW, params={"model": "candidate"}, headers=headers)
+    # shutdown drained the queue
+
+    with testing_engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT prediction_id, live_model_version, live_prediction, shadow_model, "
+            "shadow_model_version, shadow_prediction, divergence FROM shadow_predictions ORDER BY prediction_id"
+        )).mappings().all()
+    ids = [single["prediction_id"]] + [item["prediction_id"] for item in batch]
+    assert [row["prediction_id"] for row in rows] == ids
+    live = single["prediction"]
+    for row in rows:
+        assert row["live_model_version"] == "stand-in-linear"
+        assert row["live_prediction"] == pytest.approx(live)
+        assert (row["shadow_model"], row["shadow_prediction"]) == ("candidate", 250000.0)
+        assert row["shadow_model_version"] == registry.get("candidate").version
+        assert row["divergence"] == pytest.approx(250000.0 - live)
+
+    monkeypatch.setattr(settings, "SHADOW_MODEL", None)
+    with TestClient(app) as c:
+        report = c.get(f"{API_PREFIX}/model/shadow", headers=auth_header(c, "shadowed")).json()
+    assert report["scorer"] is None
+    [summary] = report["comparisons"]
+    assert summary["rows"] == 4
+    assert summary["mean_abs_divergence"] == pytest.approx(abs(250000.0 - live))
@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.feature_encoding import OCEAN_CATEGORIES
+from app.services.training_data import TrainingData, convert_csv, load_training_data
+
+HOUSING_CSV = os.path.join(os.path.dirname(__file__), "..", "housing.csv")
+
+
+@pytest.fixture
+def sample_csv(tmp_path):
+    # rows 290.. include missing total_bedrooms
+    src = tmp_path / "housing.csv"
+    pd.read_csv(HOUSING_CSV).head(1000).to_csv(src, index=False)
+    return src
+
+
+def test_round_trip_through_memory_mapped_columns(sample_csv, tmp_path):
+    store = convert_csv(sample_csv, tmp_path / "store", chunk_rows=128)
+    data = load_training_data(sample_csv, store)
+    expected = pd.read_csv(sample_csv)
+
+    assert len(data) == len(expected)
+    assert data.columns == list(expected.columns)
+    assert isinstance(data.column("median_income"), np.memmap)
+    np.testing.assert_array_equal(data.column("total_bedrooms"), expected["total_bedrooms"].to_numpy())
+    assert np.isnan(data.column("total_bedrooms")).sum() == expected["total_bedrooms"].isna().sum()
+
+    codes = data.column("ocean_proximity")
+    assert codes.dtype == np.int8
+    assert data.categories("ocean_proximity") == OCEAN_CATEGORIES
+    assert [OCEAN_CATEGORIES[c] for c in codes] == expected["ocean_proximity"].tolist()
+    assert data.to_frame(["ocean_proximity"], 10, 12)["ocean_proximity"].tolist() == \
+        expected["ocean_proximity"][10:12].tolist()
+
+
+def test_chunked_iteration_covers_every_row(sample_csv, tmp_path):
+    data = TrainingData.open(convert_csv(sample_csv, tmp_path / "store"))
+    chunks = list(data.iter_chunks(300, columns=["latitude", "ocean_proximity"]))
+    assert [len(chunk["latitude"]) for chunk in chunks] == [300, 300, 300, 100]
+    np.testing.assert_array_equal(np.concatenate([c["latitude"] for c in chunks]), data.column("latitude"))
+    assert set(chunks[0]) == {"latitude", "ocean_proximity"}
+
+
+def test_store_is_reused_until_the_csv_changes(sample_csv, tmp_path):
+    store = tmp_path / "store"
+    first = load_training_data(sample_csv, store)
+    manifest = (store / "manifest.json").stat().st_mtime_ns
+    assert load_training_data(sample_csv, store).manifest == first.manifest
+    assert (store / "manifest.json").stat().st_mtime_ns == manifest
+
+    pd.read_csv(sample_csv).head(10).to_csv(sample_csv, index=False)
+    assert len(load_training_data(sample_csv, store)) == 10
+    # a store directory can be opened on its own, without the CSV
+    sample_csv.unlink()
+    assert len(load_training_data(store)) == 10
+    with pytest.raises(FileNotFoundError):
+        load_training_data(sample_csv, store)
+
+
+def test_schema_is_checked_against_prediction_input(sample_csv, tmp_path):
+    frame = pd.read_csv(sample_csv)
+    frame.drop(columns=["median_income"]).to_csv(sample_csv, index=False)
+    with pytest.raises(ValueError, match="median_income"):
+        convert_csv(sample_csv, tmp_path / "store")
+
+    frame.loc[3, "ocean_proximity"] = "ON THE MOON"
+    frame.to_csv(sample_csv, index=False)
+    with pytest.raises(ValueError, match="ON THE MOON"):
+        convert_csv(sample_csv, tmp_path / "store")
+    assert not (tmp_path / "store").exists()
+    assert list(tmp_path.iterdir()) == [sample_csv]
@@ -161,3 +161,59 @@ def test_login_rate_limit_only_on_json_endpoint(client):
         json={"username": "rate_user", "password": "p"},
     )
     assert resp2.status_code == 200
+
+
+def test_principal_cache_skips_lookup_and_is_invalidated(client, monkeypatch):
+    from app.core.config import settings
+    from app.services import auth_service
+
+    user_id = _register(client, "cached", "p").json()["user_id"]
+    headers = _auth_header(_login_json_get_token(client, "cached", "p"))
+
+    lookups = []
+    real_lookup = auth_service.get_user_by_username
+
+    async def counting_lookup(db, username):
+        lookups.append(username)
+        return await real_lookup(db, username)
+
+    monkeypatch.setattr(auth_service, "get_user_by_username", counting_lookup)
+    for _ in range(3):
+        assert client.get(f"{AUTH_PREFIX}/me", headers=headers).status_code == 200
+    assert len(lookups) == 1
+    cached = auth_service._principals.get(user_id)
+    assert isinstance(cached, auth_service.Principal) and cached.username == "cached"
+
+    r = client.patch(f"{USERS_PREFIX}/{user_id}", json={"username": "renamed"})
+    assert r.status_code == 200
+    assert client.get(f"{AUTH_PREFIX}/me", headers=headers).status_code == 401
+
+    monkeypatch.setattr(settings, "AUTH_TRUST_TOKEN_ID_CLAIM", True)
+    lookups.clear()
+    r = client.get(f"{AUTH_PREFIX}/me", headers=headers)
+    assert r.status_code == 200
+    assert r.json() == {"id": user_id, "username": "cached"}
+    assert lookups == []
+
+
+def test_login_rehashes_below_target_cost(client, monkeypatch, testing_session_factory):
+    import asyncio
+
+    from app.core import security
+    from app.entities.user import User
+
+    user_id = _register(client, "rehash", "p").json()["user_id"]
+
+    async def stored_hash():
+        async with testing_session_factory() as db:
+            return (await db.get(User, user_id)).password_hash
+
+    assert asyncio.run(stored_hash()).startswith("$2b$04$")
+
+    monkeypatch.setattr(security, "pwd_context", security.build_password_context(5))
+    _login_json_get_token(client, "rehash", "p")
+    upgraded = asyncio.run(stored_hash())
+    assert upgraded.startswith("$2b$05$")
+
+    _login_json_get_token(client, "rehash", "p")
+    assert asyncio.run(stored_hash()) == upgraded